@@ -1,17 +1,49 @@
+from __future__ import annotations
+
 import os
 import logging
+import importlib
 import csv
+import enum
 import io
+import math
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any, Union
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Any, Tuple, Union
 import pytz
-import pandas as pd
-import sqlalchemy
-from sqlalchemy import text, inspect
-from google.cloud import bigquery
-from google.cloud import storage
 import json
 import random
+import sys
+import threading
+
+class LazyModule:
+    """初回の属性アクセス時にモジュールをインポートする遅延ローダー（コールドスタート短縮用）"""
+    
+    def __init__(self, module_name: str):
+        self._module_name = module_name
+        self._module = None
+    
+    def __getattr__(self, name: str) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, name)
+
+# 重いライブラリは実際に使用するまでインポートしない
+pd = LazyModule('pandas')
+sqlalchemy = LazyModule('sqlalchemy')
+bigquery = LazyModule('google.cloud.bigquery')
+storage = LazyModule('google.cloud.storage')
+descriptor_pb2 = LazyModule('google.protobuf.descriptor_pb2')
+descriptor_pool = LazyModule('google.protobuf.descriptor_pool')
+message_factory = LazyModule('google.protobuf.message_factory')
+json_format = LazyModule('google.protobuf.json_format')
+
+# 本番実装（general/main.py）と共通の処理は複製せずに読み込み、Mock環境でも本番と同じ動作を確認する
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'general'))
+import main as production  # noqa: E402
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +52,9 @@ logger = logging.getLogger(__name__)
 # JST タイムゾーン
 JST = pytz.timezone('Asia/Tokyo')
 
+# GCS composeで一度に結合できるオブジェクト数の上限
+GCS_COMPOSE_MAX_SOURCES = 32
+
 # ハードコーディング設定値
 HARDCODED_CONFIG = {
     # システム設定
@@ -36,10 +71,29 @@ HARDCODED_CONFIG = {
     "BIGQUERY_PROJECT": "test-project-12345",
     "BIGQUERY_DATASET": "data_sync",
     "BIGQUERY_LOCATION": "asia-northeast1",
+    # Storage Write APIの1リクエストあたりの最大バイト数（Mockデータでも分割・オフセットを確認できるよう小さめの値）
+    "BIGQUERY_WRITE_MAX_REQUEST_BYTES": 4 * 1024,
     
     # Cloud Storage設定
     "GCS_BUCKET": "data-sync-bucket-test",
     
+    # 並列マルチパートアップロード設定（Mockデータでも動作するよう小さめの値）
+    "GCS_PARALLEL_UPLOAD_THRESHOLD_BYTES": 32 * 1024,
+    "GCS_UPLOAD_PART_SIZE_BYTES": 8 * 1024,
+    "GCS_UPLOAD_MAX_WORKERS": 4,
+    
+    # ファンアウト実行設定（ローカルではプロセスプールをリモートインスタンスの代替として使用）
+    "FANOUT_SHARD_COUNT": 3,
+    
+    # プロファイリング設定（Mockモードではレポートをローカルディレクトリに出力）
+    "PROFILE_LOCAL_DIR": "profile_reports",
+    "PROFILE_TOP_N": 15,
+    
+    # Mockの遅延・障害注入設定（MOCK_IO_PRESETSのプリセット名、または操作ごとの設定dict）
+    # 例: "production"（本番相当のI/O待ち）/ "flaky"（本番相当＋一時エラー）/ "none"（即時応答・障害なし）
+    "MOCK_IO_PROFILE": "none",
+    "MOCK_IO_SEED": None,  # 指定すると遅延・障害の発生が毎回同じになる
+    
     # 同期テーブル設定
     "SYNC_TABLES_CONFIG": {
         "orders": {
@@ -52,7 +106,10 @@ HARDCODED_CONFIG = {
             "timestamp_column": None
         },
         "transactions": {
-            "timestamp_column": "created_at"
+            "timestamp_column": "created_at",
+            # GCSを経由せずStorage Write API（Mock）でBigQueryへ直接書き込む
+            "sink": "bigquery_write",
+            "write_mode": "pending"
         },
         "user_activities": {
             "timestamp_column": "activity_timestamp"
@@ -60,11 +117,119 @@ HARDCODED_CONFIG = {
     }
 }
 
+# Mock操作ごとの遅延・帯域・障害の設定プリセット
+# latency_ms: 数値（固定）または {"distribution": fixed|uniform|normal|lognormal|exponential, ...}
+# bandwidth_mbps: 転送量に応じた遅延を加える帯域上限
+# failure_rate: 障害の発生確率 / fail_calls: 障害を発生させる呼び出し回数（1始まり）
+# error: connection（ConnectionError）| timeout（TimeoutError）| permanent（RuntimeError）
+MOCK_IO_PRESETS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "none": {},
+    "production": {
+        "sql.execute": {"latency_ms": {"distribution": "lognormal", "median": 40, "sigma": 0.6}, "bandwidth_mbps": 200},
+        "bigquery.query": {"latency_ms": {"distribution": "lognormal", "median": 700, "sigma": 0.4}},
+        "bigquery.create_table": {"latency_ms": {"distribution": "uniform", "min": 200, "max": 600}},
+        "bigquery.append_rows": {"latency_ms": {"distribution": "lognormal", "median": 30, "sigma": 0.5}, "bandwidth_mbps": 100},
+        "gcs.upload": {"latency_ms": {"distribution": "lognormal", "median": 60, "sigma": 0.5}, "bandwidth_mbps": 400},
+        "gcs.compose": {"latency_ms": 150},
+        "gcs.delete": {"latency_ms": 30},
+    },
+}
+MOCK_IO_PRESETS["flaky"] = {
+    **MOCK_IO_PRESETS["production"],
+    "bigquery.query": {**MOCK_IO_PRESETS["production"]["bigquery.query"], "failure_rate": 0.05},
+    "gcs.upload": {**MOCK_IO_PRESETS["production"]["gcs.upload"], "failure_rate": 0.05},
+    "sql.execute": {**MOCK_IO_PRESETS["production"]["sql.execute"], "fail_calls": [2], "error": "timeout"},
+}
+
+class MockFaultInjector:
+    """Mock操作ごとに遅延・帯域制限・障害を注入（本番に近いI/O待ちをローカルで再現する）"""
+    
+    ERRORS = {"connection": ConnectionError, "timeout": TimeoutError, "permanent": RuntimeError}
+    
+    def __init__(self, profile: Union[str, Dict[str, Dict[str, Any]], None], seed: Optional[int] = None):
+        if isinstance(profile, str):
+            if profile not in MOCK_IO_PRESETS:
+                raise ValueError(f"Unknown mock IO profile: {profile} (available: {list(MOCK_IO_PRESETS)})")
+            profile = MOCK_IO_PRESETS[profile]
+        self.profile = profile or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.profile)
+    
+    def sample_latency(self, latency: Any) -> float:
+        """遅延（ミリ秒）を分布からサンプリング"""
+        if not latency:
+            return 0.0
+        if isinstance(latency, (int, float)):
+            return float(latency)
+        distribution = latency.get("distribution", "fixed")
+        if distribution == "fixed":
+            return float(latency["value"])
+        if distribution == "uniform":
+            return self.random.uniform(latency["min"], latency["max"])
+        if distribution == "normal":
+            return max(0.0, self.random.gauss(latency["mean"], latency["stddev"]))
+        if distribution == "lognormal":
+            return latency["median"] * math.exp(self.random.gauss(0, latency.get("sigma", 0.5)))
+        if distribution == "exponential":
+            return self.random.expovariate(1 / latency["mean"]) if latency["mean"] else 0.0
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    
+    def apply(self, operation: str, payload_bytes: int = 0):
+        """操作の前に遅延を入れ、設定に応じて障害を発生させる"""
+        spec = self.profile.get(operation)
+        if not spec:
+            return
+        with self.lock:
+            stats = self.stats.setdefault(operation, {"calls": 0, "failures": 0, "injected_seconds": 0.0, "bytes": 0})
+            stats["calls"] += 1
+            call = stats["calls"]
+            delay = self.sample_latency(spec.get("latency_ms")) / 1000
+            if spec.get("bandwidth_mbps") and payload_bytes:
+                delay += payload_bytes * 8 / (spec["bandwidth_mbps"] * 1_000_000)
+            fail = call in spec.get("fail_calls", []) or self.random.random() < spec.get("failure_rate", 0.0)
+            stats["injected_seconds"] += delay
+            stats["bytes"] += payload_bytes
+            if fail:
+                stats["failures"] += 1
+        
+        # 実際のI/O待ちと同様にスレッドをブロックする（ロック外で待機し、並列実行の効果を測定できるようにする）
+        time.sleep(delay)
+        if fail:
+            error = self.ERRORS.get(spec.get("error", "connection"), ConnectionError)
+            raise error(f"Mock injected failure: {operation} (call #{call})")
+    
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """操作ごとの呼び出し回数・障害回数・注入した待ち時間の合計"""
+        with self.lock:
+            return {
+                operation: {**stats, "injected_seconds": round(stats["injected_seconds"], 3)}
+                for operation, stats in self.stats.items()
+            }
+    
+    @staticmethod
+    def merge_reports(reports: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """複数プロセス（ファンアウトのシャード）のreportを操作ごとに合算"""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for report in reports:
+            for operation, stats in report.items():
+                total = merged.setdefault(operation, {"calls": 0, "failures": 0, "injected_seconds": 0.0, "bytes": 0})
+                for key in total:
+                    total[key] += stats.get(key, 0)
+        for total in merged.values():
+            total["injected_seconds"] = round(total["injected_seconds"], 3)
+        return merged
+
 class MockSQLServerEngine:
     """SQL Server接続のMockクラス"""
     
-    def __init__(self):
+    def __init__(self, faults: Optional[MockFaultInjector] = None):
         self.is_connected = True
+        self.faults = faults or MockFaultInjector(None)
         self.mock_data = self._generate_mock_data()
         logger.info("Mock SQL Server Engine initialized")
     
@@ -194,6 +359,8 @@ class MockSQLServerEngine:
                         logger.info(f"Filtered by {col} > {timestamp_param}, remaining rows: {len(df)}")
                         break
         
+        # 結果の転送量に応じた遅延（帯域制限）を含めて注入
+        self.faults.apply("sql.execute", int(df.memory_usage(index=False).sum()))
         logger.info(f"Mock query returned {len(df)} rows from {table_name}")
         return df
     
@@ -204,8 +371,9 @@ class MockSQLServerEngine:
 class MockBigQueryClient:
     """BigQuery クライアントのMockクラス"""
     
-    def __init__(self, project: str):
+    def __init__(self, project: str, faults: Optional[MockFaultInjector] = None):
         self.project = project
+        self.faults = faults or MockFaultInjector(None)
         self.datasets: Dict[str, Any] = {}
         self.tables: Dict[str, Any] = {}
         self.sync_metadata: List[Dict[str, Any]] = []
@@ -218,6 +386,7 @@ class MockBigQueryClient:
     
     def create_table(self, table, exists_ok=True):
         """テーブル作成のMock"""
+        self.faults.apply("bigquery.create_table")
         if hasattr(table, 'project'):
             table_id = f"{table.project}.{table.dataset_id}.{table.table_id}"
         else:
@@ -231,6 +400,7 @@ class MockBigQueryClient:
     
     def query(self, query: str, job_config=None):
         """クエリ実行のMock"""
+        self.faults.apply("bigquery.query")
         logger.info(f"Mock BigQuery query: {query[:100]}...")
         
         # sync_metadataからの取得をシミュレート
@@ -262,6 +432,11 @@ class MockBigQueryClient:
                 for param in job_config.query_parameters:
                     metadata[param.name] = param.value
                 
+                # 本番のMERGEと同様にウォーターマークは戻さない
+                previous = [m['last_sync_time'] for m in self.sync_metadata
+                            if m.get('table_name') == metadata.get('table_name') and m.get('last_sync_time') is not None]
+                if previous and (metadata.get('last_sync_time') is None or metadata['last_sync_time'] < previous[-1]):
+                    metadata['last_sync_time'] = previous[-1]
                 self.sync_metadata.append(metadata)
                 logger.info(f"Mock sync metadata updated: {metadata.get('table_name', 'unknown')} -> {metadata.get('last_sync_time', 'N/A')}")
             
@@ -269,6 +444,216 @@ class MockBigQueryClient:
         
         return MockQueryResult([])
 
+class MockWriteTypes:
+    """google.cloud.bigquery_storage_v1.types のMock（Storage Write APIの書き込みで使用する型のみ）"""
+    
+    class WriteStream(SimpleNamespace):
+        class Type(enum.IntEnum):
+            TYPE_UNSPECIFIED = 0
+            COMMITTED = 1
+            PENDING = 2
+            BUFFERED = 3
+        
+        def __init__(self, type_: int = 0, name: str = ""):
+            super().__init__(type_=type_, name=name)
+    
+    class ProtoSchema(SimpleNamespace):
+        def __init__(self, proto_descriptor=None):
+            super().__init__(proto_descriptor=proto_descriptor)
+    
+    class ProtoRows(SimpleNamespace):
+        def __init__(self, serialized_rows: Optional[List[bytes]] = None):
+            super().__init__(serialized_rows=list(serialized_rows or []))
+    
+    class AppendRowsRequest(SimpleNamespace):
+        class ProtoData(SimpleNamespace):
+            def __init__(self, writer_schema=None, rows=None):
+                super().__init__(writer_schema=writer_schema, rows=rows)
+        
+        def __init__(self, write_stream: str = "", offset: Optional[int] = None, proto_rows=None):
+            super().__init__(write_stream=write_stream, offset=offset, proto_rows=proto_rows)
+    
+    class AppendRowsResponse(SimpleNamespace):
+        def __init__(self, offset: Optional[int] = None, error=None):
+            super().__init__(append_result=SimpleNamespace(offset=offset), error=error)
+    
+    class FinalizeWriteStreamResponse(SimpleNamespace):
+        def __init__(self, row_count: int = 0):
+            super().__init__(row_count=row_count)
+    
+    class BatchCommitWriteStreamsRequest(SimpleNamespace):
+        def __init__(self, parent: str = "", write_streams: Optional[List[str]] = None):
+            super().__init__(parent=parent, write_streams=list(write_streams or []))
+    
+    class BatchCommitWriteStreamsResponse(SimpleNamespace):
+        def __init__(self, commit_time: Optional[datetime] = None, stream_errors: Optional[list] = None):
+            super().__init__(commit_time=commit_time, stream_errors=list(stream_errors or []))
+    
+    class StorageError(SimpleNamespace):
+        def __init__(self, code: str, entity: str, error_message: str):
+            super().__init__(code=code, entity=entity, error_message=error_message)
+
+class MockBigQueryWriteClient:
+    """BigQuery Storage Write API クライアント（BigQueryWriteClient）のMockクラス
+
+    本番と同じ呼び出し方（create_write_stream / AppendRowsStream / finalize_write_stream /
+    batch_commit_write_streams）で使用できる。pendingストリームの行はコミットされるまで
+    書き込み先テーブルに反映せず、オフセットが書き込み済み行数と一致しない追記はエラーにする。
+    """
+    
+    def __init__(self, bigquery_client: MockBigQueryClient):
+        self.bigquery_client = bigquery_client
+        self.streams: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[Any] = []
+        self.lock = threading.Lock()
+        logger.info("Mock BigQuery Write Client initialized")
+    
+    def create_write_stream(self, parent: str, write_stream: Any) -> Any:
+        """書き込みストリーム作成のMock"""
+        with self.lock:
+            name = f"{parent}/streams/{len(self.streams):05d}"
+            self.streams[name] = {
+                "parent": parent, "type": write_stream.type_, "rows": [], "message_class": None,
+                "finalized": False, "committed": False
+            }
+        logger.info(f"Mock write stream created: {name} ({MockWriteTypes.WriteStream.Type(write_stream.type_).name})")
+        return MockWriteTypes.WriteStream(type_=write_stream.type_, name=name)
+    
+    def append_rows(self, requests):
+        """行追記のMock（リクエストごとにレスポンスを返す。エラーはレスポンスのerrorで返す）"""
+        for request in requests:
+            serialized_rows = request.proto_rows.rows.serialized_rows
+            payload_bytes = sum(len(row) for row in serialized_rows)
+            self.bigquery_client.faults.apply("bigquery.append_rows", payload_bytes)
+            with self.lock:
+                self.requests.append(request)
+                stream = self.streams.get(request.write_stream)
+                error = self._append_error(stream, request, payload_bytes)
+                if error:
+                    yield MockWriteTypes.AppendRowsResponse(error=error)
+                    continue
+                if stream["message_class"] is None:
+                    stream["message_class"] = self._message_class(request.proto_rows.writer_schema.proto_descriptor)
+                offset = len(stream["rows"])
+                stream["rows"].extend(serialized_rows)
+                if stream["type"] == MockWriteTypes.WriteStream.Type.COMMITTED:
+                    self._table_rows(stream["parent"]).extend(self._decode(stream, serialized_rows))
+            yield MockWriteTypes.AppendRowsResponse(offset=offset)
+    
+    def _append_error(self, stream: Optional[Dict[str, Any]], request: Any, payload_bytes: int) -> Optional[SimpleNamespace]:
+        """追記できない場合のエラー（google.rpc.Status相当のcode・message）"""
+        if stream is None:
+            return SimpleNamespace(code="NOT_FOUND", message=f"Stream not found: {request.write_stream}")
+        if stream["finalized"]:
+            return SimpleNamespace(code="FAILED_PRECONDITION", message=f"Stream already finalized: {request.write_stream}")
+        if payload_bytes > production.BIGQUERY_APPEND_MAX_BYTES:
+            return SimpleNamespace(code="INVALID_ARGUMENT", message=f"Request exceeds {production.BIGQUERY_APPEND_MAX_BYTES} bytes: {payload_bytes}")
+        if stream["message_class"] is None and not (request.proto_rows.writer_schema and request.proto_rows.writer_schema.proto_descriptor):
+            return SimpleNamespace(code="INVALID_ARGUMENT", message="writer_schema is required in the first request")
+        if request.offset is not None and request.offset != len(stream["rows"]):
+            # 書き込み済みの範囲への再送は ALREADY_EXISTS、先の範囲は OUT_OF_RANGE（本番と同じ）
+            code = "ALREADY_EXISTS" if request.offset < len(stream["rows"]) else "OUT_OF_RANGE"
+            return SimpleNamespace(code=code, message=f"Offset mismatch: expected {len(stream['rows'])}, got {request.offset}")
+        return None
+    
+    def finalize_write_stream(self, name: str) -> Any:
+        """ストリームのファイナライズのMock（以降の追記はエラー）"""
+        with self.lock:
+            stream = self.streams[name]
+            stream["finalized"] = True
+            return MockWriteTypes.FinalizeWriteStreamResponse(row_count=len(stream["rows"]))
+    
+    def batch_commit_write_streams(self, request: Any) -> Any:
+        """pendingストリームのコミットのMock（1つでもコミットできないストリームがあれば全て反映しない）"""
+        with self.lock:
+            errors = []
+            for name in request.write_streams:
+                stream = self.streams.get(name)
+                if stream is None:
+                    errors.append(MockWriteTypes.StorageError("STREAM_NOT_FOUND", name, "Stream not found"))
+                elif stream["type"] != MockWriteTypes.WriteStream.Type.PENDING:
+                    errors.append(MockWriteTypes.StorageError("INVALID_STREAM_TYPE", name, "Only PENDING streams can be committed"))
+                elif not stream["finalized"]:
+                    errors.append(MockWriteTypes.StorageError("STREAM_NOT_FINALIZED", name, "Stream is not finalized"))
+                elif stream["committed"]:
+                    errors.append(MockWriteTypes.StorageError("STREAM_ALREADY_COMMITTED", name, "Stream is already committed"))
+            if errors:
+                return MockWriteTypes.BatchCommitWriteStreamsResponse(stream_errors=errors)
+            
+            for name in request.write_streams:
+                stream = self.streams[name]
+                stream["committed"] = True
+                self._table_rows(stream["parent"]).extend(self._decode(stream, stream["rows"]))
+                logger.info(f"Mock write stream committed: {name} ({len(stream['rows'])} rows)")
+            return MockWriteTypes.BatchCommitWriteStreamsResponse(commit_time=datetime.now(timezone.utc))
+    
+    def table_rows(self, table_path: str) -> List[Dict[str, Any]]:
+        """書き込み先テーブル（projects/.../datasets/.../tables/...）に反映済みの行"""
+        with self.lock:
+            return list(self._table_rows(table_path))
+    
+    @staticmethod
+    def _message_class(proto_descriptor: Any):
+        """writer_schemaのDescriptorProtoから行のメッセージ型を作成"""
+        file_proto = descriptor_pb2.FileDescriptorProto(name="mock_writer_schema.proto", syntax="proto2")
+        file_proto.message_type.add().CopyFrom(proto_descriptor)
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(file_proto)
+        return message_factory.GetMessageClass(pool.FindMessageTypeByName(proto_descriptor.name))
+    
+    @staticmethod
+    def _decode(stream: Dict[str, Any], serialized_rows: List[bytes]) -> List[Dict[str, Any]]:
+        return [
+            json_format.MessageToDict(stream["message_class"].FromString(row), preserving_proto_field_name=True)
+            for row in serialized_rows
+        ]
+    
+    def _table_rows(self, table_path: str) -> List[Dict[str, Any]]:
+        # projects/{project}/datasets/{dataset}/tables/{table} → project.dataset.table
+        table_id = ".".join(table_path.split("/")[1::2])
+        table = self.bigquery_client.tables.setdefault(table_id, {'schema': [], 'data': []})
+        return table['data']
+
+class MockAppendRowsStream:
+    """google.cloud.bigquery_storage_v1.writer.AppendRowsStream のMockクラス
+
+    テンプレートの書き込み先ストリームとwriter_schemaを各リクエストに補い、結果をFutureで返す。
+    """
+    
+    def __init__(self, client: MockBigQueryWriteClient, initial_request_template: Any):
+        self.client = client
+        self.template = initial_request_template
+        self.closed = False
+    
+    def send(self, request: Any) -> Future:
+        """リクエストを送信（エラーはFuture.result()で送出）"""
+        if self.closed:
+            raise RuntimeError("This AppendRowsStream has been closed")
+        full_request = MockWriteTypes.AppendRowsRequest(
+            write_stream=request.write_stream or self.template.write_stream,
+            offset=request.offset,
+            proto_rows=MockWriteTypes.AppendRowsRequest.ProtoData(
+                writer_schema=self.template.proto_rows.writer_schema,
+                rows=request.proto_rows.rows
+            )
+        )
+        future: Future = Future()
+        try:
+            response = next(self.client.append_rows(iter([full_request])))
+            if response.error:
+                raise RuntimeError(f"{response.error.code}: {response.error.message}")
+            future.set_result(response)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def close(self):
+        self.closed = True
+
+# Storage Write APIのMock（google.cloud.bigquery_storage_v1 / .writer と同じ名前で参照できるモジュール相当）
+mock_bigquery_storage = SimpleNamespace(types=MockWriteTypes, BigQueryWriteClient=MockBigQueryWriteClient)
+mock_bigquery_storage_writer = SimpleNamespace(AppendRowsStream=MockAppendRowsStream)
+
 class MockQueryResult:
     """BigQueryクエリ結果のMockクラス"""
     
@@ -285,40 +670,55 @@ class MockQueryResult:
 class MockStorageClient:
     """Cloud Storage クライアントのMockクラス"""
     
-    def __init__(self):
+    def __init__(self, faults: Optional[MockFaultInjector] = None):
         self.buckets = {}
+        self.faults = faults or MockFaultInjector(None)
         logger.info("Mock Storage Client initialized")
     
     def bucket(self, bucket_name: str):
         """バケット取得のMock"""
         if bucket_name not in self.buckets:
-            self.buckets[bucket_name] = MockBucket(bucket_name)
+            self.buckets[bucket_name] = MockBucket(bucket_name, self.faults)
         return self.buckets[bucket_name]
 
 class MockBucket:
     """Cloud Storage バケットのMockクラス"""
     
-    def __init__(self, name: str):
+    def __init__(self, name: str, faults: Optional[MockFaultInjector] = None):
         self.name = name
+        self.faults = faults or MockFaultInjector(None)
         self.blobs: Dict[str, 'MockBlob'] = {}
     
     def blob(self, blob_name: str):
         """Blob取得のMock"""
         if blob_name not in self.blobs:
-            self.blobs[blob_name] = MockBlob(blob_name, self.name)
+            self.blobs[blob_name] = MockBlob(blob_name, self.name, self)
         return self.blobs[blob_name]
+    
+    def delete_blob(self, blob_name: str):
+        """Blob削除のMock"""
+        self.faults.apply("gcs.delete")
+        if blob_name not in self.blobs:
+            raise KeyError(f"Mock blob not found: gs://{self.name}/{blob_name}")
+        del self.blobs[blob_name]
+        logger.info(f"Mock blob deleted: gs://{self.name}/{blob_name}")
 
 class MockBlob:
     """Cloud Storage BlobのMockクラス"""
     
-    def __init__(self, name: str, bucket_name: str):
+    def __init__(self, name: str, bucket_name: str, bucket: Optional[MockBucket] = None):
         self.name = name
         self.bucket_name = bucket_name
+        self.bucket = bucket
+        self.faults = bucket.faults if bucket else MockFaultInjector(None)
         self.content: Optional[str] = None
         self.content_type: Optional[str] = None
     
-    def upload_from_string(self, data: str, content_type: Optional[str] = None):
+    def upload_from_string(self, data: Union[str, bytes], content_type: Optional[str] = None):
         """文字列アップロードのMock"""
+        self.faults.apply("gcs.upload", len(data.encode('utf-8') if isinstance(data, str) else data))
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', errors='surrogateescape')
         self.content = data
         self.content_type = content_type
         
@@ -337,6 +737,24 @@ class MockBlob:
             logger.info(f"  - Header: {lines[0]}")
             if len(lines) > 2:
                 logger.info(f"  - Sample: {lines[1]}")
+    
+    def compose(self, sources: List['MockBlob']):
+        """GCS composeのMock（ソースBlobを順に連結）"""
+        self.faults.apply("gcs.compose")
+        if len(sources) > GCS_COMPOSE_MAX_SOURCES:
+            raise ValueError(f"Too many compose sources: {len(sources)} > {GCS_COMPOSE_MAX_SOURCES}")
+        if any(source.content is None for source in sources):
+            raise ValueError(f"Compose source not uploaded for gs://{self.bucket_name}/{self.name}")
+        
+        # パート境界でマルチバイト文字が分割されていても正しく連結する
+        joined = b"".join(source.content.encode('utf-8', errors='surrogateescape') for source in sources)
+        self.content = joined.decode('utf-8')
+        logger.info(f"Mock blobs composed: gs://{self.bucket_name}/{self.name} ({len(sources)} parts, {len(joined) / 1024:.2f} KB)")
+    
+    def delete(self):
+        """Blob削除のMock"""
+        if self.bucket is not None:
+            self.bucket.delete_blob(self.name)
 
 class DatabaseConfig:
     """データベース設定クラス（ハードコーディング対応）"""
@@ -355,15 +773,42 @@ class DatabaseConfig:
         self.bigquery_project = HARDCODED_CONFIG["BIGQUERY_PROJECT"]
         self.bigquery_dataset = HARDCODED_CONFIG["BIGQUERY_DATASET"]
         self.bigquery_location = HARDCODED_CONFIG["BIGQUERY_LOCATION"]
+        self.bigquery_write_max_request_bytes = HARDCODED_CONFIG["BIGQUERY_WRITE_MAX_REQUEST_BYTES"]
         
         # Cloud Storage設定
         self.gcs_bucket = HARDCODED_CONFIG["GCS_BUCKET"]
+        self.gcs_parallel_upload_threshold = HARDCODED_CONFIG["GCS_PARALLEL_UPLOAD_THRESHOLD_BYTES"]
+        self.gcs_upload_part_size = HARDCODED_CONFIG["GCS_UPLOAD_PART_SIZE_BYTES"]
+        self.gcs_upload_max_workers = HARDCODED_CONFIG["GCS_UPLOAD_MAX_WORKERS"]
         
         # 同期対象テーブル設定
         self.sync_tables = HARDCODED_CONFIG["SYNC_TABLES_CONFIG"]
+        self.fanout_shard_count = HARDCODED_CONFIG["FANOUT_SHARD_COUNT"]
+        self.profile_local_dir = HARDCODED_CONFIG["PROFILE_LOCAL_DIR"]
+        self.profile_top_n = HARDCODED_CONFIG["PROFILE_TOP_N"]
+        
+        # Mockの遅延・障害注入（環境変数 MOCK_IO_PROFILE でプリセットを上書き可能）
+        self.mock_io_profile = os.environ.get("MOCK_IO_PROFILE") or HARDCODED_CONFIG["MOCK_IO_PROFILE"]
+        self.mock_io_seed = HARDCODED_CONFIG["MOCK_IO_SEED"]
         
         logger.info(f"Configuration initialized (Mock mode: {self.use_mock})")
         logger.info(f"Target tables: {list(self.sync_tables.keys())}")
+    
+    def restrict_tables(self, table_names: List[str]):
+        """同期対象テーブルを指定されたサブセットに絞り込む"""
+        unknown = [name for name in table_names if name not in self.sync_tables]
+        if unknown:
+            raise ValueError(f"Unknown tables in SYNC_TABLES_CONFIG: {unknown}")
+        self.sync_tables = {name: self.sync_tables[name] for name in table_names}
+    
+    def enable_profiling(self, tables: Any):
+        """リクエストで指定されたテーブル（trueの場合は全テーブル）のプロファイリングを有効化"""
+        table_names = list(self.sync_tables) if tables is True else tables
+        unknown = [name for name in table_names if name not in self.sync_tables]
+        if unknown:
+            raise ValueError(f"Unknown tables in SYNC_TABLES_CONFIG: {unknown}")
+        for name in table_names:
+            self.sync_tables[name] = {**self.sync_tables[name], 'profile': True}
 
 class DataSyncManager:
     """データ同期管理クラス（Mock対応）"""
@@ -373,18 +818,24 @@ class DataSyncManager:
         self.bigquery_client: Any
         self.storage_client: Any
         self.sql_engine: Optional[MockSQLServerEngine] = None
+        self.profile_summaries: Dict[str, Dict[str, Any]] = {}
+        self.faults = MockFaultInjector(config.mock_io_profile if config.use_mock else None, config.mock_io_seed)
         
-        # MockまたはReal clientsの初期化
+        # MockまたはReal clientsの初期化（Mockは同じ注入器を共有し、操作ごとの統計を一箇所に集める）
         if config.use_mock:
-            self.bigquery_client = MockBigQueryClient(config.bigquery_project)
-            self.storage_client = MockStorageClient()
-            self.sql_engine = MockSQLServerEngine()
+            self.bigquery_client = MockBigQueryClient(config.bigquery_project, self.faults)
+            self.bigquery_write_client = MockBigQueryWriteClient(self.bigquery_client)
+            self.storage_client = MockStorageClient(self.faults)
+            self.sql_engine = MockSQLServerEngine(self.faults)
         else:
             self.bigquery_client = bigquery.Client(project=config.bigquery_project)
+            self.bigquery_write_client = None
             self.storage_client = storage.Client()
             self.sql_engine = None
         
         logger.info(f"DataSyncManager initialized (Mock: {config.use_mock})")
+        if self.faults.enabled:
+            logger.info(f"Mock IO profile enabled: {config.mock_io_profile if isinstance(config.mock_io_profile, str) else 'custom'}")
         
     def create_sql_engine(self) -> Optional[Union[sqlalchemy.engine.Engine, MockSQLServerEngine]]:
         """SQL Server接続エンジンを作成（Mock対応）"""
@@ -416,6 +867,28 @@ class DataSyncManager:
             logger.error(f"SQL Server connection engine creation error: {e}")
             raise
 
+    @contextmanager
+    def profile_phase(self, profiler: Optional[production.PhaseProfiler], phase: str):
+        """プロファイリングが有効な場合のみ、フェーズの処理を計測"""
+        if profiler is None:
+            yield
+            return
+        with profiler.profile(phase):
+            yield
+
+    def write_profile_reports(self, table_name: str, profiler: production.PhaseProfiler) -> Dict[str, Any]:
+        """フェーズごとのプロファイルをローカルディレクトリに出力し、概要を返す"""
+        report_dir = os.path.join(self.config.profile_local_dir, datetime.now(JST).strftime('%Y%m%dT%H%M%S'), table_name)
+        os.makedirs(report_dir, exist_ok=True)
+        summary: Dict[str, Any] = {}
+        for phase, report in profiler.reports.items():
+            for ext, payload in profiler.artifacts[phase].items():
+                with open(os.path.join(report_dir, f"{phase}.{ext}"), 'wb') as report_file:
+                    report_file.write(payload)
+            summary[phase] = {**report, "report": report_dir}
+        logger.info(f"Profile reports written: {report_dir}")
+        return summary
+
     def get_max_timestamp(self, df: pd.DataFrame, timestamp_column: str) -> Optional[datetime]:
         """データフレームから最大タイムスタンプを取得"""
         try:
@@ -440,6 +913,7 @@ class DataSyncManager:
 
     def sync_table(self, table_name: str, table_config: Dict[str, Any]):
         """単一テーブルの同期を実行（Mock対応）"""
+        profiler = production.PhaseProfiler(self.config.profile_top_n) if table_config.get('profile') else None
         try:
             logger.info(f"=== Table sync started: {table_name} ===")
             
@@ -452,7 +926,8 @@ class DataSyncManager:
                 logger.info(f"Table columns: {columns}")
             
             # データ抽出
-            df = self.extract_data(table_name, timestamp_column)
+            with self.profile_phase(profiler, 'extract_data'):
+                df = self.extract_data(table_name, timestamp_column)
             
             if df.empty:
                 logger.info(f"No sync target data: {table_name}")
@@ -467,23 +942,36 @@ class DataSyncManager:
                 max_ts = df[timestamp_column].max()
                 logger.info(f"  - Timestamp range: {min_ts} to {max_ts}")
             
-            # GCSに保存
-            gcs_filename = self.save_to_gcs(df, table_name)
+            if table_config.get('sink') == 'bigquery_write' and self.config.use_mock:
+                # BigQueryへ直接書き込み（コミット完了後にのみメタデータを更新）
+                with self.profile_phase(profiler, 'save_to_bigquery'):
+                    gcs_filename = self.save_to_bigquery(df, table_name, table_config.get('write_mode', 'pending'))
+            else:
+                if table_config.get('sink') == 'bigquery_write':
+                    logger.warning(f"Storage Write API sink is mock-only in dev-env, falling back to GCS: {table_name}")
+                # GCSに保存
+                with self.profile_phase(profiler, 'save_to_gcs'):
+                    gcs_filename = self.save_to_gcs(df, table_name)
             
             # 最大タイムスタンプを取得
             max_timestamp = None
             if timestamp_column:
-                max_timestamp = self.get_max_timestamp(df, timestamp_column)
+                with self.profile_phase(profiler, 'get_max_timestamp'):
+                    max_timestamp = self.get_max_timestamp(df, timestamp_column)
                 logger.info(f"Max timestamp for metadata: {max_timestamp}")
             
             # 同期メタデータを更新
-            self.update_sync_metadata(table_name, max_timestamp)
+            with self.profile_phase(profiler, 'update_sync_metadata'):
+                self.update_sync_metadata(table_name, max_timestamp)
             
             logger.info(f"=== Table sync completed: {table_name} (File: {gcs_filename}) ===")
             
         except Exception as e:
             logger.error(f"Table sync error: {table_name} - {e}")
             raise
+        finally:
+            if profiler:
+                self.profile_summaries[table_name] = self.write_profile_reports(table_name, profiler)
 
     def run_sync(self):
         """全体の同期プロセスを実行（Mock対応）"""
@@ -509,6 +997,9 @@ class DataSyncManager:
                     logger.error(f"Error occurred in table {table_name} sync: {e}")
                     sync_results.append({"table": table_name, "status": "error", "error": str(e)})
                     continue
+                finally:
+                    if table_name in self.profile_summaries:
+                        sync_results[-1]["profile"] = self.profile_summaries.pop(table_name)
             
             # 結果サマリー
             success_count = len([r for r in sync_results if r["status"] == "success"])
@@ -550,7 +1041,7 @@ class DataSyncManager:
         try:
             if self.sql_engine is None:
                 raise ValueError("SQL engine is not initialized")
-            inspector = inspect(self.sql_engine)
+            inspector = sqlalchemy.inspect(self.sql_engine)
             if inspector is None:
                 raise ValueError("Failed to create inspector")
             columns = inspector.get_columns(table_name)
@@ -626,10 +1117,14 @@ class DataSyncManager:
             df.to_csv(csv_buffer, index=False, encoding='utf-8')
             csv_content = csv_buffer.getvalue()
             
-            # GCSにアップロード（Mock対応）
-            bucket = self.storage_client.bucket(self.config.gcs_bucket)
-            blob = bucket.blob(filename)
-            blob.upload_from_string(csv_content, content_type='text/csv')
+            # GCSにアップロード（Mock対応、大きいファイルは並列マルチパート）
+            payload = csv_content.encode('utf-8')
+            if len(payload) >= self.config.gcs_parallel_upload_threshold:
+                self.upload_composite(filename, payload, content_type='text/csv')
+            else:
+                bucket = self.storage_client.bucket(self.config.gcs_bucket)
+                blob = bucket.blob(filename)
+                blob.upload_from_string(csv_content, content_type='text/csv')
             
             return filename
             
@@ -637,6 +1132,88 @@ class DataSyncManager:
             logger.error(f"GCS save error: {e}")
             raise
 
+    def save_to_bigquery(self, df: pd.DataFrame, table_name: str, write_mode: str, max_attempts: int = 3) -> str:
+        """データをStorage Write API（Mock）でBigQueryに直接書き込み、書き込み先テーブルIDを返す"""
+        table_id = f"{self.config.bigquery_project}.{self.config.bigquery_dataset}.{table_name}"
+        columns = [str(column) for column in df.columns]
+        bigquery_types = [self.bigquery_type_of(df[column]) for column in df.columns]
+        # NaN/NaTはNULLとして書き込む
+        rows = [
+            tuple(None if pd.isna(value) else value for value in row)
+            for row in df.astype(object).itertuples(index=False, name=None)
+        ]
+        
+        sink = production.StorageWriteSink(
+            self.bigquery_write_client,
+            f"projects/{self.config.bigquery_project}/datasets/{self.config.bigquery_dataset}/tables/{table_name}",
+            columns,
+            bigquery_types,
+            mode=write_mode,
+            max_request_bytes=self.config.bigquery_write_max_request_bytes,
+            storage_module=mock_bigquery_storage,
+            writer_module=mock_bigquery_storage_writer
+        )
+        for attempt in range(1, max_attempts + 1):
+            try:
+                stream_name = sink.write(rows)
+                break
+            except (ConnectionError, TimeoutError) as e:
+                # 未コミットのpendingストリームは破棄されるため、新しいストリームで最初からやり直せる
+                # （committedは追記済みの行が既に反映されているため、再実行すると重複する）
+                if write_mode != 'pending' or attempt == max_attempts:
+                    raise
+                logger.warning(f"Storage Write API (mock) retry {attempt}/{max_attempts - 1}: {table_id} - {e}")
+        
+        logger.info(f"Storage Write API (mock) wrote {len(rows)} rows to {table_id} ({write_mode}, stream: {stream_name})")
+        return table_id
+
+    @staticmethod
+    def bigquery_type_of(series: pd.Series) -> str:
+        """pandasの列の型からBigQueryの型を判定"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return 'TIMESTAMP'
+        if pd.api.types.is_bool_dtype(series):
+            return 'BOOL'
+        if pd.api.types.is_integer_dtype(series):
+            return 'INT64'
+        if pd.api.types.is_float_dtype(series):
+            return 'FLOAT64'
+        return 'STRING'
+
+    def upload_composite(self, filename: str, payload: bytes, content_type: str) -> None:
+        """分割したパートを並列アップロードし、GCS composeで最終オブジェクトに結合（Mock対応）"""
+        bucket = self.storage_client.bucket(self.config.gcs_bucket)
+        
+        # compose上限を超えないようにパートサイズを調整
+        part_size = max(
+            self.config.gcs_upload_part_size,
+            math.ceil(len(payload) / GCS_COMPOSE_MAX_SOURCES)
+        )
+        chunks = [payload[i:i + part_size] for i in range(0, len(payload), part_size)]
+        parts = [bucket.blob(f"{filename}.parts/{index:05d}") for index in range(len(chunks))]
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.gcs_upload_max_workers) as executor:
+                futures = [
+                    executor.submit(part.upload_from_string, chunk, content_type=content_type)
+                    for part, chunk in zip(parts, chunks)
+                ]
+                for future in futures:
+                    future.result()
+            
+            final_blob = bucket.blob(filename)
+            final_blob.content_type = content_type
+            final_blob.compose(parts)
+            
+            logger.info(f"Parallel upload composed: gs://{self.config.gcs_bucket}/{filename} ({len(parts)} parts)")
+        finally:
+            # 一時パートは成功・失敗にかかわらず削除
+            for part in parts:
+                try:
+                    part.delete()
+                except Exception as e:
+                    logger.warning(f"Temporary part deletion error: {part.name} - {e}")
+
     def update_sync_metadata(self, table_name: str, max_timestamp: Optional[datetime]):
         """同期メタデータを更新（Mock対応）"""
         try:
@@ -683,7 +1260,11 @@ class DataSyncManager:
                 ON target.table_name = source.table_name
                 WHEN MATCHED THEN
                     UPDATE SET 
-                        last_sync_time = source.last_sync_time,
+                        -- 遅れて完了した実行が古い時刻で上書きしてもウォーターマークを戻さない
+                        last_sync_time = GREATEST(
+                            IFNULL(target.last_sync_time, source.last_sync_time),
+                            IFNULL(source.last_sync_time, target.last_sync_time)
+                        ),
                         updated_at = source.updated_at
                 WHEN NOT MATCHED THEN
                     INSERT (table_name, last_sync_time, updated_at)
@@ -814,6 +1395,65 @@ class DataSyncManager:
             logger.warning(f"Last sync time retrieval error (Table: {table_name}): {e}")
             return None
 
+def split_shards(config: DatabaseConfig) -> List[List[str]]:
+    """同期対象テーブルをラウンドロビンでシャードに分割"""
+    table_names = list(config.sync_tables.keys())
+    shard_count = max(1, min(config.fanout_shard_count, len(table_names)))
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    for index, table_name in enumerate(table_names):
+        shards[index % shard_count].append(table_name)
+    return [shard for shard in shards if shard]
+
+def run_shard_locally(table_names: List[str], profile_tables: Optional[List[str]] = None,
+                      mock_io_profile: Any = None) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """プロセスプール用: 指定テーブルのみを同期（リモートインスタンスの代替）し、結果とMockのI/O統計を返す"""
+    config = DatabaseConfig()
+    config.restrict_tables(table_names)
+    if profile_tables:
+        config.enable_profiling(profile_tables)
+    if mock_io_profile:
+        config.mock_io_profile = mock_io_profile
+    sync_manager = DataSyncManager(config)
+    sync_results = sync_manager.run_sync()
+    return sync_results, sync_manager.faults.report() if sync_manager.faults.enabled else {}
+
+def dispatch_fanout(config: DatabaseConfig) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """シャードをプロセスプールで並列実行し、テーブルごとの結果とシャード全体のMockのI/O統計を集約"""
+    shards = split_shards(config)
+    logger.info(f"Fan-out execution started: {len(shards)} shards (process pool)")
+    
+    sync_results: List[Dict[str, Any]] = []
+    mock_io_reports: List[Dict[str, Dict[str, Any]]] = []
+    # 本番と同じ起動方式（PROCESS_START_METHOD、既定はforkserver）でシャードを実行
+    with production.create_process_pool(len(shards)) as executor:
+        futures = [
+            (shard, executor.submit(run_shard_locally, shard,
+                                    [name for name in shard if config.sync_tables[name].get('profile')],
+                                    config.mock_io_profile))
+            for shard in shards
+        ]
+        for shard, future in futures:
+            try:
+                shard_results, mock_io_report = future.result()
+                sync_results.extend(shard_results)
+                mock_io_reports.append(mock_io_report)
+            except Exception as e:
+                logger.error(f"Shard execution error: {shard} - {e}")
+                sync_results.extend(
+                    {"table": table_name, "status": "error", "error": str(e)} for table_name in shard
+                )
+    return sync_results, MockFaultInjector.merge_reports(mock_io_reports)
+
+def get_request_options(request) -> Dict[str, Any]:
+    """リクエストボディ(JSON)から実行オプションを取得"""
+    if request is None:
+        return {}
+    try:
+        body = request.get_json(silent=True)
+    except TypeError:
+        body = request.get_json()
+    return body or {}
+
 def main(request=None):
     """Cloud Function エントリーポイント（Mock対応）"""
     try:
@@ -821,6 +1461,16 @@ def main(request=None):
         
         # 設定を読み込み
         config = DatabaseConfig()
+        options = get_request_options(request)
+        if options.get('tables'):
+            # ワーカーとして呼ばれた場合は指定テーブルのみ同期
+            config.restrict_tables(options['tables'])
+        if options.get('profile'):
+            # true: 全テーブル / ["orders", ...]: 指定テーブルのみプロファイリング
+            config.enable_profiling(options['profile'])
+        if options.get('mock_io'):
+            # "production" / "flaky" などのプリセット名、または操作ごとの設定dict
+            config.mock_io_profile = options['mock_io']
         
         # 設定情報をログ出力
         logger.info("Configuration loaded:")
@@ -830,9 +1480,16 @@ def main(request=None):
         logger.info(f"  - GCS bucket: {config.gcs_bucket}")
         logger.info(f"  - SQL Server host: {config.sql_server_host}")
         
-        # 同期マネージャーを初期化して実行
-        sync_manager = DataSyncManager(config)
-        sync_results = sync_manager.run_sync()
+        mock_io_report = None
+        if options.get('mode') == 'fanout' and not options.get('tables'):
+            # コーディネーターとしてシャードをプロセスプールに分配
+            sync_results, mock_io_report = dispatch_fanout(config)
+        else:
+            # 同期マネージャーを初期化して実行
+            sync_manager = DataSyncManager(config)
+            sync_results = sync_manager.run_sync()
+            if sync_manager.faults.enabled:
+                mock_io_report = sync_manager.faults.report()
         
         # 結果レスポンス作成
         mode = "Mock mode" if config.use_mock else "Real mode"
@@ -849,6 +1506,8 @@ def main(request=None):
             },
             "details": sync_results
         }
+        if mock_io_report:
+            response["mock_io"] = mock_io_report
         
         logger.info("Cloud Function execution completed successfully")
         return response
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+インポート時間プロファイルレポート
+
+`python -X importtime` の出力を集計し、コールドスタート時のインポートコストを表示します。
+
+使用方法:
+    python importtime_report.py                          # main.py を計測
+    python importtime_report.py --module main_hardcoded  # カレントディレクトリの任意モジュールを計測
+    python importtime_report.py --top 30 --json          # JSON形式で出力（継続的な記録用）
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+
+def measure_import(module_name: str) -> List[Dict[str, object]]:
+    """別プロセスで -X importtime 付きでモジュールをインポートし、計測結果を取得"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=os.getcwd(),
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"モジュールのインポートに失敗しました: {module_name}\n{completed.stderr}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        # 形式: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return entries
+
+
+def build_report(module_name: str, entries: List[Dict[str, object]], top: int) -> Dict[str, object]:
+    """トップレベルのインポートと累積時間上位のモジュールを集計"""
+    top_level = [entry for entry in entries if entry["depth"] == 0]
+    return {
+        "module": module_name,
+        "python": sys.version.split()[0],
+        "total_ms": round(sum(entry["cumulative_ms"] for entry in top_level), 3),
+        "module_count": len(entries),
+        "top_level": sorted(top_level, key=lambda e: e["cumulative_ms"], reverse=True)[:top],
+        "top_self": sorted(entries, key=lambda e: e["self_ms"], reverse=True)[:top]
+    }
+
+
+def print_report(report: Dict[str, object]):
+    """レポートを表形式で出力"""
+    print(f"Import time report: {report['module']} (Python {report['python']})")
+    print(f"  Total: {report['total_ms']:.1f} ms / {report['module_count']} modules")
+    print()
+    print("  Top-level imports (cumulative):")
+    for entry in report["top_level"]:
+        print(f"    {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+    print()
+    print("  Slowest modules (self):")
+    for entry in report["top_self"]:
+        print(f"    {entry['self_ms']:>9.1f} ms  {entry['module']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="python -X importtime の集計レポート")
+    parser.add_argument("--module", default="main", help="計測するモジュール名")
+    parser.add_argument("--top", type=int, default=15, help="表示する件数")
+    parser.add_argument("--json", action="store_true", help="JSON形式で出力")
+    args = parser.parse_args()
+
+    report = build_report(args.module, measure_import(args.module), args.top)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
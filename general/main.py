@@ -1,22 +1,718 @@
 import os
 import csv
 import io
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+import json
+import math
+import base64
+import hashlib
+import itertools
+import random
+import signal
+import sys
+import time
+import queue
+import threading
+import importlib
+import marshal
+import multiprocessing
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import quote
 import pytz
-import pymssql
-from google.cloud import bigquery
-from google.cloud import storage
-from google.cloud.sql.connector import Connector
-from google.cloud import logging
 
-# Cloud Logging設定
-logging_client = logging.Client()
-logging_client.setup_logging()
+class LazyModule:
+    """初回の属性アクセス時にモジュールをインポートする遅延ローダー（コールドスタート短縮用）"""
+    
+    def __init__(self, module_name: str):
+        self._module_name = module_name
+        self._module = None
+    
+    def __getattr__(self, name: str) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, name)
+
+# 重いライブラリは実際に使用するまでインポートしない
+pymssql = LazyModule('pymssql')
+requests = LazyModule('requests')
+bigquery = LazyModule('google.cloud.bigquery')
+storage = LazyModule('google.cloud.storage')
+cloud_logging = LazyModule('google.cloud.logging')
+google_auth_requests = LazyModule('google.auth.transport.requests')
+google_id_token = LazyModule('google.oauth2.id_token')
+google_exceptions = LazyModule('google.api_core.exceptions')
+bigquery_storage = LazyModule('google.cloud.bigquery_storage_v1')
+bigquery_storage_writer = LazyModule('google.cloud.bigquery_storage_v1.writer')
+descriptor_pb2 = LazyModule('google.protobuf.descriptor_pb2')
+descriptor_pool = LazyModule('google.protobuf.descriptor_pool')
+message_factory = LazyModule('google.protobuf.message_factory')
+cProfile = LazyModule('cProfile')
+pstats = LazyModule('pstats')
+
+# Cloud Loggingクライアント（初回使用時に作成）
+_logging_client = None
+
+def get_logging_client():
+    """Cloud Loggingクライアントを取得（初回呼び出し時に作成してsetup_loggingを実行）"""
+    global _logging_client
+    if _logging_client is None:
+        _logging_client = cloud_logging.Client()
+        _logging_client.setup_logging()
+    return _logging_client
+
+class BatchingLogger:
+    """ログをバッファリングし、バックグラウンドスレッドでまとめてCloud Loggingに送信するロガー"""
+    
+    _FLUSH = object()
+    _STOP = object()
+    
+    def __init__(self, logger, batch_size: int = 50, flush_interval: float = 1.0):
+        self._logger = logger
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-batcher", daemon=True)
+        self._thread.start()
+    
+    def log_text(self, text: str, severity: str = "DEFAULT"):
+        """ログエントリをキューに追加（API呼び出しは行わない）"""
+        self._queue.put((text, severity))
+    
+    def flush(self):
+        """キュー内の全エントリが送信されるまで待機"""
+        self._queue.put(self._FLUSH)
+        self._queue.join()
+    
+    def close(self):
+        """残りのエントリを送信してバックグラウンドスレッドを停止"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            entries = []
+            consumed = 1
+            stop = False
+            deadline = time.monotonic() + self._flush_interval
+            
+            # 件数上限・時間上限・flush要求のいずれかでバッチを確定
+            while True:
+                if item is self._STOP:
+                    stop = True
+                    break
+                if item is self._FLUSH:
+                    break
+                entries.append(item)
+                remaining = deadline - time.monotonic()
+                if len(entries) >= self._batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                    consumed += 1
+                except queue.Empty:
+                    break
+            
+            self._commit(entries)
+            for _ in range(consumed):
+                self._queue.task_done()
+            if stop:
+                return
+    
+    def _commit(self, entries: List[tuple]):
+        if not entries:
+            return
+        try:
+            batch = self._logger.batch()
+            for text, severity in entries:
+                batch.log_text(text, severity=severity)
+            batch.commit()
+        except Exception as e:
+            # ログ送信の失敗で同期処理を止めないよう、標準エラー出力に退避
+            print(f"Cloud Loggingへのバッチ送信エラー: {e}", file=sys.stderr)
+            for text, severity in entries:
+                print(f"[{severity}] {text}", file=sys.stderr)
+
+# 同期処理用ロガー（プロセスごとに1つ作成）
+_sync_logger: Optional[BatchingLogger] = None
+_sync_logger_pid: Optional[int] = None
+
+def get_sync_logger() -> BatchingLogger:
+    """同期処理用のバッチロガーを取得（fork後の子プロセスでは作り直す）"""
+    global _sync_logger, _sync_logger_pid
+    if _sync_logger is None or _sync_logger_pid != os.getpid():
+        _sync_logger = BatchingLogger(
+            get_logging_client().logger('data_sync'),
+            batch_size=int(os.environ.get('LOG_BATCH_SIZE', '50')),
+            flush_interval=float(os.environ.get('LOG_FLUSH_INTERVAL_SECONDS', '1.0'))
+        )
+        _sync_logger_pid = os.getpid()
+    return _sync_logger
 
 # JST タイムゾーン
 JST = pytz.timezone('Asia/Tokyo')
 
+# GCS composeで一度に結合できるオブジェクト数の上限
+GCS_COMPOSE_MAX_SOURCES = 32
+
+# プロセスプールの起動方式（ロガー・リースのスレッドやクライアントが存在する状態でforkしないようforkserverを既定とする）
+PROCESS_START_METHOD = os.environ.get('PROCESS_START_METHOD', 'forkserver')
+
+# SQL Serverのタイムゾーンなし日時をどのタイムゾーンとして扱うか
+SOURCE_TIMEZONE = pytz.timezone(os.environ.get('SQL_SERVER_TIMEZONE', 'UTC'))
+
+# CSVでNULLを表す文字列（空文字の場合はBigQueryの既定と同じ空フィールド）
+CSV_NULL_MARKER = os.environ.get('CSV_NULL_MARKER', '')
+
+# SQL Serverのデータ型 → CSV値エンコーダー名
+SQL_TYPE_ENCODERS = {
+    'datetime': 'datetime', 'datetime2': 'datetime', 'smalldatetime': 'datetime', 'datetimeoffset': 'datetime',
+    'date': 'date', 'time': 'time',
+    'decimal': 'decimal', 'numeric': 'decimal', 'money': 'decimal', 'smallmoney': 'decimal',
+    'float': 'float', 'real': 'float',
+    'bit': 'bool',
+    'binary': 'bytes', 'varbinary': 'bytes', 'image': 'bytes', 'timestamp': 'bytes', 'rowversion': 'bytes',
+    'uniqueidentifier': 'str',
+    'tinyint': 'identity', 'smallint': 'identity', 'int': 'identity', 'bigint': 'identity',
+    'char': 'identity', 'varchar': 'identity', 'text': 'identity',
+    'nchar': 'identity', 'nvarchar': 'identity', 'ntext': 'identity',
+}
+
+# SQL Serverのデータ型 → BigQueryの型（Storage Write APIの書き込み先テーブル用、未定義の型はSTRING）
+SQL_TYPE_BIGQUERY = {
+    'datetime': 'TIMESTAMP', 'datetime2': 'TIMESTAMP', 'smalldatetime': 'TIMESTAMP', 'datetimeoffset': 'TIMESTAMP',
+    'date': 'DATE', 'time': 'TIME',
+    'decimal': 'BIGNUMERIC', 'numeric': 'BIGNUMERIC', 'money': 'BIGNUMERIC', 'smallmoney': 'BIGNUMERIC',
+    'float': 'FLOAT64', 'real': 'FLOAT64',
+    'bit': 'BOOL',
+    'binary': 'BYTES', 'varbinary': 'BYTES', 'image': 'BYTES', 'timestamp': 'BYTES', 'rowversion': 'BYTES',
+    'tinyint': 'INT64', 'smallint': 'INT64', 'int': 'INT64', 'bigint': 'INT64',
+}
+
+# BigQueryの型 → Storage Write APIのprotoフィールド型（TIMESTAMPはエポックマイクロ秒、DATEはエポック日数）
+BIGQUERY_PROTO_TYPES = {
+    'INT64': 'TYPE_INT64', 'TIMESTAMP': 'TYPE_INT64', 'DATE': 'TYPE_INT32',
+    'FLOAT64': 'TYPE_DOUBLE', 'BOOL': 'TYPE_BOOL', 'BYTES': 'TYPE_BYTES',
+}
+
+# Storage Write APIの1リクエストあたりの上限（10MB）
+BIGQUERY_APPEND_MAX_BYTES = 10 * 1024 * 1024
+
+# SQL_SOURCES_CONFIG未指定時のソース名（メタデータのキーやオブジェクト名にソース名を付けない）
+DEFAULT_SOURCE = 'default'
+
+# 抽出時に指定可能なトランザクション分離レベル
+ISOLATION_LEVELS = ('READ UNCOMMITTED', 'READ COMMITTED', 'REPEATABLE READ', 'SNAPSHOT', 'SERIALIZABLE')
+
+# LOBカラム（(MAX)型・旧LOB型）の扱い: そのまま | 先頭のみ | GCSへ退避して参照に置換 | 除外
+LOB_MODES = ('inline', 'truncate', 'offload', 'exclude')
+
+# サイズ上限（CHARACTER_MAXIMUM_LENGTH）を持たないLOB型
+LOB_TYPES = ('text', 'ntext', 'image', 'xml')
+
+# 1文字2バイトで格納されるLOB型（SUBSTRINGの長さは文字数で指定する）
+LOB_UNICODE_TYPES = ('nvarchar', 'ntext', 'xml')
+
+# GCSへの分割アップロードのchunk_sizeはこのバイト数の倍数
+GCS_CHUNK_ALIGN = 256 * 1024
+
+# 整合性チェックのキー列: SQL Serverのデータ型 → (SQL Server, BigQuery) で同じ文字列になる式
+# 10進数・浮動小数点・バイナリ等は両者の文字列表現を一致させられないため、キーに含むテーブルは件数のみ比較する
+RECONCILE_KEY_EXPRESSIONS = {
+    **dict.fromkeys(
+        ('tinyint', 'smallint', 'int', 'bigint'),
+        ("CAST({column} AS NVARCHAR(20))", "CAST({column} AS STRING)")
+    ),
+    **dict.fromkeys(
+        ('char', 'varchar', 'nchar', 'nvarchar'),
+        ("CAST({column} AS NVARCHAR(4000))", "CAST({column} AS STRING)")
+    ),
+    'bit': ("CAST({column} AS NVARCHAR(1))", "CAST(CAST({column} AS INT64) AS STRING)"),
+    'uniqueidentifier': ("LOWER(CAST({column} AS NVARCHAR(36)))", "LOWER(CAST({column} AS STRING))"),
+    'date': ("CONVERT(NVARCHAR(10), {column}, 23)", "CAST({column} AS STRING)"),
+    # タイムゾーンなし日時はソースのタイムゾーンでのエポック秒（タイムスタンプ列と同じ規則）
+    **dict.fromkeys(
+        ('datetime', 'datetime2', 'smalldatetime'),
+        ("CAST(DATEDIFF_BIG(SECOND, '19700101', {column}) AS NVARCHAR(20))",
+         "CAST(UNIX_SECONDS(TIMESTAMP(DATETIME({column}, '{tz}'))) AS STRING)")
+    ),
+}
+
+def is_transient_error(error: Exception) -> bool:
+    """リトライで回復が見込める一時的なエラーかどうかを判定"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    
+    # SQL Server: 接続断・タイムアウトなど
+    if type(error).__module__.startswith(('pymssql', '_mssql')) and type(error).__name__ in ('OperationalError', 'InterfaceError'):
+        return True
+    
+    # GCS / BigQuery: 429, 5xx, レート制限
+    if type(error).__module__.startswith('google.'):
+        transient_types = (
+            google_exceptions.TooManyRequests,
+            google_exceptions.InternalServerError,
+            google_exceptions.BadGateway,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.GatewayTimeout,
+        )
+        if isinstance(error, transient_types):
+            return True
+        if isinstance(error, google_exceptions.Forbidden):
+            reasons = [detail.get('reason') for detail in getattr(error, 'errors', None) or []]
+            return 'rateLimitExceeded' in reasons
+    
+    return False
+
+def create_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """PROCESS_START_METHODで子プロセスを起動するプロセスプールを作成"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+
+def estimate_row_bytes(rows: List[tuple], sample_size: int = 100) -> float:
+    """サンプル行から1行あたりのCSV換算バイト数を概算"""
+    if not rows:
+        return 0.0
+    step = max(1, len(rows) // sample_size)
+    sample = rows[::step][:sample_size]
+    total = sum(sum(len(str(value)) for value in row if value is not None) + len(row) for row in sample)
+    return total / len(sample)
+
+class BatchSizeTuner:
+    """行幅と実測スループットから抽出バッチサイズを調整"""
+    
+    def __init__(self, initial_rows: int, min_rows: int, max_rows: int,
+                 target_bytes: int, target_seconds: float, query_timeout: float = 0,
+                 encode_seconds_per_byte: float = 0.0):
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.query_timeout = query_timeout
+        self.encode_seconds_per_byte = encode_seconds_per_byte
+        self.batch_rows = self._clamp(initial_rows)
+        self.history: List[int] = []
+    
+    def _clamp(self, rows: float) -> int:
+        return int(max(self.min_rows, min(self.max_rows, rows)))
+    
+    def observe(self, rows: int, row_bytes: float, fetch_seconds: float):
+        """バッチの実測値から次のバッチサイズを決定"""
+        self.history.append(self.batch_rows)
+        if rows <= 0 or row_bytes <= 0:
+            return
+        
+        # バイト数の目標: 幅の広い行ほど小さいバッチにする
+        size_by_bytes = self.target_bytes / row_bytes
+        
+        # 処理時間の目標: 取得時間にエンコード時間の見積もりを加えたスループットで換算
+        batch_seconds = fetch_seconds + rows * row_bytes * self.encode_seconds_per_byte
+        rows_per_second = rows / max(batch_seconds, 1e-3)
+        size_by_latency = rows_per_second * self.target_seconds
+        
+        candidate = min(size_by_bytes, size_by_latency)
+        # クエリタイムアウトに近づいた場合は半分以下に縮小
+        if self.query_timeout and fetch_seconds > self.query_timeout * 0.5:
+            candidate = min(candidate, self.batch_rows / 2)
+        # 拡大は1回あたり2倍まで（往復回数が支配的な場合に段階的に拡大）
+        self.batch_rows = self._clamp(min(candidate, self.batch_rows * 2))
+    
+    def report(self) -> Dict[str, Any]:
+        """テーブル結果に含めるバッチサイズの要約"""
+        if not self.history:
+            return {"batches": 0}
+        return {
+            "batches": len(self.history),
+            "initial_rows": self.history[0],
+            "final_rows": self.history[-1],
+            "min_rows": min(self.history),
+            "max_rows": max(self.history)
+        }
+
+class AdaptivePollInterval:
+    """テーブルの変更頻度（行/秒）からサービスモードの次のポーリング間隔を決定"""
+    
+    def __init__(self, min_seconds: float, max_seconds: float, target_rows: int):
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.target_rows = target_rows
+        self.interval = min_seconds
+        self.rows_per_second = 0.0
+    
+    def observe(self, rows: int, elapsed: float):
+        """前回ポーリングからの経過時間と取得行数で変更頻度を更新"""
+        observed = rows / max(elapsed, 1e-3)
+        # 変更頻度は指数移動平均で平滑化（一時的なバーストで間隔が振れないようにする）
+        self.rows_per_second = 0.5 * self.rows_per_second + 0.5 * observed if self.rows_per_second else observed
+        
+        # 1回のポーリングで目標行数程度を取得できる間隔（変更がなければ上限へ）
+        candidate = self.target_rows / self.rows_per_second if self.rows_per_second > 0 else self.max_seconds
+        # 延長は1回あたり2倍まで、短縮は即時
+        self.interval = max(self.min_seconds, min(self.max_seconds, candidate, self.interval * 2))
+
+def current_rss_bytes() -> int:
+    """現在の常駐メモリ（RSS）をバイト単位で取得（/procがない環境では最大RSS）"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# tracemalloc・cProfileはプロセス全体で共有されるため、並列に同期するテーブルのフェーズ計測は1つずつ行う
+PROFILE_LOCK = threading.Lock()
+
+class PhaseProfiler:
+    """同期フェーズごとのCPUプロファイル（cProfile）とメモリ使用量（tracemalloc・RSS）を取得"""
+    
+    def __init__(self, top: int = 15):
+        self.top = top
+        self.reports: Dict[str, Dict[str, Any]] = {}
+        self.artifacts: Dict[str, Dict[str, bytes]] = {}
+    
+    @contextmanager
+    def profile(self, phase: str):
+        """ブロック内の処理を計測し、フェーズ名でレポートを保持（他のスレッドの計測中は終了を待つ）"""
+        with PROFILE_LOCK:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            rss_before = current_rss_bytes()
+            profiler = cProfile.Profile()
+            started = time.monotonic()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                elapsed = time.monotonic() - started
+                _, peak = tracemalloc.get_traced_memory()
+                allocations = tracemalloc.take_snapshot().compare_to(before, 'lineno')[:self.top]
+                if started_tracing:
+                    tracemalloc.stop()
+                self.record(phase, profiler, elapsed, peak, current_rss_bytes() - rss_before, allocations)
+    
+    def record(self, phase: str, profiler, elapsed: float, peak: int, rss_delta: int, allocations: list):
+        """計測結果をJSONで返せる概要と、GCSに保存するレポート本体に分けて保持"""
+        text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=text)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        text.write("\nTop allocations (tracemalloc, size diff):\n")
+        for allocation in allocations:
+            text.write(f"{allocation}\n")
+        
+        # 自己時間の長い関数をホットスポットとして抽出
+        hotspots = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:5]
+        self.reports[phase] = {
+            "seconds": round(elapsed, 3),
+            "peak_traced_bytes": peak,
+            "rss_delta_bytes": rss_delta,
+            "hotspots": [
+                {
+                    "function": f"{name} ({os.path.basename(filename)}:{line})",
+                    "calls": calls,
+                    "self_seconds": round(self_time, 4),
+                    "cumulative_seconds": round(cumulative, 4)
+                }
+                for (filename, line, name), (_, calls, self_time, cumulative, _) in hotspots
+            ],
+            "top_allocations": [
+                {
+                    "location": f"{allocation.traceback[0].filename}:{allocation.traceback[0].lineno}",
+                    "size_diff_bytes": allocation.size_diff,
+                    "count_diff": allocation.count_diff
+                }
+                for allocation in allocations[:5]
+            ]
+        }
+        # .profはpstats.Stats/snakevizでそのまま読み込める形式
+        self.artifacts[phase] = {
+            "prof": marshal.dumps(stats.stats),
+            "txt": text.getvalue().encode('utf-8')
+        }
+
+class RowBatch:
+    """抽出データ（カラムヘッダーを全行で共有し、各行はタプルで保持）"""
+    
+    def __init__(self, columns: List[str], rows: List[tuple], column_types: Optional[Dict[str, str]] = None):
+        self.columns = columns
+        self.rows = rows
+        self.column_types = column_types or {}
+    
+    def encoder_names(self) -> List[str]:
+        """カラムごとのCSV値エンコーダー名（型が不明な列は値の型から判定）"""
+        return [SQL_TYPE_ENCODERS.get(self.column_types.get(column, '').lower(), 'auto') for column in self.columns]
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def column_index(self, column_name: str) -> Optional[int]:
+        """カラム名から行タプル内の位置を取得"""
+        try:
+            return self.columns.index(column_name)
+        except ValueError:
+            return None
+
+def to_utc_datetime(value: datetime) -> datetime:
+    """日時をUTCに変換（タイムゾーンなしはSOURCE_TIMEZONEとして扱う）"""
+    if value.tzinfo is None:
+        value = SOURCE_TIMEZONE.localize(value)
+    return value.astimezone(timezone.utc)
+
+def encode_datetime(value: datetime) -> str:
+    """日時をUTCのISO-8601形式に変換（タイムゾーンなしはSOURCE_TIMEZONEとして扱う）"""
+    return to_utc_datetime(value).isoformat()
+
+def encode_auto(value: Any) -> Any:
+    """型情報がない列: 値の型に応じてエンコード"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        return encode_datetime(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    if type(value).__name__ == 'Decimal':
+        return format(value, 'f')
+    return value
+
+VALUE_ENCODERS = {
+    'datetime': encode_datetime,
+    'date': lambda value: value.isoformat(),
+    'time': lambda value: value.isoformat(),
+    'decimal': lambda value: format(value, 'f'),
+    'float': repr,
+    'bool': lambda value: 'true' if value else 'false',
+    'bytes': lambda value: base64.b64encode(value).decode('ascii'),
+    'str': str,
+    'auto': encode_auto,
+}
+
+def compile_row_encoder(encoder_names: List[str]):
+    """カラムごとのエンコーダーを1つの行変換関数にまとめる（列ごとのエンコーダーの選択は一度だけ行う）"""
+    null = CSV_NULL_MARKER or None
+    # 変換不要な列（identity）はNoneとし、NULL以外の値はそのまま出力する
+    encoders = [(index, None if name == 'identity' else VALUE_ENCODERS[name]) for index, name in enumerate(encoder_names)]
+    
+    def encode_row(row: tuple) -> tuple:
+        return tuple(
+            null if row[index] is None else row[index] if encode is None else encode(row[index])
+            for index, encode in encoders
+        )
+    return encode_row
+
+def encode_csv_batch(rows: List[tuple]) -> str:
+    """行タプルのバッチをCSV文字列にエンコード（プロセスプールから呼び出し可能）"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def encode_csv_batch_with_stats(rows: List[tuple], stat_indexes: List[int],
+                                encoder_names: Optional[List[str]] = None) -> Tuple[str, Dict[int, list]]:
+    """CSVエンコードと同時に指定カラムの最小値・最大値を集計（プロセスプールから呼び出し可能）"""
+    stats: Dict[int, list] = {}
+    for index in stat_indexes:
+        # 日時はCSVと同じUTCの値で集計し、マニフェストの範囲とファイルの内容を一致させる
+        values = [
+            to_utc_datetime(row[index]) if isinstance(row[index], datetime) else row[index]
+            for row in rows if row[index] is not None
+        ]
+        try:
+            if values:
+                stats[index] = [min(values), max(values)]
+        except TypeError:
+            # 比較できない値が混在する列は統計を省略
+            continue
+    if encoder_names:
+        row_encoder = compile_row_encoder(encoder_names)
+        rows = [row_encoder(row) for row in rows]
+    return encode_csv_batch(rows), stats
+
+def encode_timestamp_micros(value: datetime) -> int:
+    """日時をUTCエポックからのマイクロ秒に変換（タイムゾーンなしはSOURCE_TIMEZONEとして扱う）"""
+    if value.tzinfo is None:
+        value = SOURCE_TIMEZONE.localize(value)
+    return (value - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+BIGQUERY_VALUE_CONVERTERS = {
+    'INT64': int,
+    'FLOAT64': float,
+    'BOOL': bool,
+    'BYTES': bytes,
+    'TIMESTAMP': encode_timestamp_micros,
+    'DATE': lambda value: (value - date(1970, 1, 1)).days,
+    'TIME': lambda value: value.isoformat(),
+    'BIGNUMERIC': lambda value: format(value, 'f'),
+    'STRING': lambda value: str(encode_auto(value)),
+}
+
+class StorageWriteSink:
+    """BigQuery Storage Write APIで行を直接書き込むシンク
+
+    committed: 追記した行はすぐに参照可能になる
+    pending: コミットするまで行は参照されず、失敗時はストリームごと破棄される（全件か0件）
+    """
+    
+    def __init__(self, write_client, table_path: str, columns: List[str], bigquery_types: List[str],
+                 mode: str = 'pending', max_request_bytes: int = 8 * 1024 * 1024,
+                 storage_module: Any = None, writer_module: Any = None):
+        if mode not in ('committed', 'pending'):
+            raise ValueError(f"write_modeはcommittedまたはpendingを指定してください: {mode}")
+        self.write_client = write_client
+        # bigquery_storage_v1 / .writer と同じインターフェースのMock（dev-env）を渡すと同じ手順で実行できる
+        self.storage_module = storage_module or bigquery_storage
+        self.writer_module = writer_module or bigquery_storage_writer
+        self.table_path = table_path
+        self.mode = mode
+        self.max_request_bytes = min(max_request_bytes, BIGQUERY_APPEND_MAX_BYTES)
+        self.converters = [BIGQUERY_VALUE_CONVERTERS[bigquery_type] for bigquery_type in bigquery_types]
+        self.descriptor, self.message_class = self.build_row_message(columns, bigquery_types)
+        self.columns = columns
+        self.bytes_written = 0
+    
+    @staticmethod
+    def build_row_message(columns: List[str], bigquery_types: List[str]):
+        """カラム定義から行のprotoメッセージ型を動的に作成"""
+        file_proto = descriptor_pb2.FileDescriptorProto(name="sync_row.proto", syntax="proto2")
+        message = file_proto.message_type.add(name="SyncRow")
+        for number, (column, bigquery_type) in enumerate(zip(columns, bigquery_types), start=1):
+            message.field.add(
+                name=column,
+                number=number,
+                label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL,
+                type=getattr(descriptor_pb2.FieldDescriptorProto, BIGQUERY_PROTO_TYPES.get(bigquery_type, 'TYPE_STRING'))
+            )
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(file_proto)
+        return message, message_factory.GetMessageClass(pool.FindMessageTypeByName("SyncRow"))
+    
+    def serialize_rows(self, rows: List[tuple]):
+        """行をシリアライズし、リクエスト上限に収まる単位で返す"""
+        chunk, chunk_bytes = [], 0
+        for row in rows:
+            message = self.message_class()
+            for column, convert, value in zip(self.columns, self.converters, row):
+                if value is not None:
+                    setattr(message, column, convert(value))
+            serialized = message.SerializeToString()
+            if chunk and chunk_bytes + len(serialized) > self.max_request_bytes:
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(serialized)
+            chunk_bytes += len(serialized)
+        if chunk:
+            yield chunk
+    
+    def write(self, rows: List[tuple]) -> str:
+        """新しいストリームに全行を追記し、ファイナライズ（pendingはコミットまで）して書き込み先ストリーム名を返す"""
+        types = self.storage_module.types
+        stream_type = types.WriteStream.Type.PENDING if self.mode == 'pending' else types.WriteStream.Type.COMMITTED
+        stream = self.write_client.create_write_stream(
+            parent=self.table_path,
+            write_stream=types.WriteStream(type_=stream_type)
+        )
+        
+        template = types.AppendRowsRequest(
+            write_stream=stream.name,
+            proto_rows=types.AppendRowsRequest.ProtoData(
+                writer_schema=types.ProtoSchema(proto_descriptor=self.descriptor)
+            )
+        )
+        append_stream = self.writer_module.AppendRowsStream(self.write_client, template)
+        try:
+            # オフセットを指定して追記し、再送時の重複書き込みを防ぐ
+            futures = []
+            offset = 0
+            for chunk in self.serialize_rows(rows):
+                request = types.AppendRowsRequest(
+                    offset=offset,
+                    proto_rows=types.AppendRowsRequest.ProtoData(rows=types.ProtoRows(serialized_rows=chunk))
+                )
+                futures.append(append_stream.send(request))
+                offset += len(chunk)
+                self.bytes_written += sum(len(row) for row in chunk)
+            for future in futures:
+                future.result()
+        finally:
+            append_stream.close()
+        
+        self.write_client.finalize_write_stream(name=stream.name)
+        if self.mode == 'pending':
+            response = self.write_client.batch_commit_write_streams(
+                types.BatchCommitWriteStreamsRequest(parent=self.table_path, write_streams=[stream.name])
+            )
+            if response.stream_errors:
+                raise RuntimeError(f"ストリームのコミットに失敗しました: {list(response.stream_errors)}")
+        return stream.name
+
+def merge_column_stats(target: Dict[int, list], stats: Dict[int, list]):
+    """バッチごとの最小値・最大値を集約"""
+    for index, (low, high) in stats.items():
+        if index in target:
+            target[index] = [min(target[index][0], low), max(target[index][1], high)]
+        else:
+            target[index] = [low, high]
+
+def get_key_columns(table_config: Dict[str, Any]) -> List[str]:
+    """テーブル設定のprimary_key（文字列またはリスト）をカラムリストとして取得"""
+    primary_key = table_config.get('primary_key') or []
+    return [primary_key] if isinstance(primary_key, str) else list(primary_key)
+
+def has_schedule(table_config: Dict[str, Any]) -> bool:
+    """テーブル設定に実行間隔（min_interval）・時間帯（sync_window）が指定されているか"""
+    return table_config.get('min_interval') is not None or bool(table_config.get('sync_window'))
+
+def parse_interval(value: Any) -> float:
+    """間隔の指定（秒数、または "30m" "6h" "1d" のような単位付き文字列）を秒に変換"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def cron_field_matches(field: str, value: int, low: int, high: int) -> bool:
+    """cron形式の1フィールド（* n a-b */s a-b/s とそのカンマ区切り）に値が一致するか"""
+    for part in field.split(','):
+        base, _, step = part.partition('/')
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            start, end = (int(bound) for bound in base.split('-', 1))
+        else:
+            start = int(base)
+            end = high if step else start
+        if start <= value <= end and (value - start) % int(step or 1) == 0:
+            return True
+    return False
+
+def cron_matches(expression: str, moment: datetime) -> bool:
+    """cron形式（分 時 日 月 曜日、曜日は0=日曜）の式に日時が一致するか"""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"cron形式は5フィールドで指定してください: {expression}")
+    minute, hour, day, month, weekday = fields
+    return (
+        cron_field_matches(minute, moment.minute, 0, 59)
+        and cron_field_matches(hour, moment.hour, 0, 23)
+        and cron_field_matches(day, moment.day, 1, 31)
+        and cron_field_matches(month, moment.month, 1, 12)
+        and cron_field_matches(weekday, (moment.weekday() + 1) % 7, 0, 6)
+    )
+
+def json_default(value: Any) -> Any:
+    """マニフェスト出力用: datetime等をJSONで扱える形式に変換"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
 class DatabaseConfig:
     """データベース設定クラス"""
     def __init__(self):
@@ -31,34 +727,322 @@ class DatabaseConfig:
         self.bigquery_location = os.environ.get('BIGQUERY_LOCATION', 'asia-northeast1')
         
         self.gcs_bucket = os.environ.get('GCS_BUCKET')
+        # GCSオブジェクト名テンプレート
+        # 使用可能: {table} {source} {date} {hour} {timestamp} {run_id} {part} {ext}
+        # （既定ソース以外の{table}は "ソース名.テーブル名"）
+        # 例: "{table}/dt={date}/hour={hour}/{run_id}-{part}.{ext}"（Hiveパーティション形式）
+        self.gcs_object_layout = os.environ.get('GCS_OBJECT_LAYOUT', '{table}_{timestamp}.{ext}')
+        
+        # 並列マルチパートアップロード設定（しきい値以上のファイルを分割してcompose）
+        self.gcs_parallel_upload_threshold = int(os.environ.get('GCS_PARALLEL_UPLOAD_THRESHOLD_MB', '32')) * 1024 * 1024
+        self.gcs_upload_part_size = int(os.environ.get('GCS_UPLOAD_PART_SIZE_MB', '8')) * 1024 * 1024
+        self.gcs_upload_max_workers = int(os.environ.get('GCS_UPLOAD_MAX_WORKERS', '8'))
+        
+        # 出力シャード設定（行数・サイズの上限に達したら次のシャードに切り替え、0は無制限）
+        self.gcs_shard_max_rows = int(os.environ.get('GCS_SHARD_MAX_ROWS', '0'))
+        self.gcs_shard_max_bytes = int(os.environ.get('GCS_SHARD_MAX_MB', '0')) * 1024 * 1024
+        
+        # 同期元データベースと同期対象テーブル設定（環境変数から取得、JSON形式）
+        self.sources = self.load_sources()
+        
+        # ファンアウト実行設定（テーブルをシャードに分割して別インスタンスで同期）
+        self.fanout_shard_count = int(os.environ.get('FANOUT_SHARD_COUNT', '10'))
+        self.fanout_backend = os.environ.get('FANOUT_BACKEND', 'http')  # http | process
+        self.fanout_target_url = os.environ.get('FANOUT_TARGET_URL')
+        self.fanout_timeout = int(os.environ.get('FANOUT_TIMEOUT_SECONDS', '540'))
+        
+        # CSVエンコード設定（行数がしきい値以上ならプロセスプールで並列エンコード）
+        self.csv_encode_workers = int(os.environ.get('CSV_ENCODE_WORKERS', str(os.cpu_count() or 1)))
+        self.csv_encode_batch_rows = int(os.environ.get('CSV_ENCODE_BATCH_ROWS', '20000'))
+        self.csv_encode_parallel_min_rows = int(os.environ.get('CSV_ENCODE_PARALLEL_MIN_ROWS', '100000'))
+        
+        # 抽出バッチ・リトライ設定（一時エラーは失敗したバッチ/パートのみ再実行）
+        self.extract_batch_rows = int(os.environ.get('EXTRACT_BATCH_ROWS', '50000'))
+        # バッチサイズ自動調整（行幅と実測スループットから目標バイト数・処理時間に近づける）
+        self.extract_min_batch_rows = int(os.environ.get('EXTRACT_MIN_BATCH_ROWS', '1000'))
+        self.extract_max_batch_rows = int(os.environ.get('EXTRACT_MAX_BATCH_ROWS', '500000'))
+        self.extract_target_batch_bytes = int(os.environ.get('EXTRACT_TARGET_BATCH_MB', '64')) * 1024 * 1024
+        self.extract_target_batch_seconds = float(os.environ.get('EXTRACT_TARGET_BATCH_SECONDS', '5'))
+        self.sql_query_timeout = int(os.environ.get('SQL_QUERY_TIMEOUT_SECONDS', '0'))  # 0は無制限
+        self.retry_max_attempts = int(os.environ.get('RETRY_MAX_ATTEMPTS', '4'))
+        self.retry_base_delay = float(os.environ.get('RETRY_BASE_DELAY_SECONDS', '1.0'))
+        self.retry_max_delay = float(os.environ.get('RETRY_MAX_DELAY_SECONDS', '30'))
+        
+        # 重複排除MERGE設定（primary_keyを持つテーブルは取り込み後にターゲットへMERGE）
+        self.merge_target_dataset = os.environ.get('MERGE_TARGET_DATASET', self.bigquery_dataset)
+        self.merge_script_max_tables = int(os.environ.get('MERGE_SCRIPT_MAX_TABLES', '10'))
+        
+        # 実行ごとのマニフェスト設定（ファイル単位の件数・サイズ・チェックサム・最小/最大値）
+        self.manifest_enabled = os.environ.get('MANIFEST_ENABLED', 'true').lower() == 'true'
+        self.manifest_prefix = os.environ.get('MANIFEST_PREFIX', '_manifests')
         
-        # 同期対象テーブル設定（環境変数から取得、JSON形式）
-        import json
-        tables_config = os.environ.get('SYNC_TABLES_CONFIG', '{}')
-        self.sync_tables = json.loads(tables_config)
+        # Storage Write API設定（sink: "bigquery_write" のテーブルはGCSを経由せずBigQueryへ直接書き込む）
+        self.bigquery_write_max_request_bytes = int(os.environ.get('BIGQUERY_WRITE_MAX_REQUEST_MB', '8')) * 1024 * 1024
+        
+        # LOBカラム設定（テーブル設定の "lob" で上書き可能）
+        self.lob_default_mode = os.environ.get('LOB_DEFAULT_MODE', 'inline')
+        self.lob_max_bytes = int(os.environ.get('LOB_MAX_BYTES', '65536'))  # truncate時に残す先頭のバイト数
+        self.lob_chunk_bytes = int(os.environ.get('LOB_CHUNK_BYTES', str(1024 * 1024)))  # offload時に1回で読み出すバイト数
+        self.lob_gcs_prefix = os.environ.get('LOB_GCS_PREFIX', '_lobs')
+        self.lob_batch_keys = int(os.environ.get('LOB_BATCH_KEYS', '100'))  # offload時に1クエリで読み出すキーの数
+        self.lob_write_buffer_bytes = int(os.environ.get('LOB_WRITE_BUFFER_BYTES', str(32 * 1024 * 1024)))  # offload時に同時に開く書き込みバッファの合計
+        
+        # ドライラン（実行計画）設定
+        self.function_timeout = int(os.environ.get('FUNCTION_TIMEOUT_SECONDS', '540'))
+        self.dry_run_count_limit = int(os.environ.get('DRY_RUN_COUNT_LIMIT', '10000000'))
+        self.dry_run_default_bytes_per_second = int(os.environ.get('DRY_RUN_DEFAULT_BYTES_PER_SECOND', str(5 * 1024 * 1024)))
+        self.sync_history_days = int(os.environ.get('SYNC_HISTORY_DAYS', '30'))
+        
+        # バックフィル設定（ウォーターマークを変更せずに指定期間を再抽出し、通常の出力とは別のプレフィックスに保存）
+        self.backfill_prefix = os.environ.get('BACKFILL_PREFIX', '_backfill')
+        self.backfill_window_hours = float(os.environ.get('BACKFILL_WINDOW_HOURS', '24'))
+        self.backfill_max_concurrency = int(os.environ.get('BACKFILL_MAX_CONCURRENCY', '4'))
+        
+        # テーブルごとの実行間隔（min_interval / sync_window）を無視して全テーブルを同期（リクエストの "force": true）
+        self.force_sync = False
+        
+        # テーブル単位のリース設定（重複起動時に同じテーブルを同時に同期しない）
+        self.lease_enabled = os.environ.get('LEASE_ENABLED', 'true').lower() == 'true'
+        self.lease_ttl_seconds = int(os.environ.get('LEASE_TTL_SECONDS', '900'))
+        self.lease_heartbeat_seconds = float(os.environ.get('LEASE_HEARTBEAT_SECONDS', str(self.lease_ttl_seconds / 3)))
+        
+        # 整合性チェック設定（リクエストで期間を省略した場合は前日までの直近RECONCILE_DAYS日）
+        self.reconcile_days = int(os.environ.get('RECONCILE_DAYS', '7'))
+        
+        # プロファイリング設定（リクエストの "profile" またはテーブル設定の "profile": true で有効化）
+        self.profile_gcs_prefix = os.environ.get('PROFILE_GCS_PREFIX', '_profiles')
+        self.profile_local_dir = os.environ.get('PROFILE_LOCAL_DIR')  # 指定時はGCSではなくローカルに出力
+        self.profile_top_n = int(os.environ.get('PROFILE_TOP_N', '15'))
+        
+        # サービスモード設定（常駐してテーブルごとに適応的な間隔でポーリングし、しきい値到達でフラッシュ）
+        self.service_min_poll_seconds = float(os.environ.get('SERVICE_MIN_POLL_SECONDS', '5'))
+        self.service_max_poll_seconds = float(os.environ.get('SERVICE_MAX_POLL_SECONDS', '300'))
+        self.service_target_rows_per_poll = int(os.environ.get('SERVICE_TARGET_ROWS_PER_POLL', '1000'))
+        self.service_flush_rows = int(os.environ.get('SERVICE_FLUSH_ROWS', '50000'))
+        self.service_flush_bytes = int(os.environ.get('SERVICE_FLUSH_MB', '32')) * 1024 * 1024
+        self.service_flush_seconds = float(os.environ.get('SERVICE_FLUSH_SECONDS', '60'))
+        self.service_max_runtime = float(os.environ.get('SERVICE_MAX_RUNTIME_SECONDS', '0'))  # 0は無制限
+    
+    def load_sources(self) -> Dict[str, Dict[str, Any]]:
+        """同期元データベースの一覧を取得（SQL_SOURCES_CONFIG未指定時はSQL_SERVER_*を単一ソースとして扱う）
+
+        各ソースで省略した接続設定はSQL_SERVER_*の値を使用する。
+        パスワードは "password_env" で環境変数名を指定できる。
+        """
+        sources_config = os.environ.get('SQL_SOURCES_CONFIG')
+        if not sources_config:
+            sources = {DEFAULT_SOURCE: {
+                "tables": json.loads(os.environ.get('SYNC_TABLES_CONFIG', '{}')),
+                "max_concurrency": int(os.environ.get('SQL_SOURCE_MAX_CONCURRENCY', '1'))
+            }}
+        else:
+            sources = json.loads(sources_config)
+        
+        for name, source in sources.items():
+            if '.' in name:
+                raise ValueError(f"ソース名に '.' は使用できません: {name}")
+            source.setdefault("host", self.sql_server_host)
+            source.setdefault("port", self.sql_server_port)
+            source.setdefault("user", self.sql_server_user)
+            source.setdefault("database", self.sql_server_database)
+            if "password" not in source:
+                source["password"] = os.environ.get(source["password_env"]) if source.get("password_env") else self.sql_server_password
+            source.setdefault("tables", {})
+            source["max_concurrency"] = max(1, int(source.get("max_concurrency", 1)))
+        return sources
+    
+    @staticmethod
+    def table_key(source_name: str, table_name: str) -> str:
+        """ソースをまたいで一意なテーブルキー（既定ソースはテーブル名のみ、それ以外は "ソース名.テーブル名"）"""
+        return table_name if source_name == DEFAULT_SOURCE else f"{source_name}.{table_name}"
+    
+    def split_table_key(self, key: str) -> Tuple[str, str]:
+        """テーブルキーをソース名とテーブル名に分解"""
+        source_name, _, table_name = key.partition('.')
+        if table_name and source_name in self.sources:
+            return source_name, table_name
+        return DEFAULT_SOURCE, key
+    
+    @property
+    def sync_tables(self) -> Dict[str, Dict[str, Any]]:
+        """全ソースの同期対象テーブル（テーブルキー → テーブル設定）"""
+        return {
+            self.table_key(source_name, table_name): table_config
+            for source_name, source in self.sources.items()
+            for table_name, table_config in source["tables"].items()
+        }
+    
+    def restrict_tables(self, table_names: List[str]):
+        """同期対象テーブルを指定されたサブセット（テーブルキー）に絞り込む"""
+        unknown = [name for name in table_names if name not in self.sync_tables]
+        if unknown:
+            raise ValueError(f"SYNC_TABLES_CONFIGに存在しないテーブルです: {unknown}")
+        selected = [self.split_table_key(name) for name in table_names]
+        for source_name, source in self.sources.items():
+            source["tables"] = {
+                table_name: source["tables"][table_name] for name, table_name in selected if name == source_name
+            }
+        # 対象テーブルのないソースには接続しない
+        self.sources = {name: source for name, source in self.sources.items() if source["tables"]}
+    
+    def enable_profiling(self, tables: Any):
+        """リクエストで指定されたテーブル（trueの場合は全テーブル）のプロファイリングを有効化"""
+        table_names = list(self.sync_tables) if tables is True else tables
+        unknown = [name for name in table_names if name not in self.sync_tables]
+        if unknown:
+            raise ValueError(f"SYNC_TABLES_CONFIGに存在しないテーブルです: {unknown}")
+        for name in table_names:
+            source_name, table_name = self.split_table_key(name)
+            tables_config = self.sources[source_name]["tables"]
+            tables_config[table_name] = {**tables_config[table_name], 'profile': True}
 
 class DataSyncManager:
     """データ同期管理クラス"""
     
     def __init__(self, config: DatabaseConfig):
         self.config = config
-        self.bigquery_client = bigquery.Client(project=config.bigquery_project)
-        self.storage_client = storage.Client()
+        self._bigquery_client = None
+        self._storage_client = None
+        self._bigquery_write_client = None
         self.db_conn = None
-        self.logger = logging_client.logger('data_sync')
+        self.encode_pool: Optional[ProcessPoolExecutor] = None
+        self.pending_merges: List[Dict[str, Any]] = []
+        self.manifest_entries: List[Dict[str, Any]] = []
+        self.batch_reports: Dict[str, Dict[str, Any]] = {}
+        self.column_types_cache: Dict[str, Dict[str, str]] = {}
+        self.column_layout_cache: Dict[str, List[Tuple[str, str, bool]]] = {}
+        self.lob_reports: Dict[str, Dict[str, Any]] = {}
+        self.sync_history_ready = False
+        self.sync_metadata_ready = False
+        self.leases: Dict[str, Tuple[str, threading.Event, threading.Thread]] = {}
+        self.profilers: Dict[str, PhaseProfiler] = {}
+        self.source_name = DEFAULT_SOURCE
+        self.source: Dict[str, Any] = config.sources.get(DEFAULT_SOURCE, {})
+        self.encode_seconds_per_byte = 0.0
+        self.run_id = self.new_run_id()
+        self.logger = get_sync_logger()
+    
+    @property
+    def bigquery_client(self):
+        """BigQueryクライアント（初回アクセス時に作成）"""
+        if self._bigquery_client is None:
+            self._bigquery_client = bigquery.Client(project=self.config.bigquery_project)
+        return self._bigquery_client
+    
+    @property
+    def storage_client(self):
+        """Cloud Storageクライアント（初回アクセス時に作成）"""
+        if self._storage_client is None:
+            self._storage_client = storage.Client()
+        return self._storage_client
+        
+    @property
+    def bigquery_write_client(self):
+        """BigQuery Storage Write APIクライアント（初回アクセス時に作成）"""
+        if self._bigquery_write_client is None:
+            self._bigquery_write_client = bigquery_storage.BigQueryWriteClient()
+        return self._bigquery_write_client
         
-    def create_db_connection(self) -> pymssql.Connection:
+    def use_source(self, source_name: str):
+        """接続先・メタデータのキーに使うソースを切り替える"""
+        self.source_name = source_name
+        self.source = self.config.sources[source_name]
+
+    def table_key(self, table_name: str) -> str:
+        """現在のソースでのテーブルキー（同期メタデータ・マニフェスト・結果のキー）"""
+        return self.config.table_key(self.source_name, table_name)
+
+    def bigquery_table_name(self, table_name: str) -> str:
+        """BigQuery側のテーブル名（既定ソース以外は "ソース名_テーブル名"）"""
+        return self.table_key(table_name).replace('.', '_')
+
+    def source_worker(self, source_name: str, pending_merges: List[Dict[str, Any]]) -> 'DataSyncManager':
+        """ソース内の並列同期用ワーカー（DB接続とテーブル単位の状態は個別、クライアントと実行単位の状態は共有）"""
+        worker = DataSyncManager(self.config)
+        worker.use_source(source_name)
+        worker._bigquery_client = self.bigquery_client
+        worker._storage_client = self.storage_client
+        worker.encode_pool = self.encode_pool
+        worker.run_id = self.run_id
+        worker.manifest_entries = self.manifest_entries
+        worker.pending_merges = pending_merges
+        return worker
+
+    @staticmethod
+    def new_run_id() -> str:
+        """実行ごとに一意なID（同一秒内の実行でもオブジェクト名が衝突しない）"""
+        return f"{datetime.now(JST).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def object_name(self, table_name: str, part: int = 0, ext: str = 'csv', now: Optional[datetime] = None) -> str:
+        """GCS_OBJECT_LAYOUTからオブジェクト名を生成"""
+        now_jst = now or datetime.now(JST)
+        return self.config.gcs_object_layout.format(
+            table=self.table_key(table_name),
+            source=self.source_name,
+            date=now_jst.strftime('%Y-%m-%d'),
+            hour=now_jst.strftime('%H'),
+            timestamp=now_jst.strftime('%Y%m%d_%H%M%S'),
+            run_id=self.run_id,
+            part=f"{part:05d}",
+            ext=ext
+        )
+
+    def shard_names(self, table_name: str, count: int, filename: Optional[str] = None) -> List[str]:
+        """シャードごとのオブジェクト名（レイアウトに{part}がない場合・ファイル名指定時は拡張子の前に連番を付与）"""
+        if filename is None:
+            # 全シャードで同じ日時を使い、同じパーティションに出力する
+            now = datetime.now(JST)
+            names = [self.object_name(table_name, part, now=now) for part in range(count)]
+            if len(set(names)) == count:
+                return names
+            filename = names[0]
+        if count == 1:
+            return [filename]
+        root, ext = os.path.splitext(filename)
+        return [f"{root}-{part:05d}{ext}" for part in range(count)]
+
+    def with_retry(self, operation: str, func, on_retry=None):
+        """一時エラー時にジッター付き指数バックオフでfuncを再実行"""
+        attempt = 1
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= self.config.retry_max_attempts or not is_transient_error(e):
+                    raise
+                # Full Jitter: 0〜min(上限, 基準×2^n) の範囲でランダムに待機
+                delay = random.uniform(0, min(self.config.retry_max_delay, self.config.retry_base_delay * 2 ** (attempt - 1)))
+                self.logger.log_text(
+                    f"一時エラーのため再試行します: {operation} ({attempt}/{self.config.retry_max_attempts}回目, {delay:.1f}秒後) - {e}",
+                    severity="WARNING"
+                )
+                time.sleep(delay)
+                if on_retry:
+                    on_retry(e)
+                attempt += 1
+
+    def reconnect_db(self, error: Exception):
+        """抽出の再試行前にSQL Server接続を作り直す"""
+        try:
+            if self.db_conn:
+                self.db_conn.close()
+        except Exception:
+            pass
+        self.db_conn = self.create_db_connection()
+
+    def create_db_connection(self) -> 'pymssql.Connection':
         """SQL Server接続を作成"""
         try:
             conn = pymssql.connect(
-                server=self.config.sql_server_host,
-                port=int(self.config.sql_server_port),
-                user=self.config.sql_server_user,
-                password=self.config.sql_server_password,
-                database=self.config.sql_server_database
+                server=self.source["host"],
+                port=int(self.source["port"]),
+                user=self.source["user"],
+                password=self.source["password"],
+                database=self.source["database"],
+                timeout=self.config.sql_query_timeout
             )
             
-            self.logger.log_text("SQL Server接続を作成しました", severity="INFO")
+            self.logger.log_text(f"SQL Server接続を作成しました: {self.source_name}", severity="INFO")
             return conn
             
         except Exception as e:
@@ -81,6 +1065,158 @@ class DataSyncManager:
             self.logger.log_text(f"テーブル {table_name} のカラム取得エラー: {e}", severity="ERROR")
             raise
 
+    def get_column_types(self, table_name: str) -> Dict[str, str]:
+        """テーブルのカラム型を取得（実行中はキャッシュを利用）"""
+        if table_name in self.column_types_cache:
+            return self.column_types_cache[table_name]
+        try:
+            cursor = self.db_conn.cursor()
+            cursor.execute(
+                "SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = %s",
+                (table_name,)
+            )
+            column_types = {row[0]: row[1] for row in cursor.fetchall()}
+            cursor.close()
+        except Exception as e:
+            # 型が取得できない場合は値の型から判定してエンコードする
+            self.logger.log_text(f"テーブル {table_name} のカラム型取得エラー: {e}", severity="WARNING")
+            column_types = {}
+        self.column_types_cache[table_name] = column_types
+        return column_types
+
+    def get_column_layout(self, table_name: str) -> List[Tuple[str, str, bool]]:
+        """テーブルのカラムを定義順に (カラム名, データ型, LOBかどうか) で取得（実行中はキャッシュを利用）"""
+        if table_name in self.column_layout_cache:
+            return self.column_layout_cache[table_name]
+        cursor = self.db_conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH FROM INFORMATION_SCHEMA.COLUMNS "
+                "WHERE TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+                (table_name,)
+            )
+            # (MAX)型はCHARACTER_MAXIMUM_LENGTHが-1になる
+            layout = [
+                (name, data_type.lower(), max_length == -1 or data_type.lower() in LOB_TYPES)
+                for name, data_type, max_length in cursor.fetchall()
+            ]
+        finally:
+            cursor.close()
+        self.column_layout_cache[table_name] = layout
+        return layout
+
+    def build_select_list(self, table_name: str, lob: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """LOB設定に従ったSELECT句のカラムリストと、GCSへ退避するカラムを取得"""
+        if lob["default"] == 'inline' and all(mode == 'inline' for mode in lob["columns"].values()):
+            return "*", []
+        
+        expressions = []
+        offload_columns = []
+        for name, data_type, is_lob in self.get_column_layout(table_name):
+            mode = lob["columns"].get(name, lob["default"]) if is_lob else 'inline'
+            column = f"[{name}]"
+            if mode == 'exclude':
+                continue
+            if mode == 'truncate':
+                # xmlはSUBSTRINGに渡せないため文字列に変換してから切り詰める
+                source = f"CAST({column} AS NVARCHAR(MAX))" if data_type == 'xml' else column
+                length = lob["max_bytes"] // 2 if data_type in LOB_UNICODE_TYPES else lob["max_bytes"]
+                expressions.append(f"SUBSTRING({source}, 1, {max(1, length)}) AS {column}")
+            elif mode == 'offload':
+                # 本体はバイト数のみ取得し、値はキーごとに分割して読み出す（NULLはNULLのまま）
+                expressions.append(f"DATALENGTH({column}) AS {column}")
+                offload_columns.append(name)
+            else:
+                expressions.append(column)
+        if not expressions:
+            raise ValueError(f"抽出対象のカラムがありません: {table_name}")
+        return ", ".join(expressions), offload_columns
+
+    def offload_lobs(self, table_name: str, data: RowBatch, offload_columns: List[str], lob: Dict[str, Any]) -> RowBatch:
+        """LOB値を主キーのグループごとに分割して読み出してGCSへ書き込み、CSVの値をオブジェクトの参照に置き換える"""
+        data_types = {name: data_type for name, data_type, _ in self.get_column_layout(table_name)}
+        key_columns = lob["key_columns"]
+        key_indexes = [data.column_index(column) for column in key_columns]
+        key_list = ", ".join(f"[{column}]" for column in key_columns)
+        key_match = "(" + " AND ".join(f"[{column}] = %s" for column in key_columns) + ")"
+        bucket = self.storage_client.bucket(self.config.gcs_bucket)
+        # 実行ごとに別のパスへ書き込み、前回の実行が参照しているオブジェクトを上書きしない
+        prefix = f"{self.config.lob_gcs_prefix}/{self.table_key(table_name)}/{self.run_id}"
+        report = {"objects": 0, "bytes": 0, "queries": 0}
+        # グループ内の全キーの書き込みを同時に開くため、バッファの合計がwrite_buffer_bytesに収まるようキー数とchunk_sizeを決める
+        batch_keys = max(1, min(lob["batch_keys"], lob["write_buffer_bytes"] // GCS_CHUNK_ALIGN))
+        writer_chunk_size = min(
+            self.config.gcs_upload_part_size,
+            max(GCS_CHUNK_ALIGN, lob["write_buffer_bytes"] // batch_keys // GCS_CHUNK_ALIGN * GCS_CHUNK_ALIGN)
+        )
+        
+        rows = [list(row) for row in data.rows]
+        for name in offload_columns:
+            index = data.column_index(name)
+            data_type = data_types[name]
+            source = f"CAST([{name}] AS NVARCHAR(MAX))" if data_type == 'xml' else f"[{name}]"
+            # SUBSTRINGの開始位置と長さはUnicode型では文字数
+            chunk = lob["chunk_bytes"] // 2 if data_type in LOB_UNICODE_TYPES else lob["chunk_bytes"]
+            chunk = max(1, chunk)
+            
+            targets = [row for row in rows if row[index] is not None]
+            for group_start in range(0, len(targets), batch_keys):
+                group = {
+                    tuple(row[i] for i in key_indexes): row for row in targets[group_start:group_start + batch_keys]
+                }
+                filenames = {
+                    key: f"{prefix}/{name}/" + "/".join(quote(str(value), safe='') for value in key) for key in group
+                }
+                
+                def stream() -> Tuple[int, int]:
+                    # グループ内の全キーの同じ範囲を1クエリで読み出し、キーごとのオブジェクトに追記する
+                    written, queries = 0, 0
+                    writers = {key: bucket.blob(filenames[key]).open('wb', chunk_size=writer_chunk_size) for key in group}
+                    cursor = self.db_conn.cursor()
+                    try:
+                        active = list(group)
+                        start = 1
+                        while active:
+                            query = (
+                                f"SELECT {key_list}, SUBSTRING({source}, %s, {chunk}) FROM {table_name} "
+                                f"WHERE {' OR '.join([key_match] * len(active))}"
+                            )
+                            cursor.execute(query, (start, *(value for key in active for value in key)))
+                            queries += 1
+                            continuing = []
+                            for fetched in cursor.fetchall():
+                                key, value = tuple(fetched[:-1]), fetched[-1]
+                                if key not in writers or not value:
+                                    continue
+                                payload = value.encode('utf-8') if isinstance(value, str) else bytes(value)
+                                writers[key].write(payload)
+                                written += len(payload)
+                                if len(value) >= chunk:
+                                    continuing.append(key)
+                            active = continuing
+                            start += chunk
+                    finally:
+                        cursor.close()
+                        for writer in writers.values():
+                            writer.close()
+                    return written, queries
+                
+                written, queries = self.with_retry(
+                    f"LOB退避 ({prefix}/{name}, {len(group)}件)", stream, on_retry=self.reconnect_db
+                )
+                report["bytes"] += written
+                report["queries"] += queries
+                report["objects"] += len(group)
+                for key, row in group.items():
+                    row[index] = f"gs://{self.config.gcs_bucket}/{filenames[key]}"
+        
+        self.lob_reports[table_name] = {"offloaded_columns": offload_columns, **report}
+        self.logger.log_text(
+            f"LOBをGCSへ退避しました: {table_name} ({report['objects']}件, {report['bytes']}バイト, {report['queries']}クエリ)",
+            severity="INFO"
+        )
+        return RowBatch(data.columns, [tuple(row) for row in rows])
+
     def get_last_sync_time(self, table_name: str) -> Optional[datetime]:
         """BigQueryから前回同期時刻を取得"""
         try:
@@ -92,7 +1228,7 @@ class DataSyncManager:
             
             job_config = bigquery.QueryJobConfig(
                 query_parameters=[
-                    bigquery.ScalarQueryParameter("table_name", "STRING", table_name)
+                    bigquery.ScalarQueryParameter("table_name", "STRING", self.table_key(table_name))
                 ]
             )
             
@@ -109,7 +1245,7 @@ class DataSyncManager:
             return None
 
     def update_sync_metadata(self, table_name: str, max_timestamp: Optional[datetime]):
-        """同期メタデータを更新"""
+        """同期メタデータを更新（max_timestampがNoneの場合はウォーターマークを変更せず同期成功時刻のみ更新）"""
         try:
             current_time = datetime.now(timezone.utc)
             
@@ -128,7 +1264,11 @@ class DataSyncManager:
             ON target.table_name = source.table_name
             WHEN MATCHED THEN
                 UPDATE SET 
-                    last_sync_time = source.last_sync_time,
+                    -- 遅れて完了した実行が古い時刻で上書きしてもウォーターマークを戻さない
+                    last_sync_time = GREATEST(
+                        IFNULL(target.last_sync_time, source.last_sync_time),
+                        IFNULL(source.last_sync_time, target.last_sync_time)
+                    ),
                     updated_at = source.updated_at
             WHEN NOT MATCHED THEN
                 INSERT (table_name, last_sync_time, updated_at)
@@ -137,19 +1277,542 @@ class DataSyncManager:
             
             job_config = bigquery.QueryJobConfig(
                 query_parameters=[
-                    bigquery.ScalarQueryParameter("table_name", "STRING", table_name),
+                    bigquery.ScalarQueryParameter("table_name", "STRING", self.table_key(table_name)),
                     bigquery.ScalarQueryParameter("last_sync_time", "TIMESTAMP", max_timestamp),
                     bigquery.ScalarQueryParameter("updated_at", "TIMESTAMP", current_time)
                 ]
             )
             
-            self.bigquery_client.query(query, job_config=job_config).result()
+            # MERGEは冪等なため、一時エラー時はそのまま再実行できる
+            self.with_retry(
+                f"sync_metadata MERGE ({table_name})",
+                lambda: self.bigquery_client.query(query, job_config=job_config).result()
+            )
             self.logger.log_text(f"同期メタデータを更新しました: {table_name}", severity="INFO")
             
         except Exception as e:
             self.logger.log_text(f"同期メタデータ更新エラー: {e}", severity="ERROR")
             raise
 
+    def record_sync_history(self, table_name: str, result: Dict[str, Any]):
+        """テーブルごとの件数・サイズ・所要時間をsync_historyに記録"""
+        table_id = f"{self.config.bigquery_project}.{self.config.bigquery_dataset}.sync_history"
+        try:
+            if not self.sync_history_ready:
+                table = bigquery.Table(table_id, schema=[
+                    bigquery.SchemaField("table_name", "STRING", mode="REQUIRED"),
+                    bigquery.SchemaField("run_id", "STRING", mode="REQUIRED"),
+                    bigquery.SchemaField("rows", "INTEGER", mode="REQUIRED"),
+                    bigquery.SchemaField("bytes", "INTEGER", mode="REQUIRED"),
+                    bigquery.SchemaField("duration_seconds", "FLOAT", mode="REQUIRED"),
+                    bigquery.SchemaField("finished_at", "TIMESTAMP", mode="REQUIRED"),
+                ])
+                table.time_partitioning = bigquery.TimePartitioning(field="finished_at")
+                table.clustering_fields = ["table_name"]
+                self.bigquery_client.create_table(table, exists_ok=True)
+                self.sync_history_ready = True
+            
+            errors = self.bigquery_client.insert_rows_json(table_id, [{
+                "table_name": self.table_key(table_name),
+                "run_id": self.run_id,
+                "rows": result["rows"],
+                "bytes": result["bytes"],
+                "duration_seconds": result["duration_seconds"],
+                "finished_at": datetime.now(timezone.utc).isoformat()
+            }])
+            if errors:
+                raise RuntimeError(errors)
+        except Exception as e:
+            # 実績の記録は見積もり用の補助情報のため、失敗しても同期は継続
+            self.logger.log_text(f"同期実績の記録エラー: {table_name} - {e}", severity="WARNING")
+
+    def get_historical_throughput(self) -> Dict[str, Dict[str, float]]:
+        """直近の同期実績からテーブルごとのスループットを取得"""
+        query = f"""
+        SELECT
+            table_name,
+            SAFE_DIVIDE(SUM(bytes), SUM(duration_seconds)) AS bytes_per_second,
+            SAFE_DIVIDE(SUM(rows), SUM(duration_seconds)) AS rows_per_second
+        FROM `{self.config.bigquery_project}.{self.config.bigquery_dataset}.sync_history`
+        WHERE finished_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {self.config.sync_history_days} DAY)
+        GROUP BY table_name
+        """
+        try:
+            return {
+                row.table_name: {"bytes_per_second": row.bytes_per_second, "rows_per_second": row.rows_per_second}
+                for row in self.bigquery_client.query(query).result()
+            }
+        except Exception as e:
+            self.logger.log_text(f"同期実績の取得エラー: {e}", severity="WARNING")
+            return {}
+
+    def get_table_size_stats(self, table_name: str) -> Tuple[int, float]:
+        """sys.dm_db_partition_statsからテーブルの総行数と平均行サイズ（バイト）を取得"""
+        cursor = self.db_conn.cursor()
+        try:
+            cursor.execute("""
+            SELECT SUM(row_count), SUM(used_page_count) * 8192
+            FROM sys.dm_db_partition_stats
+            WHERE object_id = OBJECT_ID(%s) AND index_id IN (0, 1)
+            """, (table_name,))
+            row_count, used_bytes = cursor.fetchone()
+        finally:
+            cursor.close()
+        row_count = int(row_count or 0)
+        return row_count, (float(used_bytes or 0) / row_count if row_count else 0.0)
+
+    def count_pending_rows(self, table_name: str, timestamp_column: str, last_sync: datetime) -> Tuple[int, bool]:
+        """ウォーターマーク以降の行数を上限付きでCOUNT（上限に達した場合はTrueを返す）"""
+        limit = self.config.dry_run_count_limit
+        cursor = self.db_conn.cursor()
+        try:
+            cursor.execute(f"""
+            SELECT COUNT_BIG(*) FROM (
+                SELECT TOP ({limit}) 1 AS x FROM {table_name} WHERE {timestamp_column} > %s
+            ) AS pending
+            """, (last_sync,))
+            count = int(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+        return count, count >= limit
+
+    def plan_sync(self) -> List[Dict[str, Any]]:
+        """抽出を行わず、テーブルごとの対象件数・サイズ・所要時間を見積もる"""
+        self.logger.log_text("ドライラン（実行計画の作成）を開始します", severity="INFO")
+        throughput = self.get_historical_throughput()
+        plans = []
+        
+        for source_name, source in self.config.sources.items():
+            self.use_source(source_name)
+            try:
+                self.db_conn = self.create_db_connection()
+            except Exception as e:
+                plans.extend(
+                    {"table": self.table_key(table_name), "source": source_name, "status": "error", "error": str(e)}
+                    for table_name in source["tables"]
+                )
+                continue
+            
+            try:
+                for table_name, table_config in source["tables"].items():
+                    try:
+                        plans.append(self.plan_table(table_name, table_config, throughput))
+                    except Exception as e:
+                        self.logger.log_text(f"実行計画の作成エラー: {self.table_key(table_name)} - {e}", severity="ERROR")
+                        plans.append({"table": self.table_key(table_name), "source": source_name, "status": "error", "error": str(e)})
+            finally:
+                self.db_conn.close()
+                self.db_conn = None
+        
+        return plans
+
+    def plan_table(self, table_name: str, table_config: Dict[str, Any],
+                   throughput: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+        """ウォーターマーク以降の対象件数・サイズと、実績スループットからの所要時間を見積もる"""
+        timestamp_column = table_config.get('timestamp_column')
+        last_sync = self.get_last_sync_time(table_name) if timestamp_column else None
+        total_rows, avg_row_bytes = self.get_table_size_stats(table_name)
+        
+        if last_sync:
+            pending_rows, capped = self.count_pending_rows(table_name, timestamp_column, last_sync)
+        else:
+            # 初回・タイムスタンプなしは全件が対象
+            pending_rows, capped = total_rows, False
+        estimated_bytes = int(pending_rows * avg_row_bytes)
+        
+        history = throughput.get(self.table_key(table_name)) or {}
+        # estimated_bytesはページ上のサイズで、実績のbytes（CSV・Storage Write APIの出力サイズ）とは単位が異なるため、
+        # 両者で同じ単位になる行数のスループットを優先する
+        if history.get("rows_per_second"):
+            estimated_seconds, throughput_source = pending_rows / history["rows_per_second"], "history"
+        elif history.get("bytes_per_second"):
+            estimated_seconds, throughput_source = estimated_bytes / history["bytes_per_second"], "history"
+        else:
+            estimated_seconds, throughput_source = estimated_bytes / self.config.dry_run_default_bytes_per_second, "default"
+        
+        return {
+            "table": self.table_key(table_name),
+            "source": self.source_name,
+            "status": "success",
+            "watermark": last_sync.isoformat() if last_sync else None,
+            "estimated_rows": pending_rows,
+            "rows_capped": capped,
+            "estimated_bytes": estimated_bytes,
+            "estimated_seconds": round(estimated_seconds, 1),
+            "throughput_source": throughput_source
+        }
+
+    def reconcile_sync(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """日単位の件数・チェックサムをSQL ServerとBigQueryで比較し、不一致の日のみ再同期"""
+        self.logger.log_text(f"整合性チェックを開始します: {start} 〜 {end}", severity="INFO")
+        self.run_id = self.new_run_id()
+        results = []
+        
+        try:
+            for source_name, source in self.config.sources.items():
+                self.use_source(source_name)
+                try:
+                    self.db_conn = self.create_db_connection()
+                except Exception as e:
+                    results.extend(
+                        {"table": self.table_key(table_name), "source": source_name, "status": "error", "error": str(e)}
+                        for table_name in source["tables"]
+                    )
+                    continue
+                
+                source_results = []
+                try:
+                    for table_name, table_config in source["tables"].items():
+                        try:
+                            source_results.append(self.reconcile_table(table_name, table_config, start, end))
+                        except Exception as e:
+                            self.logger.log_text(f"整合性チェックエラー: {self.table_key(table_name)} - {e}", severity="ERROR")
+                            source_results.append(
+                                {"table": self.table_key(table_name), "source": source_name, "status": "error", "error": str(e)}
+                            )
+                finally:
+                    self.db_conn.close()
+                    self.db_conn = None
+                
+                try:
+                    # 再同期した範囲はMERGEで反映（ウォーターマークは変更しない）
+                    if self.pending_merges:
+                        self.apply_staged_increments(source_results)
+                finally:
+                    # MERGEの反映まで完了してからリースを解放
+                    self.release_leases()
+                results.extend(source_results)
+            
+            if self.config.manifest_enabled and self.manifest_entries:
+                self.write_manifest(results)
+            return results
+        finally:
+            if self.encode_pool:
+                self.encode_pool.shutdown()
+                self.encode_pool = None
+
+    def reconcile_table(self, table_name: str, table_config: Dict[str, Any], start: date, end: date) -> Dict[str, Any]:
+        """1テーブルの日単位の件数・チェックサムを比較し、primary_keyを持つ場合は不一致の日を再同期"""
+        timestamp_column = table_config.get('timestamp_column')
+        if not timestamp_column:
+            raise ValueError("整合性チェックにはtimestamp_columnの指定が必要です")
+        started = time.monotonic()
+        target_id = self.get_reconcile_target(table_name, table_config)
+        result = self.new_result(table_name, table_config)
+        
+        key_expressions = self.get_reconcile_key_expressions(table_name, table_config)
+        source_buckets = self.get_source_buckets(
+            table_name, table_config, result["extraction_options"], start, end, key_expressions
+        )
+        target_buckets = self.get_bigquery_buckets(target_id, table_config, start, end, key_expressions)
+        mismatched = [
+            {
+                "date": day.isoformat(),
+                "source_rows": source_buckets.get(day, (0, 0))[0],
+                "bigquery_rows": target_buckets.get(day, (0, 0))[0],
+                "source_checksum": source_buckets.get(day, (0, 0))[1],
+                "bigquery_checksum": target_buckets.get(day, (0, 0))[1]
+            }
+            for day in sorted(set(source_buckets) | set(target_buckets))
+            if source_buckets.get(day) != target_buckets.get(day)
+        ]
+        result["reconcile"] = {
+            "target": target_id,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "buckets": len(set(source_buckets) | set(target_buckets)),
+            "checksum": key_expressions is not None,
+            "mismatched": mismatched
+        }
+        self.logger.log_text(
+            f"整合性チェック: {table_name} ({len(mismatched)}/{result['reconcile']['buckets']}日が不一致)",
+            severity="WARNING" if mismatched else "INFO"
+        )
+        
+        if not mismatched:
+            return result
+        if not table_config.get('primary_key'):
+            # MERGEで冪等に反映できないテーブルは再同期すると重複するため報告のみ
+            result["reconcile"]["resync"] = "skipped"
+            return result
+        holder = self.claim_lease(table_name)
+        if holder:
+            # 同期中のテーブルを並行して再同期するとMERGEやステージングが競合するため報告のみ
+            self.logger.log_text(
+                f"他の実行が同期中のため再同期をスキップします: {self.table_key(table_name)} (保持者: {holder['owner']})",
+                severity="WARNING"
+            )
+            result["reconcile"].update(resync="skipped", skip_reason="lease_held", lease=holder)
+            return result
+        
+        # 不一致の日のみを抽出してまとめて出力（ソースで削除された行はBigQuery側から削除されない）
+        data = None
+        for bucket in mismatched:
+            if not bucket["source_rows"]:
+                continue
+            window_start = datetime.combine(date.fromisoformat(bucket["date"]), datetime.min.time())
+            window = self.extract_data(
+                table_name, timestamp_column, result["extraction_options"],
+                window=(window_start, window_start + timedelta(days=1))
+            )
+            if data is None:
+                data = window
+            else:
+                data.rows.extend(window.rows)
+        self.batch_reports.pop(table_name, None)
+        if table_name in self.lob_reports:
+            result["lob"] = self.lob_reports.pop(table_name)
+        
+        result["reconcile"]["resync"] = "applied" if data else "nothing_to_resync"
+        if not data:
+            return result
+        return self.publish(table_name, table_config, data, result, started, advance_watermark=False)
+
+    def run_backfill(self, table_key: str, start: datetime, end: datetime,
+                     window_hours: Optional[float] = None, max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """指定テーブルの[start, end)を時間窓に分割して並列に抽出し、バックフィル用プレフィックスに保存
+
+        sync_metadataのウォーターマーク・MERGEターゲット・通常のマニフェストには影響しない。
+        """
+        if table_key not in self.config.sync_tables:
+            raise ValueError(f"SYNC_TABLES_CONFIGに存在しないテーブルです: {table_key}")
+        source_name, table_name = self.config.split_table_key(table_key)
+        table_config = self.config.sources[source_name]["tables"][table_name]
+        timestamp_column = table_config.get('timestamp_column')
+        if not timestamp_column:
+            raise ValueError("バックフィルにはtimestamp_columnの指定が必要です")
+        if start >= end:
+            raise ValueError(f"バックフィルの期間が不正です: {start} 〜 {end}")
+        window_hours = self.config.backfill_window_hours if window_hours is None else window_hours
+        if window_hours <= 0:
+            raise ValueError(f"window_hoursには正の値を指定してください: {window_hours}")
+        max_concurrency = self.config.backfill_max_concurrency if max_concurrency is None else max_concurrency
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrencyには1以上を指定してください: {max_concurrency}")
+        
+        self.use_source(source_name)
+        self.run_id = self.new_run_id()
+        started = time.monotonic()
+        window_size = timedelta(hours=window_hours)
+        windows = []
+        window_start = start
+        while window_start < end:
+            windows.append((window_start, min(window_start + window_size, end)))
+            window_start += window_size
+        self.logger.log_text(
+            f"バックフィルを開始します: {table_key} ({start} 〜 {end}, {len(windows)}ウィンドウ)", severity="INFO"
+        )
+        
+        window_queue: queue.Queue = queue.Queue()
+        for index, window in enumerate(windows):
+            window_queue.put((index, window))
+        window_results: Dict[int, Dict[str, Any]] = {}
+        concurrency = min(max_concurrency, len(windows))
+        # エンコード用プロセスプールは全ワーカーで共有（ワーカーの作成前に用意し、終了時に停止）
+        if self.config.csv_encode_workers > 1:
+            self.encode_pool = create_process_pool(self.config.csv_encode_workers)
+        workers = [self.source_worker(source_name, []) for _ in range(max(1, concurrency))]
+        prefix = f"{self.config.backfill_prefix}/{table_key}/{self.run_id}"
+        
+        def drain(worker: DataSyncManager):
+            # ワーカーごとにSQL Server接続を持ち、キューが空になるまでウィンドウを抽出
+            worker.db_conn = worker.create_db_connection()
+            try:
+                while True:
+                    try:
+                        index, window = window_queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    window_results[index] = worker.backfill_window(table_name, table_config, window, prefix)
+            finally:
+                worker.db_conn.close()
+        
+        connection_errors = []
+        try:
+            with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+                futures = [executor.submit(drain, worker) for worker in workers]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        connection_errors.append(e)
+        finally:
+            if self.encode_pool:
+                self.encode_pool.shutdown()
+                self.encode_pool = None
+        
+        details = []
+        for index, (window_start, window_end) in enumerate(windows):
+            details.append(window_results.get(index) or {
+                "from": window_start.isoformat(), "to": window_end.isoformat(), "status": "error",
+                "error": str(connection_errors[0] if connection_errors else "未実行")
+            })
+        
+        # バックフィル分のファイル一覧は通常のマニフェスト・インデックスとは別に出力
+        entries, self.manifest_entries = self.manifest_entries, []
+        if entries:
+            manifest_name = f"{prefix}/_manifest.json"
+            manifest = {"run_id": self.run_id, "created_at": datetime.now(timezone.utc), "files": entries}
+            try:
+                bucket = self.storage_client.bucket(self.config.gcs_bucket)
+                self.with_retry(
+                    f"マニフェスト保存 ({manifest_name})",
+                    lambda: bucket.blob(manifest_name).upload_from_string(
+                        json.dumps(manifest, ensure_ascii=False, default=json_default),
+                        content_type='application/json'
+                    )
+                )
+            except Exception as e:
+                self.logger.log_text(f"マニフェスト保存エラー: {e}", severity="ERROR")
+        
+        failed = [window for window in details if window["status"] == "error"]
+        self.logger.log_text(
+            f"バックフィルが完了しました: {table_key} ({len(details) - len(failed)}/{len(details)}ウィンドウ成功)",
+            severity="ERROR" if failed else "INFO"
+        )
+        return {
+            "table": table_key,
+            "source": source_name,
+            "status": "error" if failed else "success",
+            "backfill": True,
+            "rows": sum(window.get("rows", 0) for window in details),
+            "bytes": sum(window.get("bytes", 0) for window in details),
+            "prefix": f"gs://{self.config.gcs_bucket}/{prefix}/",
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "windows": details,
+            **({"error": f"{len(failed)}ウィンドウの抽出に失敗しました"} if failed else {})
+        }
+
+    def backfill_window(self, table_name: str, table_config: Dict[str, Any],
+                        window: Tuple[datetime, datetime], prefix: str) -> Dict[str, Any]:
+        """1ウィンドウ分を抽出してGCSに保存"""
+        window_start, window_end = window
+        result = {"from": window_start.isoformat(), "to": window_end.isoformat(), "status": "success", "rows": 0, "file": None}
+        try:
+            timestamp_column = table_config['timestamp_column']
+            data = self.extract_data(
+                table_name, timestamp_column, self.get_extraction_options(table_config), window=window
+            )
+            self.batch_reports.pop(table_name, None)
+            self.lob_reports.pop(table_name, None)
+            if data:
+                filename = f"{prefix}/{window_start.strftime('%Y%m%dT%H%M%S')}-{window_end.strftime('%Y%m%dT%H%M%S')}.csv"
+                stat_columns = [timestamp_column] + get_key_columns(table_config)
+                filenames = self.save_to_gcs(data, table_name, stat_columns, filename=filename)
+                result["file"] = filenames[0]
+                if len(filenames) > 1:
+                    result["files"] = filenames
+                result["bytes"] = self.manifest_bytes(filenames)
+            result["rows"] = len(data)
+        except Exception as e:
+            self.logger.log_text(f"バックフィルのウィンドウでエラー: {table_name} {window_start} 〜 {window_end} - {e}", severity="ERROR")
+            result.update(status="error", error=str(e))
+        return result
+
+    def get_reconcile_target(self, table_name: str, table_config: Dict[str, Any]) -> str:
+        """整合性チェックで比較するBigQueryテーブルID"""
+        if table_config.get('reconcile_table'):
+            target = table_config['reconcile_table']
+            return target if '.' in target else f"{self.config.bigquery_project}.{self.config.bigquery_dataset}.{target}"
+        if table_config.get('primary_key'):
+            return f"{self.config.bigquery_project}.{self.config.merge_target_dataset}.{self.bigquery_table_name(table_name)}"
+        if self.get_sink(table_config) == 'bigquery_write':
+            destination = table_config.get('write_table', self.bigquery_table_name(table_name))
+            return f"{self.config.bigquery_project}.{self.config.bigquery_dataset}.{destination}"
+        raise ValueError("比較先のBigQueryテーブルがありません（reconcile_tableを指定してください）")
+
+    def get_reconcile_key_expressions(self, table_name: str,
+                                      table_config: Dict[str, Any]) -> Optional[List[Tuple[str, str]]]:
+        """キー列ごとのチェックサム用の正規化式 (SQL Server, BigQuery)（正規化できない型を含む場合はNone）"""
+        column_types = {name.lower(): data_type.lower() for name, data_type in self.get_column_types(table_name).items()}
+        key_columns = get_key_columns(table_config)
+        unsupported = [
+            column for column in key_columns if column_types.get(column.lower()) not in RECONCILE_KEY_EXPRESSIONS
+        ]
+        if unsupported:
+            self.logger.log_text(
+                f"キー列の型がチェックサムに対応していないため件数のみ比較します: {self.table_key(table_name)} {unsupported}",
+                severity="WARNING"
+            )
+            return None
+        tz = SOURCE_TIMEZONE.zone
+        return [
+            tuple(
+                template.format(column=column, tz=tz)
+                for template in RECONCILE_KEY_EXPRESSIONS[column_types[column.lower()]]
+            )
+            for column in key_columns
+        ]
+
+    def get_source_buckets(self, table_name: str, table_config: Dict[str, Any], options: Dict[str, Any],
+                           start: date, end: date,
+                           key_expressions: Optional[List[Tuple[str, str]]]) -> Dict[date, Tuple[int, int]]:
+        """SQL Serverの日ごとの件数とチェックサム（キー列とタイムスタンプのMD5先頭4バイトの合計、key_expressionsがNoneの場合は0）"""
+        timestamp_column = table_config['timestamp_column']
+        checksum = "0"
+        if key_expressions is not None:
+            # BigQuery側と同じ文字列になるよう、キーは型ごとに正規化した文字列、タイムスタンプはエポック秒で連結
+            parts = [f"COALESCE({expression}, N'')" for expression, _ in key_expressions]
+            parts.append(f"CAST(DATEDIFF_BIG(SECOND, '19700101', {timestamp_column}) AS NVARCHAR(20))")
+            row_string = "CONCAT(" + ", N'|', ".join(parts) + ")" if len(parts) > 1 else parts[0]
+            # BigQueryのMD5と同じくUTF-8のバイト列をハッシュする（UTF-8照合順序はSQL Server 2019以降）
+            utf8_string = f"CAST(({row_string}) COLLATE Latin1_General_100_BIN2_UTF8 AS VARCHAR(8000))"
+            checksum = f"SUM(CAST(SUBSTRING(HASHBYTES('MD5', {utf8_string}), 1, 4) AS BIGINT))"
+        query = self.build_extract_query(f"""
+        SELECT CAST({timestamp_column} AS DATE) AS bucket, COUNT_BIG(*) AS row_count,
+               {checksum} AS checksum
+        FROM {table_name}
+        WHERE {timestamp_column} >= %s AND {timestamp_column} < %s
+        GROUP BY CAST({timestamp_column} AS DATE)
+        """, options)
+        params = (datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()))
+        
+        self.db_conn.commit()
+        try:
+            batch = self.with_retry(
+                f"整合性チェック集計 ({table_name})",
+                lambda: self.fetch_batch(query, params),
+                on_retry=self.reconnect_db
+            )
+        finally:
+            self.reset_session()
+        return {bucket: (int(row_count), int(checksum or 0)) for bucket, row_count, checksum in batch.rows}
+
+    def get_bigquery_buckets(self, target_id: str, table_config: Dict[str, Any], start: date, end: date,
+                             key_expressions: Optional[List[Tuple[str, str]]]) -> Dict[date, Tuple[int, int]]:
+        """BigQueryの日ごとの件数とチェックサム（SQL Serverと同じ規則で計算）"""
+        timestamp_column = table_config['timestamp_column']
+        tz = SOURCE_TIMEZONE.zone
+        checksum = "0"
+        if key_expressions is not None:
+            # ソースのタイムゾーンなし日時に合わせ、UTCのTIMESTAMPをソースのタイムゾーンの日時に戻して計算
+            parts = [f"COALESCE({expression}, '')" for _, expression in key_expressions]
+            parts.append(f"CAST(UNIX_SECONDS(TIMESTAMP(DATETIME({timestamp_column}, '{tz}'))) AS STRING)")
+            row_string = "CONCAT(" + ", '|', ".join(parts) + ")" if len(parts) > 1 else parts[0]
+            checksum = f"SUM(CAST(CONCAT('0x', TO_HEX(SUBSTR(MD5({row_string}), 1, 4))) AS INT64))"
+        query = f"""
+        SELECT DATE({timestamp_column}, '{tz}') AS bucket, COUNT(*) AS row_count,
+               {checksum} AS checksum
+        FROM `{target_id}`
+        WHERE {timestamp_column} >= TIMESTAMP(@start_date, '{tz}') AND {timestamp_column} < TIMESTAMP(@end_date, '{tz}')
+        GROUP BY bucket
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("start_date", "DATE", start),
+                bigquery.ScalarQueryParameter("end_date", "DATE", end)
+            ]
+        )
+        try:
+            rows = self.with_retry(
+                f"整合性チェック集計 ({target_id})",
+                lambda: list(self.bigquery_client.query(query, job_config=job_config).result())
+            )
+        except google_exceptions.NotFound:
+            # 未作成のテーブルは全日が不一致として扱う
+            return {}
+        return {row.bucket: (int(row.row_count), int(row.checksum or 0)) for row in rows}
+
     def ensure_sync_metadata_table(self):
         """sync_metadataテーブルが存在しない場合は作成"""
         try:
@@ -159,95 +1822,608 @@ class DataSyncManager:
                 bigquery.SchemaField("table_name", "STRING", mode="REQUIRED"),
                 bigquery.SchemaField("last_sync_time", "TIMESTAMP", mode="NULLABLE"),
                 bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED"),
+                bigquery.SchemaField("lease_owner", "STRING", mode="NULLABLE"),
+                bigquery.SchemaField("lease_expires_at", "TIMESTAMP", mode="NULLABLE"),
             ]
             
             table = bigquery.Table(table_id, schema=schema)
             table.clustering_fields = ["table_name"]
             
-            self.bigquery_client.create_table(table, exists_ok=True)
+            table = self.bigquery_client.create_table(table, exists_ok=True)
+            # リース列がない既存テーブルには列を追加
+            existing = {field.name for field in table.schema}
+            missing = [field for field in schema if field.name not in existing]
+            if missing:
+                table.schema = list(table.schema) + missing
+                self.bigquery_client.update_table(table, ["schema"])
             self.logger.log_text("sync_metadataテーブルを確認/作成しました", severity="INFO")
             
         except Exception as e:
             self.logger.log_text(f"sync_metadataテーブル作成エラー: {e}", severity="ERROR")
             raise
 
-    def extract_data(self, table_name: str, timestamp_column: Optional[str]) -> List[Dict[str, Any]]:
-        """SQL Serverからデータを抽出"""
+    def get_last_success_times(self) -> Dict[str, datetime]:
+        """sync_metadataから全テーブルの最終同期成功時刻（updated_at）をまとめて取得"""
+        query = f"""
+        SELECT table_name, MAX(updated_at) AS updated_at
+        FROM `{self.config.bigquery_project}.{self.config.bigquery_dataset}.sync_metadata`
+        GROUP BY table_name
+        """
+        try:
+            rows = self.with_retry("最終同期時刻取得", lambda: list(self.bigquery_client.query(query).result()))
+            return {row.table_name: row.updated_at for row in rows}
+        except Exception as e:
+            # 取得できない場合は全テーブルを同期対象とする
+            self.logger.log_text(f"最終同期時刻取得エラー: {e}", severity="WARNING")
+            return {}
+
+    def schedule_skip(self, table_name: str, table_config: Dict[str, Any],
+                      last_success: Optional[datetime], now: datetime) -> Optional[Dict[str, Any]]:
+        """min_interval・sync_windowの対象外であればスキップ理由を返す（同期対象ならNone）"""
+        sync_window = table_config.get('sync_window')
+        if sync_window and not cron_matches(sync_window, now.astimezone(JST)):
+            return {"skip_reason": "outside_window", "sync_window": sync_window}
+        
+        if table_config.get('min_interval') is not None and last_success:
+            next_due = last_success + timedelta(seconds=parse_interval(table_config['min_interval']))
+            if now < next_due:
+                return {
+                    "skip_reason": "not_due",
+                    "last_success": last_success.isoformat(),
+                    "next_due": next_due.isoformat()
+                }
+        return None
+
+    def claim_lease(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """テーブルのリースを取得し、同期中はハートビートで延長する
+
+        取得できた場合はNone、他の実行が保持している場合は保持者の情報を返す。
+        """
+        if not self.config.lease_enabled:
+            return None
+        if not self.sync_metadata_ready:
+            self.ensure_sync_metadata_table()
+            self.sync_metadata_ready = True
+        
+        owner = f"{self.run_id}-{uuid.uuid4().hex[:8]}"
+        metadata_id = f"`{self.config.bigquery_project}.{self.config.bigquery_dataset}.sync_metadata`"
+        # 未保持・期限切れの場合のみ取得し、同じスクリプト内で取得結果を確認する
+        # （未同期のテーブルの行は最終同期と誤認されないようupdated_atをエポックにする）
+        script = f"""
+        MERGE {metadata_id} AS target
+        USING (SELECT @table_name AS table_name) AS source
+        ON target.table_name = source.table_name
+        WHEN MATCHED AND (target.lease_owner IS NULL OR target.lease_expires_at < CURRENT_TIMESTAMP()) THEN
+            UPDATE SET
+                lease_owner = @owner,
+                lease_expires_at = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL @ttl SECOND)
+        WHEN NOT MATCHED THEN
+            INSERT (table_name, last_sync_time, updated_at, lease_owner, lease_expires_at)
+            VALUES (@table_name, NULL, TIMESTAMP_SECONDS(0), @owner, TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL @ttl SECOND));
+        SELECT lease_owner, lease_expires_at FROM {metadata_id} WHERE table_name = @table_name;
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("table_name", "STRING", self.table_key(table_name)),
+                bigquery.ScalarQueryParameter("owner", "STRING", owner),
+                bigquery.ScalarQueryParameter("ttl", "INT64", self.config.lease_ttl_seconds)
+            ]
+        )
+        try:
+            rows = self.with_retry(
+                f"リース取得 ({table_name})",
+                lambda: list(self.bigquery_client.query(script, job_config=job_config).result())
+            )
+        except google_exceptions.BadRequest as e:
+            # 同時に取得しようとした別の実行とDMLが競合した場合は、相手が取得したものとして扱う
+            if "concurrent update" not in str(e):
+                raise
+            rows = []
+        
+        holder = next((row for row in rows if row.lease_owner), None)
+        if holder is None or holder.lease_owner != owner:
+            return {
+                "owner": holder.lease_owner if holder else None,
+                "expires_at": holder.lease_expires_at.isoformat() if holder and holder.lease_expires_at else None
+            }
+        
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(
+            target=self.renew_lease, args=(table_name, owner, stop_event), name=f"lease-{table_name}", daemon=True
+        )
+        heartbeat.start()
+        self.leases[table_name] = (owner, stop_event, heartbeat)
+        self.logger.log_text(f"リースを取得しました: {self.table_key(table_name)} ({owner})", severity="INFO")
+        return None
+
+    def renew_lease(self, table_name: str, owner: str, stop_event: threading.Event):
+        """リースの有効期限を定期的に延長（ハートビート）"""
+        query = f"""
+        UPDATE `{self.config.bigquery_project}.{self.config.bigquery_dataset}.sync_metadata`
+        SET lease_expires_at = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL @ttl SECOND)
+        WHERE table_name = @table_name AND lease_owner = @owner
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("table_name", "STRING", self.table_key(table_name)),
+                bigquery.ScalarQueryParameter("owner", "STRING", owner),
+                bigquery.ScalarQueryParameter("ttl", "INT64", self.config.lease_ttl_seconds)
+            ]
+        )
+        while not stop_event.wait(self.config.lease_heartbeat_seconds):
+            try:
+                job = self.bigquery_client.query(query, job_config=job_config)
+                job.result()
+                if not job.num_dml_affected_rows:
+                    # 期限切れ後に他の実行が取得した場合。同期は続行するが重複の可能性を記録する
+                    self.logger.log_text(f"リースを失いました: {self.table_key(table_name)} ({owner})", severity="ERROR")
+                    return
+            except Exception as e:
+                self.logger.log_text(f"リース延長エラー: {self.table_key(table_name)} - {e}", severity="WARNING")
+
+    def release_leases(self):
+        """保持しているリースのハートビートを止めて解放"""
+        query = f"""
+        UPDATE `{self.config.bigquery_project}.{self.config.bigquery_dataset}.sync_metadata`
+        SET lease_owner = NULL, lease_expires_at = NULL
+        WHERE table_name = @table_name AND lease_owner = @owner
+        """
+        leases, self.leases = self.leases, {}
+        for table_name, (owner, stop_event, heartbeat) in leases.items():
+            stop_event.set()
+            heartbeat.join()
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ScalarQueryParameter("table_name", "STRING", self.table_key(table_name)),
+                    bigquery.ScalarQueryParameter("owner", "STRING", owner)
+                ]
+            )
+            try:
+                self.with_retry(
+                    f"リース解放 ({table_name})",
+                    lambda: self.bigquery_client.query(query, job_config=job_config).result()
+                )
+            except Exception as e:
+                # 解放できなくても有効期限が切れれば他の実行が取得できる
+                self.logger.log_text(f"リース解放エラー: {self.table_key(table_name)} - {e}", severity="WARNING")
+
+    def get_extraction_options(self, table_config: Dict[str, Any]) -> Dict[str, Any]:
+        """テーブル設定から抽出時の分離レベル・クエリヒント設定を取得"""
+        isolation_level = (table_config.get('isolation_level') or 'READ COMMITTED').upper()
+        if isolation_level not in ISOLATION_LEVELS:
+            raise ValueError(f"不正な分離レベルです: {isolation_level}")
+        
+        query_hints = [str(hint).upper() for hint in table_config.get('query_hints', [])]
+        if table_config.get('maxdop') is not None:
+            query_hints.insert(0, f"MAXDOP {int(table_config['maxdop'])}")
+        
+        lock_timeout_ms = table_config.get('lock_timeout_ms')
+        return {
+            "isolation_level": isolation_level,
+            "query_hints": query_hints,
+            "lock_timeout_ms": int(lock_timeout_ms) if lock_timeout_ms is not None else None,
+            "order_by": bool(table_config.get('order_by', True)),
+            "lob": self.get_lob_options(table_config)
+        }
+
+    def get_lob_options(self, table_config: Dict[str, Any]) -> Dict[str, Any]:
+        """テーブル設定の "lob" からLOBカラムの扱いを取得（未指定の項目はLOB_*環境変数の値）"""
+        lob_config = table_config.get('lob') or {}
+        lob = {
+            "default": lob_config.get('default', self.config.lob_default_mode),
+            "columns": dict(lob_config.get('columns', {})),
+            "max_bytes": int(lob_config.get('max_bytes', self.config.lob_max_bytes)),
+            "chunk_bytes": int(lob_config.get('chunk_bytes', self.config.lob_chunk_bytes)),
+            "batch_keys": max(1, int(lob_config.get('batch_keys', self.config.lob_batch_keys))),
+            "write_buffer_bytes": int(lob_config.get('write_buffer_bytes', self.config.lob_write_buffer_bytes)),
+            "key_columns": get_key_columns(table_config)
+        }
+        modes = [lob["default"], *lob["columns"].values()]
+        invalid = [mode for mode in modes if mode not in LOB_MODES]
+        if invalid:
+            raise ValueError(f"LOBの扱いは{'/'.join(LOB_MODES)}のいずれかを指定してください: {invalid}")
+        if 'offload' in modes and not lob["key_columns"]:
+            # 退避したオブジェクトは行の主キーで参照・再取得する
+            raise ValueError("LOBのoffloadにはprimary_keyの指定が必要です")
+        return lob
+
+    def build_session_prefix(self, options: Dict[str, Any]) -> str:
+        """クエリの前に実行するセッション設定（再接続後も必ず適用されるよう毎回付与）"""
+        statements = [f"SET TRANSACTION ISOLATION LEVEL {options['isolation_level']};"]
+        if options["lock_timeout_ms"] is not None:
+            statements.append(f"SET LOCK_TIMEOUT {options['lock_timeout_ms']};")
+        return "\n".join(statements)
+
+    def reset_session(self):
+        """共有接続を既定のセッション設定に戻す"""
+        cursor = self.db_conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED; SET LOCK_TIMEOUT -1;")
+        finally:
+            cursor.close()
+        self.db_conn.commit()
+
+    def extract_data(self, table_name: str, timestamp_column: Optional[str],
+                     options: Optional[Dict[str, Any]] = None, since: Optional[datetime] = None,
+                     window: Optional[Tuple[datetime, datetime]] = None) -> RowBatch:
+        """SQL Serverからデータを抽出
+
+        sinceを指定した場合はsync_metadataの代わりにその時刻以降を、
+        windowを指定した場合はタイムスタンプが[開始, 終了)の範囲の行のみを抽出する。
+        """
         try:
             if not self.db_conn:
                 raise ValueError("データベース接続が初期化されていません")
-
-            cursor = self.db_conn.cursor(as_dict=True)
             
-            if timestamp_column:
-                # タイムスタンプカラムがある場合は差分抽出
-                last_sync = self.get_last_sync_time(table_name)
+            options = options or self.get_extraction_options({})
+            select_list, offload_columns = self.build_select_list(table_name, options["lob"])
+            # 分離レベルはトランザクション開始前に設定する必要があるため、開いているトランザクションを終了
+            self.db_conn.commit()
+            
+            try:
+                if window and not timestamp_column:
+                    raise ValueError(f"範囲指定の抽出にはtimestamp_columnが必要です: {table_name}")
+                last_sync, until = window if window else (None, None)
+                if timestamp_column and not window:
+                    last_sync = since or self.get_last_sync_time(table_name)
                 
-                if last_sync:
-                    query = f"""
-                    SELECT * FROM {table_name}
-                    WHERE {timestamp_column} > %s
-                    ORDER BY {timestamp_column}
-                    """
-                    cursor.execute(query, (last_sync,))
-                    data = cursor.fetchall()
-                    self.logger.log_text(f"差分データを抽出しました: {table_name} ({len(data)}件)", severity="INFO")
+                if timestamp_column and options["order_by"]:
+                    # タイムスタンプカラムがある場合は差分抽出（タイムスタンプ範囲ごとのバッチ）
+                    data = self.extract_batches(
+                        table_name, timestamp_column, last_sync, options, select_list, until=until, inclusive=bool(window)
+                    )
                 else:
-                    query = f"SELECT * FROM {table_name} ORDER BY {timestamp_column}"
-                    cursor.execute(query)
-                    data = cursor.fetchall()
-                    self.logger.log_text(f"初回全件データを抽出しました: {table_name} ({len(data)}件)", severity="INFO")
-            else:
-                # タイムスタンプカラムがない場合は全件抽出
-                query = f"SELECT * FROM {table_name}"
-                cursor.execute(query)
-                data = cursor.fetchall()
+                    # ORDER BYなし・タイムスタンプなしの場合は範囲分割できないため1バッチで抽出
+                    where, params = self.build_range_condition(timestamp_column, last_sync, until, bool(window))
+                    query = self.build_extract_query(f"SELECT {select_list} FROM {table_name} {where}", options)
+                    data = self.with_retry(
+                        f"一括抽出 ({table_name})",
+                        lambda: self.fetch_batch(query, params),
+                        on_retry=self.reconnect_db
+                    )
+            finally:
+                try:
+                    self.reset_session()
+                except Exception as e:
+                    self.logger.log_text(f"セッション設定のリセットエラー: {e}", severity="WARNING")
+            
+            if offload_columns and data:
+                data = self.offload_lobs(table_name, data, offload_columns, options["lob"])
+            # 退避したカラムの値はオブジェクトの参照（文字列）になる
+            data.column_types = {**self.get_column_types(table_name), **{name: 'nvarchar' for name in offload_columns}}
+            
+            if not timestamp_column:
                 self.logger.log_text(f"全件データを抽出しました: {table_name} ({len(data)}件)", severity="INFO")
+            elif last_sync:
+                self.logger.log_text(f"差分データを抽出しました: {table_name} ({len(data)}件)", severity="INFO")
+            else:
+                self.logger.log_text(f"初回全件データを抽出しました: {table_name} ({len(data)}件)", severity="INFO")
             
-            cursor.close()
             return data
             
         except Exception as e:
             self.logger.log_text(f"データ抽出エラー (テーブル: {table_name}): {e}", severity="ERROR")
             raise
 
-    def save_to_gcs(self, data: List[Dict[str, Any]], table_name: str) -> str:
-        """データをCSVとしてGCSに保存"""
+    def build_extract_query(self, select: str, options: Dict[str, Any]) -> str:
+        """セッション設定とOPTIONヒントを付与した抽出クエリを作成"""
+        option_clause = f"OPTION ({', '.join(options['query_hints'])})" if options["query_hints"] else ""
+        return f"{self.build_session_prefix(options)}\n{select}\n{option_clause}"
+
+    def build_range_condition(self, timestamp_column: Optional[str], lower_bound: Optional[datetime],
+                              until: Optional[datetime] = None, inclusive: bool = False) -> Tuple[str, tuple]:
+        """タイムスタンプの範囲条件（WHERE句）とパラメーターを作成"""
+        conditions, params = [], []
+        if timestamp_column and lower_bound is not None:
+            conditions.append(f"{timestamp_column} {'>=' if inclusive else '>'} %s")
+            params.append(lower_bound)
+        if timestamp_column and until is not None:
+            conditions.append(f"{timestamp_column} < %s")
+            params.append(until)
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), tuple(params)
+
+    def extract_batches(self, table_name: str, timestamp_column: str, last_sync: Optional[datetime],
+                        options: Dict[str, Any], select_list: str = "*", until: Optional[datetime] = None,
+                        inclusive: bool = False) -> RowBatch:
+        """タイムスタンプ範囲ごとにバッチ抽出（失敗したバッチの範囲のみ再取得）"""
+        tuner = BatchSizeTuner(
+            initial_rows=self.config.extract_batch_rows,
+            min_rows=self.config.extract_min_batch_rows,
+            max_rows=self.config.extract_max_batch_rows,
+            target_bytes=self.config.extract_target_batch_bytes,
+            target_seconds=self.config.extract_target_batch_seconds,
+            query_timeout=self.config.sql_query_timeout,
+            encode_seconds_per_byte=self.encode_seconds_per_byte
+        )
+        columns: List[str] = []
+        rows: List[tuple] = []
+        lower_bound = last_sync
+        first_batch = True
+        
+        while True:
+            batch_rows = tuner.batch_rows
+            # WITH TIESで境界のタイムスタンプが同じ行をまとめて取得し、次バッチの > 条件で欠落させない
+            if lower_bound is not None or until is not None:
+                # 範囲指定の開始時刻は最初のバッチのみ境界を含める
+                where, params = self.build_range_condition(
+                    timestamp_column, lower_bound, until, inclusive and first_batch
+                )
+            elif first_batch:
+                where, params = "", ()
+            else:
+                # ここまでNULLのみだった場合は、NULL以外の行から再開
+                where, params = f"WHERE {timestamp_column} IS NOT NULL", ()
+            query = self.build_extract_query(f"""
+            SELECT TOP ({batch_rows}) WITH TIES {select_list} FROM {table_name}
+            {where}
+            ORDER BY {timestamp_column}
+            """, options)
+            
+            started = time.monotonic()
+            batch = self.with_retry(
+                f"バッチ抽出 ({table_name}, {timestamp_column} > {lower_bound})",
+                lambda: self.fetch_batch(query, params),
+                on_retry=self.reconnect_db
+            )
+            tuner.observe(len(batch), estimate_row_bytes(batch.rows), time.monotonic() - started)
+            columns = batch.columns
+            rows.extend(batch.rows)
+            
+            if len(batch) < batch_rows:
+                break
+            lower_bound = batch.rows[-1][batch.column_index(timestamp_column)]
+            first_batch = False
+        
+        self.batch_reports[table_name] = tuner.report()
+        return RowBatch(columns, rows)
+
+    def fetch_batch(self, query: str, params: tuple = ()) -> RowBatch:
+        """クエリを実行して結果を1バッチとして取得"""
+        cursor = self.db_conn.cursor()
+        try:
+            cursor.execute(query, params or None)
+            rows = cursor.fetchall()
+            # カラムヘッダーはcursor.descriptionから一度だけ取得
+            columns = [column[0] for column in cursor.description]
+            return RowBatch(columns, rows)
+        finally:
+            cursor.close()
+
+    def save_to_gcs(self, data: RowBatch, table_name: str, stat_columns: Optional[List[str]] = None,
+                    filename: Optional[str] = None) -> List[str]:
+        """データをCSVとしてGCSに保存し、オブジェクト名の一覧を返す（filename省略時はGCS_OBJECT_LAYOUTに従う）
+
+        GCS_SHARD_MAX_ROWS / GCS_SHARD_MAX_MB を超える場合は、それぞれヘッダー付きの複数シャードに分割して並列にアップロードする。
+        """
         try:
             if not data:
                 self.logger.log_text(f"データが空のため、GCSへの保存をスキップします: {table_name}", severity="INFO")
-                return ""
-                
-            # JST タイムスタンプ付きファイル名
-            now_jst = datetime.now(JST)
-            filename = f"{table_name}_{now_jst.strftime('%Y%m%d_%H%M%S')}.csv"
+                return []
             
-            # CSVデータをメモリ上で作成
-            csv_buffer = io.StringIO()
-            if data:
-                writer = csv.DictWriter(csv_buffer, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
+            # CSVデータをメモリ上で作成（マニフェスト用の最小/最大値も同時に集計）
+            started = time.monotonic()
+            shards = self.encode_csv(data, stat_columns or [])
+            self.observe_encode(sum(len(payload) for payload, _, _ in shards), time.monotonic() - started)
             
-            # GCSにアップロード
+            # GCS_OBJECT_LAYOUTに従ったオブジェクト名（JST基準）
+            filenames = self.shard_names(table_name, len(shards), filename)
             bucket = self.storage_client.bucket(self.config.gcs_bucket)
-            blob = bucket.blob(filename)
-            blob.upload_from_string(csv_buffer.getvalue(), content_type='text/csv')
             
-            self.logger.log_text(f"CSVファイルをGCSに保存しました: gs://{self.config.gcs_bucket}/{filename}", severity="INFO")
-            return filename
+            def upload(name: str, payload: bytes):
+                # 大きいファイルは並列マルチパート
+                if len(payload) >= self.config.gcs_parallel_upload_threshold:
+                    self.upload_composite(name, payload, content_type='text/csv')
+                else:
+                    blob = bucket.blob(name)
+                    self.with_retry(
+                        f"GCSアップロード ({name})",
+                        lambda: blob.upload_from_string(payload, content_type='text/csv')
+                    )
+            
+            if len(shards) == 1:
+                upload(filenames[0], shards[0][0])
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.config.gcs_upload_max_workers, len(shards))) as executor:
+                    futures = [executor.submit(upload, name, payload) for name, (payload, _, _) in zip(filenames, shards)]
+                    for future in futures:
+                        future.result()
+            
+            for part, (name, (payload, rows, column_stats)) in enumerate(zip(filenames, shards)):
+                self.manifest_entries.append({
+                    "table": self.table_key(table_name),
+                    "source": self.source_name,
+                    "run_id": self.run_id,
+                    "part": part,
+                    "object": f"gs://{self.config.gcs_bucket}/{name}",
+                    "rows": rows,
+                    "bytes": len(payload),
+                    "sha256": hashlib.sha256(payload).hexdigest(),
+                    "stats": column_stats
+                })
+            
+            shard_note = f" ({len(shards)}シャード)" if len(shards) > 1 else ""
+            self.logger.log_text(
+                f"CSVファイルをGCSに保存しました: gs://{self.config.gcs_bucket}/{filenames[0]}{shard_note}", severity="INFO"
+            )
+            return filenames
             
         except Exception as e:
             self.logger.log_text(f"GCS保存エラー: {e}", severity="ERROR")
             raise
 
-    def get_max_timestamp(self, data: List[Dict[str, Any]], timestamp_column: str) -> Optional[datetime]:
+    def manifest_bytes(self, filenames: List[str]) -> int:
+        """保存したオブジェクトの合計バイト数をマニフェストエントリから取得（他のワーカーと共有しているためオブジェクト名で探す）"""
+        objects = {f"gs://{self.config.gcs_bucket}/{name}" for name in filenames}
+        return sum(entry["bytes"] for entry in list(self.manifest_entries) if entry["object"] in objects)
+
+    def get_sink(self, table_config: Dict[str, Any]) -> str:
+        """テーブルの出力先（gcs | bigquery_write）を取得"""
+        sink = table_config.get('sink', 'gcs')
+        if sink not in ('gcs', 'bigquery_write'):
+            raise ValueError(f"sinkはgcsまたはbigquery_writeを指定してください: {sink}")
+        if sink == 'bigquery_write' and table_config.get('primary_key'):
+            # 重複排除MERGEはGCSからステージングテーブルへのロードを前提とする
+            raise ValueError("primary_keyを指定したテーブルではsink: bigquery_writeは使用できません")
+        return sink
+
+    def save_to_bigquery(self, data: RowBatch, table_name: str, table_config: Dict[str, Any]) -> Tuple[str, int]:
+        """データをStorage Write APIでBigQueryに直接書き込み、書き込み先テーブルIDとバイト数を返す"""
+        try:
+            mode = table_config.get('write_mode', 'pending')
+            destination = table_config.get('write_table', self.bigquery_table_name(table_name))
+            table_id = f"{self.config.bigquery_project}.{self.config.bigquery_dataset}.{destination}"
+            bigquery_types = [
+                SQL_TYPE_BIGQUERY.get(data.column_types.get(column, '').lower(), 'STRING') for column in data.columns
+            ]
+            
+            # 書き込み先テーブルが存在しない場合はソースの型から作成
+            table = bigquery.Table(table_id, schema=[
+                bigquery.SchemaField(column, bigquery_type) for column, bigquery_type in zip(data.columns, bigquery_types)
+            ])
+            self.bigquery_client.create_table(table, exists_ok=True)
+            
+            sink = StorageWriteSink(
+                self.bigquery_write_client,
+                f"projects/{self.config.bigquery_project}/datasets/{self.config.bigquery_dataset}/tables/{destination}",
+                data.columns,
+                bigquery_types,
+                mode=mode,
+                max_request_bytes=self.config.bigquery_write_max_request_bytes
+            )
+            if mode == 'pending':
+                # 未コミットのストリームは破棄されるため、新しいストリームで最初からやり直せる
+                stream_name = self.with_retry(f"Storage Write API書き込み ({table_id})", lambda: sink.write(data.rows))
+            else:
+                # committedは追記済みの行が既に反映されているため、再実行すると重複する
+                stream_name = sink.write(data.rows)
+            
+            self.logger.log_text(
+                f"Storage Write APIで書き込みました: {table_id} ({len(data)}行, {mode}, ストリーム: {stream_name})",
+                severity="INFO"
+            )
+            return table_id, sink.bytes_written
+            
+        except Exception as e:
+            self.logger.log_text(f"Storage Write API書き込みエラー: {table_name} - {e}", severity="ERROR")
+            raise
+
+    def observe_encode(self, payload_bytes: int, seconds: float):
+        """エンコード速度（秒/バイト）を指数移動平均で更新し、バッチサイズ調整に利用"""
+        if payload_bytes <= 0:
+            return
+        observed = seconds / payload_bytes
+        if self.encode_seconds_per_byte:
+            self.encode_seconds_per_byte = 0.7 * self.encode_seconds_per_byte + 0.3 * observed
+        else:
+            self.encode_seconds_per_byte = observed
+
+    def encode_csv(self, data: RowBatch, stat_columns: List[str]) -> List[Tuple[bytes, int, Dict[str, Dict[str, Any]]]]:
+        """データをCSVにエンコードし、シャードごとに (ヘッダー付きCSV, 行数, 指定カラムの最小/最大値) を返す
+
+        大きいテーブルはプロセスプールで並列化する。シャード上限が設定されている場合は、
+        上限に対して十分小さいバッチ単位でエンコードし、上限を超える手前で次のシャードに切り替える。
+        """
+        header = encode_csv_batch([data.columns]).encode('utf-8')
+        rows = data.rows
+        stat_indexes = [index for index in map(data.column_index, stat_columns) if index is not None]
+        encoder_names = data.encoder_names()
+        max_rows = self.config.gcs_shard_max_rows
+        max_bytes = self.config.gcs_shard_max_bytes
+        
+        batch_rows = self.config.csv_encode_batch_rows
+        if max_rows:
+            batch_rows = min(batch_rows, max_rows)
+        if max_bytes:
+            batch_rows = min(batch_rows, max(1, int(max_bytes // max(1.0, estimate_row_bytes(rows)) // 8)))
+        batches = [rows[i:i + batch_rows] for i in range(0, len(rows), batch_rows)]
+        
+        # 小さいテーブルはプールのオーバーヘッドが勝るためプロセス内でエンコード
+        if self.config.csv_encode_workers <= 1 or len(rows) < self.config.csv_encode_parallel_min_rows:
+            if not (max_rows or max_bytes):
+                batches = [rows]
+            results = [encode_csv_batch_with_stats(batch, stat_indexes, encoder_names) for batch in batches]
+        else:
+            if self.encode_pool is None:
+                self.encode_pool = create_process_pool(self.config.csv_encode_workers)
+            # mapは投入順に結果を返すため、行順序はそのまま保持される
+            results = list(self.encode_pool.map(
+                encode_csv_batch_with_stats, batches, itertools.repeat(stat_indexes), itertools.repeat(encoder_names)
+            ))
+        
+        shards: List[Dict[str, Any]] = []
+        for batch, (text, stats) in zip(batches, results):
+            payload = text.encode('utf-8')
+            shard = shards[-1] if shards else None
+            if shard is None or (shard["rows"] and (
+                (max_rows and shard["rows"] + len(batch) > max_rows)
+                or (max_bytes and shard["bytes"] + len(payload) > max_bytes)
+            )):
+                # 各シャードは単独で読み込めるようヘッダーから始める
+                shard = {"parts": [header], "bytes": len(header), "rows": 0, "stats": {}}
+                shards.append(shard)
+            shard["parts"].append(payload)
+            shard["bytes"] += len(payload)
+            shard["rows"] += len(batch)
+            merge_column_stats(shard["stats"], stats)
+        
+        return [
+            (
+                b"".join(shard["parts"]),
+                shard["rows"],
+                {data.columns[index]: {"min": low, "max": high} for index, (low, high) in shard["stats"].items()}
+            )
+            for shard in shards
+        ]
+
+    def upload_composite(self, filename: str, payload: bytes, content_type: str) -> None:
+        """分割したパートを並列アップロードし、GCS composeで最終オブジェクトに結合"""
+        bucket = self.storage_client.bucket(self.config.gcs_bucket)
+        
+        # compose上限を超えないようにパートサイズを調整
+        part_size = max(
+            self.config.gcs_upload_part_size,
+            math.ceil(len(payload) / GCS_COMPOSE_MAX_SOURCES)
+        )
+        chunks = [payload[i:i + part_size] for i in range(0, len(payload), part_size)]
+        parts = [bucket.blob(f"{filename}.parts/{index:05d}") for index in range(len(chunks))]
+        
+        def upload_part(part, chunk):
+            # パート名は決定的なため、再試行は同じオブジェクトを上書きする
+            self.with_retry(
+                f"パートアップロード ({part.name})",
+                lambda: part.upload_from_string(chunk, content_type=content_type)
+            )
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.gcs_upload_max_workers) as executor:
+                futures = [executor.submit(upload_part, part, chunk) for part, chunk in zip(parts, chunks)]
+                for future in futures:
+                    future.result()
+            
+            final_blob = bucket.blob(filename)
+            final_blob.content_type = content_type
+            self.with_retry(f"GCS compose ({filename})", lambda: final_blob.compose(parts))
+            
+            self.logger.log_text(
+                f"並列アップロードを結合しました: gs://{self.config.gcs_bucket}/{filename} ({len(parts)}パート)",
+                severity="INFO"
+            )
+        finally:
+            # 一時パートは成功・失敗にかかわらず削除
+            for part in parts:
+                try:
+                    part.delete()
+                except Exception as e:
+                    self.logger.log_text(f"一時パート削除エラー: {part.name} - {e}", severity="WARNING")
+
+    def get_max_timestamp(self, data: RowBatch, timestamp_column: str) -> Optional[datetime]:
         """データから最大タイムスタンプを取得"""
         try:
-            if not data or timestamp_column not in data[0]:
+            index = data.column_index(timestamp_column)
+            if not data or index is None:
                 return None
                 
-            max_ts = max(row[timestamp_column] for row in data if row[timestamp_column] is not None)
+            max_ts = max((row[index] for row in data.rows if row[index] is not None), default=None)
             
             if max_ts is None:
                 return None
@@ -261,82 +2437,934 @@ class DataSyncManager:
             self.logger.log_text(f"最大タイムスタンプ取得エラー: {e}", severity="ERROR")
             return None
 
-    def sync_table(self, table_name: str, table_config: Dict[str, Any]):
+    @contextmanager
+    def profile_phase(self, table_name: str, phase: str):
+        """プロファイリングが有効なテーブルのみ、フェーズの処理を計測"""
+        profiler = self.profilers.get(table_name)
+        if profiler is None:
+            yield
+            return
+        with profiler.profile(phase):
+            yield
+
+    def write_profile_reports(self, table_name: str, profiler: PhaseProfiler) -> Dict[str, Any]:
+        """フェーズごとのプロファイルを出力し、レスポンス用の概要を返す"""
+        prefix = f"{self.config.profile_gcs_prefix}/{self.run_id}/{self.table_key(table_name)}"
+        summary: Dict[str, Any] = {}
+        for phase, report in profiler.reports.items():
+            summary[phase] = dict(report)
+            try:
+                for ext, payload in profiler.artifacts[phase].items():
+                    name = f"{prefix}/{phase}.{ext}"
+                    if self.config.profile_local_dir:
+                        path = os.path.join(self.config.profile_local_dir, name)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(path, 'wb') as report_file:
+                            report_file.write(payload)
+                    else:
+                        blob = self.storage_client.bucket(self.config.gcs_bucket).blob(name)
+                        self.with_retry(f"プロファイル保存 ({name})", lambda: blob.upload_from_string(payload))
+                summary[phase]["report"] = (
+                    os.path.join(self.config.profile_local_dir, prefix) if self.config.profile_local_dir
+                    else f"gs://{self.config.gcs_bucket}/{prefix}"
+                )
+            except Exception as e:
+                # プロファイルは調査用の補助情報のため、保存に失敗しても同期結果は維持する
+                self.logger.log_text(f"プロファイル保存エラー: {table_name}/{phase} - {e}", severity="WARNING")
+        return summary
+
+    def new_result(self, table_name: str, table_config: Dict[str, Any]) -> Dict[str, Any]:
+        """テーブル結果の初期値"""
+        return {
+            "table": self.table_key(table_name),
+            "source": self.source_name,
+            "status": "success",
+            "sink": self.get_sink(table_config),
+            "rows": 0,
+            "file": None,
+            # ソースDBの負荷と突き合わせられるよう、抽出時の設定を結果に含める
+            "extraction_options": self.get_extraction_options(table_config)
+        }
+
+    def sync_table(self, table_name: str, table_config: Dict[str, Any]) -> Dict[str, Any]:
         """単一テーブルの同期を実行"""
         try:
             self.logger.log_text(f"テーブル同期開始: {table_name}", severity="INFO")
+            started = time.monotonic()
             
             timestamp_column = table_config.get('timestamp_column')
+            result = self.new_result(table_name, table_config)
+            if table_config.get('profile'):
+                self.profilers[table_name] = PhaseProfiler(self.config.profile_top_n)
             
             # データ抽出
-            data = self.extract_data(table_name, timestamp_column)
+            with self.profile_phase(table_name, 'extract_data'):
+                data = self.extract_data(table_name, timestamp_column, result["extraction_options"])
+            if table_name in self.batch_reports:
+                result["batch_sizes"] = self.batch_reports.pop(table_name)
+            if table_name in self.lob_reports:
+                result["lob"] = self.lob_reports.pop(table_name)
             
             if not data:
                 self.logger.log_text(f"同期対象データなし: {table_name}", severity="INFO")
-                return
-            
-            # GCSに保存
-            gcs_filename = self.save_to_gcs(data, table_name)
-            
-            # 最大タイムスタンプを取得
-            max_timestamp = None
-            if timestamp_column:
-                max_timestamp = self.get_max_timestamp(data, timestamp_column)
-            
-            # 同期メタデータを更新
-            self.update_sync_metadata(table_name, max_timestamp)
+                if has_schedule(table_config):
+                    # 差分がなくても同期成功として記録し、min_intervalの判定に使う（ウォーターマークは変更しない）
+                    self.update_sync_metadata(table_name, None)
+                return result
             
-            self.logger.log_text(f"テーブル同期完了: {table_name} (ファイル: {gcs_filename})", severity="INFO")
+            return self.publish(table_name, table_config, data, result, started)
             
         except Exception as e:
             self.logger.log_text(f"テーブル同期エラー: {table_name} - {e}", severity="ERROR")
             raise
+        finally:
+            # 失敗したフェーズも含めてプロファイルを出力し、概要を結果に含める
+            profiler = self.profilers.pop(table_name, None)
+            if profiler:
+                result["profile"] = self.write_profile_reports(table_name, profiler)
 
-    def run_sync(self):
-        """全体の同期プロセスを実行"""
+    def publish(self, table_name: str, table_config: Dict[str, Any], data: RowBatch,
+                result: Dict[str, Any], started: float, advance_watermark: bool = True) -> Dict[str, Any]:
+        """抽出済みデータを出力先に書き込み、ウォーターマークを進める（MERGE対象は適用ステージで更新）
+
+        過去の範囲を再同期する場合はadvance_watermark=Falseとし、sync_metadataを変更しない。
+        """
+        timestamp_column = table_config.get('timestamp_column')
+        
+        if result["sink"] == 'bigquery_write':
+            # BigQueryへ直接書き込み（コミット完了後にのみウォーターマークを進める）
+            gcs_filenames = []
+            with self.profile_phase(table_name, 'save_to_bigquery'):
+                result["destination"], result["bytes"] = self.save_to_bigquery(data, table_name, table_config)
+        else:
+            # GCSに保存（タイムスタンプ列・キー列の最小/最大値をマニフェストに記録）
+            stat_columns = ([timestamp_column] if timestamp_column else []) + get_key_columns(table_config)
+            with self.profile_phase(table_name, 'save_to_gcs'):
+                gcs_filenames = self.save_to_gcs(data, table_name, stat_columns)
+            result["bytes"] = self.manifest_bytes(gcs_filenames)
+        gcs_filename = gcs_filenames[0] if gcs_filenames else None
+        
+        # 最大タイムスタンプを取得
+        max_timestamp = None
+        if timestamp_column:
+            with self.profile_phase(table_name, 'get_max_timestamp'):
+                max_timestamp = self.get_max_timestamp(data, timestamp_column)
+        
+        if table_config.get('primary_key'):
+            # MERGE適用後にウォーターマークを進めるため、メタデータ更新は適用ステージで行う
+            self.pending_merges.append({
+                "table": table_name,
+                "key": self.table_key(table_name),
+                "config": table_config,
+                "files": gcs_filenames,
+                "max_timestamp": max_timestamp,
+                "advance_watermark": advance_watermark
+            })
+        elif advance_watermark:
+            # 同期メタデータを更新
+            with self.profile_phase(table_name, 'update_sync_metadata'):
+                self.update_sync_metadata(table_name, max_timestamp)
+        
+        self.logger.log_text(f"テーブル同期完了: {table_name} (出力先: {gcs_filename or result.get('destination')})", severity="INFO")
+        
+        result["rows"] = len(data)
+        result["file"] = gcs_filename
+        if len(gcs_filenames) > 1:
+            result["files"] = gcs_filenames
+        result["duration_seconds"] = round(time.monotonic() - started, 3)
+        
+        # ドライランの所要時間見積もりに使うスループット実績を記録
+        self.record_sync_history(table_name, result)
+        return result
+
+    def run_sync(self) -> List[Dict[str, Any]]:
+        """全体の同期プロセスを実行（ソースごとに並列、ソース内は同時実行数の上限まで並列）"""
         try:
             self.logger.log_text("データ同期処理を開始します", severity="INFO")
+            self.run_id = self.new_run_id()
             
-            # SQL Server接続
-            self.db_conn = self.create_db_connection()
+            # エンコード用プロセスプールは全ソースのワーカーで共有
+            if self.config.csv_encode_workers > 1:
+                self.encode_pool = create_process_pool(self.config.csv_encode_workers)
             
-            # 各テーブルを同期
-            for table_name, table_config in self.config.sync_tables.items():
-                try:
-                    self.sync_table(table_name, table_config)
-                except Exception as e:
-                    self.logger.log_text(f"テーブル {table_name} の同期でエラーが発生しました: {e}", severity="ERROR")
-                    # 他のテーブルの同期は続行
-                    continue
+            # 実行間隔・時間帯が指定されたテーブルの判定用に最終同期時刻をまとめて取得
+            scheduled = any(has_schedule(table_config) for table_config in self.config.sync_tables.values())
+            last_success = self.get_last_success_times() if scheduled and not self.config.force_sync else {}
+            
+            sources = self.config.sources
+            with ThreadPoolExecutor(max_workers=max(1, len(sources))) as executor:
+                futures = [executor.submit(self.sync_source, source_name, last_success) for source_name in sources]
+                sync_results = [result for future in futures for result in future.result()]
+            
+            # 実行マニフェストとテーブル別インデックスを出力
+            if self.config.manifest_enabled and self.manifest_entries:
+                self.write_manifest(sync_results)
             
             self.logger.log_text("データ同期処理が完了しました", severity="INFO")
+            return sync_results
             
         except Exception as e:
             self.logger.log_text(f"データ同期処理でエラーが発生しました: {e}", severity="ERROR")
             raise
         finally:
             # リソースクリーンアップ
-            if self.db_conn:
-                self.db_conn.close()
+            if self.encode_pool:
+                self.encode_pool.shutdown()
+                self.encode_pool = None
+
+    def sync_source(self, source_name: str, last_success: Optional[Dict[str, datetime]] = None) -> List[Dict[str, Any]]:
+        """1つのソースのテーブルを同時実行数の上限までのワーカーで同期（実行間隔・時間帯の対象外のテーブルはスキップ）"""
+        all_tables = self.config.sources[source_name]["tables"]
+        now = datetime.now(timezone.utc)
+        skipped: Dict[str, Dict[str, Any]] = {}
+        for table_name, table_config in all_tables.items():
+            key = self.config.table_key(source_name, table_name)
+            skip = None if self.config.force_sync else self.schedule_skip(
+                table_name, table_config, (last_success or {}).get(key), now
+            )
+            if skip:
+                self.logger.log_text(f"同期対象外のためスキップします: {key} ({skip['skip_reason']})", severity="INFO")
+                skipped[table_name] = {"table": key, "source": source_name, "status": "skipped", **skip}
+        tables = {name: config for name, config in all_tables.items() if name not in skipped}
+        if not tables:
+            # 対象テーブルのないソースには接続しない
+            return [skipped[table_name] for table_name in all_tables]
+        
+        table_queue: queue.Queue = queue.Queue()
+        for item in tables.items():
+            table_queue.put(item)
+        
+        pending_merges: List[Dict[str, Any]] = []
+        concurrency = min(self.config.sources[source_name]["max_concurrency"], len(tables))
+        workers = [self.source_worker(source_name, pending_merges) for _ in range(max(1, concurrency))]
+        results: Dict[str, Dict[str, Any]] = {}
+        
+        def drain(worker: DataSyncManager):
+            # ワーカーごとにSQL Server接続を持ち、キューが空になるまでテーブルを同期
+            worker.db_conn = worker.create_db_connection()
+            try:
+                while True:
+                    try:
+                        table_name, table_config = table_queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        holder = worker.claim_lease(table_name)
+                        if holder:
+                            # 他の実行が同期中のテーブルは重複させずにスキップ
+                            self.logger.log_text(
+                                f"他の実行が同期中のためスキップします: {worker.table_key(table_name)} (保持者: {holder['owner']})",
+                                severity="WARNING"
+                            )
+                            results[table_name] = {
+                                "table": worker.table_key(table_name), "source": source_name,
+                                "status": "skipped", "skip_reason": "lease_held", "lease": holder
+                            }
+                            continue
+                        results[table_name] = worker.sync_table(table_name, table_config)
+                    except Exception as e:
+                        self.logger.log_text(f"テーブル {worker.table_key(table_name)} の同期でエラーが発生しました: {e}", severity="ERROR")
+                        results[table_name] = {
+                            "table": worker.table_key(table_name), "source": source_name, "status": "error", "error": str(e)
+                        }
+                        # 他のテーブルの同期は続行
+            finally:
+                worker.db_conn.close()
+        
+        connection_errors = []
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            for future in [executor.submit(drain, worker) for worker in workers]:
+                try:
+                    future.result()
+                except Exception as e:
+                    connection_errors.append(e)
+        
+        # 全ワーカーが接続できずに残ったテーブルは接続エラーとして扱う
+        for table_name in tables:
+            if table_name not in results:
+                results[table_name] = {
+                    "table": workers[0].table_key(table_name), "source": source_name,
+                    "status": "error", "error": str(connection_errors[0] if connection_errors else "未実行")
+                }
+        results.update(skipped)
+        sync_results = [results[table_name] for table_name in all_tables]
+        
+        try:
+            # ステージングした差分を重複排除ターゲットへまとめてMERGE
+            if pending_merges:
+                workers[0].apply_staged_increments(sync_results)
+        finally:
+            # ウォーターマークの更新まで完了してからリースを解放
+            for worker in workers:
+                worker.release_leases()
+        return sync_results
+
+    def write_manifest(self, sync_results: List[Dict[str, Any]]):
+        """実行で生成したファイルの一覧をマニフェストとして保存し、テーブル別インデックスに追記"""
+        entries, self.manifest_entries = self.manifest_entries, []
+        bucket = self.storage_client.bucket(self.config.gcs_bucket)
+        
+        # MERGE失敗などでエラーになったテーブルのファイルは取り込み済みとして扱わない
+        failed_tables = {result["table"] for result in sync_results if result["status"] == "error"}
+        entries = [entry for entry in entries if entry["table"] not in failed_tables]
+        if not entries:
+            return
+        
+        manifest_name = f"{self.config.manifest_prefix}/runs/{self.run_id}.json"
+        manifest = {
+            "run_id": self.run_id,
+            "created_at": datetime.now(timezone.utc),
+            "files": entries
+        }
+        try:
+            self.with_retry(
+                f"マニフェスト保存 ({manifest_name})",
+                lambda: bucket.blob(manifest_name).upload_from_string(
+                    json.dumps(manifest, ensure_ascii=False, default=json_default),
+                    content_type='application/json'
+                )
+            )
+            
+            tables = sorted({entry["table"] for entry in entries})
+            for table_name in tables:
+                self.update_manifest_index(bucket, table_name, [e for e in entries if e["table"] == table_name])
+            
+            self.logger.log_text(f"マニフェストを保存しました: gs://{self.config.gcs_bucket}/{manifest_name}", severity="INFO")
+        except Exception as e:
+            # マニフェストは補助情報のため、失敗しても同期結果は維持する
+            self.logger.log_text(f"マニフェスト保存エラー: {e}", severity="ERROR")
+
+    def update_manifest_index(self, bucket, table_name: str, entries: List[Dict[str, Any]], max_attempts: int = 5):
+        """テーブル別・日別（JST）のインデックスにファイル情報を追記（世代番号の条件付き更新で同時実行に対応）
+
+        インデックスは {prefix}/index/{table}/dt={date}/index.json に日ごとに分割し、
+        更新のたびに読み書きする量と同時更新の競合を1日分に抑える。
+        """
+        index_date = datetime.now(JST).strftime('%Y-%m-%d')
+        index_name = f"{self.config.manifest_prefix}/index/{table_name}/dt={index_date}/index.json"
+        new_files = [{
+            "object": entry["object"],
+            "run_id": entry["run_id"],
+            "rows": entry["rows"],
+            "bytes": entry["bytes"],
+            "stats": entry["stats"]
+        } for entry in entries]
+        
+        for _ in range(max_attempts):
+            blob = bucket.blob(index_name)
+            try:
+                blob.reload()
+                generation = blob.generation
+                index = json.loads(blob.download_as_text())
+            except google_exceptions.NotFound:
+                generation = 0
+                index = {"table": table_name, "date": index_date, "files": []}
+            
+            index["files"].extend(new_files)
+            index["updated_at"] = datetime.now(timezone.utc)
+            try:
+                blob.upload_from_string(
+                    json.dumps(index, ensure_ascii=False, default=json_default),
+                    content_type='application/json',
+                    if_generation_match=generation
+                )
+                return
+            except google_exceptions.PreconditionFailed:
+                # 他の実行が先に更新した場合は読み直して再試行
+                continue
+        raise RuntimeError(f"マニフェストインデックスの更新が競合しました: {index_name}")
+
+    def apply_staged_increments(self, sync_results: List[Dict[str, Any]]):
+        """ステージングした差分をロードし、複数テーブル分のMERGEを1スクリプトにまとめて実行"""
+        results_by_table = {result["table"]: result for result in sync_results}
+        pending, self.pending_merges = self.pending_merges, []
+        
+        def load(merge: Dict[str, Any]):
+            # 失敗したロードジョブはresult()を呼び直しても同じエラーになるため、再試行ではジョブを投入し直す
+            return self.with_retry(
+                f"ステージングロード ({merge['table']})",
+                lambda: self.stage_increment(merge["table"], merge["files"]).result()
+            )
+        
+        # ステージングテーブルへのロードジョブは並列に実行
+        loads = []
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+            for merge, future in [(merge, executor.submit(load, merge)) for merge in pending]:
+                try:
+                    loads.append((merge, future.result()))
+                except Exception as e:
+                    self.mark_merge_error(results_by_table[merge["key"]], e)
+        
+        try:
+            statements = []
+            for merge, load_job in loads:
+                try:
+                    staging_table = self.bigquery_client.get_table(load_job.destination)
+                    statements.append((merge, self.build_merge_statement(merge["table"], merge["config"], staging_table)))
+                except Exception as e:
+                    self.mark_merge_error(results_by_table[merge["key"]], e)
+            
+            batch_size = max(1, self.config.merge_script_max_tables)
+            for i in range(0, len(statements), batch_size):
+                group = statements[i:i + batch_size]
+                script = "\n".join(statement for _, statement in group)
+                try:
+                    self.with_retry(
+                        f"MERGEスクリプト ({', '.join(merge['table'] for merge, _ in group)})",
+                        lambda: self.bigquery_client.query(script).result()
+                    )
+                except Exception as e:
+                    for merge, _ in group:
+                        self.mark_merge_error(results_by_table[merge["key"]], e)
+                    continue
+                
+                for merge, _ in group:
+                    result = results_by_table[merge["key"]]
+                    try:
+                        if merge["advance_watermark"]:
+                            self.update_sync_metadata(merge["table"], merge["max_timestamp"])
+                        result["merge"] = "applied"
+                        self.logger.log_text(f"重複排除ターゲットへMERGEしました: {merge['table']}", severity="INFO")
+                    except Exception as e:
+                        self.mark_merge_error(result, e)
+        finally:
+            # ステージングテーブル名は実行ごとに異なり次回の実行で上書きされないため、成否にかかわらず削除
+            for _, load_job in loads:
+                self.drop_staging_table(load_job.destination)
+
+    def drop_staging_table(self, staging_table):
+        """ステージングテーブルを削除（削除の失敗はログのみ）"""
+        try:
+            self.bigquery_client.delete_table(staging_table, not_found_ok=True)
+        except Exception as e:
+            self.logger.log_text(f"ステージングテーブルの削除に失敗しました: {staging_table} - {e}", severity="WARNING")
+
+    def mark_merge_error(self, result: Dict[str, Any], error: Exception):
+        """MERGE適用の失敗をテーブル結果に記録（ウォーターマークは進めない）"""
+        self.logger.log_text(f"MERGE適用エラー: {result['table']} - {error}", severity="ERROR")
+        result["status"] = "error"
+        result["merge"] = "error"
+        result["error"] = str(error)
+
+    def stage_increment(self, table_name: str, gcs_filenames: List[str]):
+        """GCSに保存した差分CSV（全シャード）をステージングテーブルへロード（ジョブを返す）"""
+        # 実行ごとに別のステージングテーブルを使い、並行する実行のロード（WRITE_TRUNCATE）・削除と競合しない
+        staging_name = f"_staging_{self.bigquery_table_name(table_name)}_{self.run_id.replace('-', '_')}"
+        staging_table_id = f"{self.config.bigquery_project}.{self.config.bigquery_dataset}.{staging_name}"
+        target_table_id = f"{self.config.bigquery_project}.{self.config.merge_target_dataset}.{self.bigquery_table_name(table_name)}"
+        
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.CSV,
+            skip_leading_rows=1,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        )
+        if CSV_NULL_MARKER:
+            job_config.null_marker = CSV_NULL_MARKER
+        # ターゲットが存在すればそのスキーマを使い、初回のみ自動検出
+        try:
+            job_config.schema = self.bigquery_client.get_table(target_table_id).schema
+        except google_exceptions.NotFound:
+            job_config.autodetect = True
+        
+        return self.bigquery_client.load_table_from_uri(
+            [f"gs://{self.config.gcs_bucket}/{name}" for name in gcs_filenames],
+            staging_table_id,
+            job_config=job_config
+        )
+
+    def build_merge_statement(self, table_name: str, table_config: Dict[str, Any], staging_table) -> str:
+        """最新バージョンのみを残すMERGE文（影響パーティションのみ走査）を作成"""
+        key_columns = get_key_columns(table_config)
+        timestamp_column = table_config.get('timestamp_column')
+        partition_column = table_config.get('partition_column')
+        
+        staging_id = f"`{staging_table.project}.{staging_table.dataset_id}.{staging_table.table_id}`"
+        target_id = f"`{self.config.bigquery_project}.{self.config.merge_target_dataset}.{self.bigquery_table_name(table_name)}`"
+        field_types = {field.name: field.field_type for field in staging_table.schema}
+        columns = [field.name for field in staging_table.schema]
+        
+        # 同一キーの複数バージョンはタイムスタンプが最新の1行に絞り込む
+        order_by = f"ORDER BY {timestamp_column} DESC" if timestamp_column else ""
+        source = (
+            f"SELECT * EXCEPT(_row_number) FROM ("
+            f"SELECT *, ROW_NUMBER() OVER (PARTITION BY {', '.join(key_columns)} {order_by}) AS _row_number "
+            f"FROM {staging_id}) WHERE _row_number = 1"
+        )
+        
+        on_conditions = [f"T.{column} = S.{column}" for column in key_columns]
+        partition_ddl = ""
+        declare = ""
+        if partition_column:
+            # パーティション列は更新されない列（作成日など）を指定する前提
+            is_date = field_types.get(partition_column) == "DATE"
+            partition_expr = partition_column if is_date else f"DATE({partition_column})"
+            target_partition_expr = f"T.{partition_column}" if is_date else f"DATE(T.{partition_column})"
+            partition_ddl = f"PARTITION BY {partition_expr}"
+            # 影響パーティションを先に確定し、ON句の定数条件でターゲットの走査をプルーニング
+            declare = f"DECLARE affected_partitions ARRAY<DATE> DEFAULT (SELECT ARRAY_AGG(DISTINCT {partition_expr}) FROM {staging_id});"
+            on_conditions.append(f"{target_partition_expr} IN UNNEST(affected_partitions)")
+        
+        matched_clause = ""
+        update_set = ", ".join(f"{column} = S.{column}" for column in columns if column not in key_columns)
+        if update_set:
+            matched_condition = f"AND S.{timestamp_column} >= T.{timestamp_column}" if timestamp_column else ""
+            matched_clause = f"WHEN MATCHED {matched_condition} THEN UPDATE SET {update_set}"
+        column_list = ", ".join(columns)
+        
+        # DECLAREはブロック先頭にしか書けないため、テーブルごとにBEGIN...ENDで囲む
+        return f"""
+        BEGIN
+        {declare}
+        CREATE TABLE IF NOT EXISTS {target_id}
+        {partition_ddl}
+        CLUSTER BY {', '.join(key_columns[:4])}
+        AS SELECT * FROM {staging_id} LIMIT 0;
+        MERGE {target_id} AS T
+        USING ({source}) AS S
+        ON {' AND '.join(on_conditions)}
+        {matched_clause}
+        WHEN NOT MATCHED THEN
+            INSERT ({column_list}) VALUES ({', '.join('S.' + column for column in columns)});
+        END;
+        """
+
+class SyncDispatcher:
+    """テーブルをシャードに分割し、別の実行単位へファンアウトするディスパッチャー"""
+    
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self.logger = get_sync_logger()
+    
+    def split_shards(self) -> List[List[str]]:
+        """SYNC_TABLES_CONFIGのテーブルをラウンドロビンでシャードに分割"""
+        table_names = list(self.config.sync_tables.keys())
+        shard_count = max(1, min(self.config.fanout_shard_count, len(table_names)))
+        shards: List[List[str]] = [[] for _ in range(shard_count)]
+        for index, table_name in enumerate(table_names):
+            shards[index % shard_count].append(table_name)
+        return [shard for shard in shards if shard]
+    
+    def dispatch(self) -> List[Dict[str, Any]]:
+        """各シャードを並列に実行し、テーブルごとの結果を集約"""
+        shards = self.split_shards()
+        self.logger.log_text(
+            f"ファンアウト実行を開始します: {len(shards)}シャード (バックエンド: {self.config.fanout_backend})",
+            severity="INFO"
+        )
+        
+        if self.config.fanout_backend == 'process':
+            executor = create_process_pool(len(shards))
+            run_shard = run_shard_locally
+        elif self.config.fanout_backend == 'http':
+            if not self.config.fanout_target_url:
+                raise ValueError("FANOUT_TARGET_URLが設定されていません")
+            executor = ThreadPoolExecutor(max_workers=len(shards))
+            run_shard = self.invoke_remote
+        else:
+            raise ValueError(f"不明なファンアウトバックエンドです: {self.config.fanout_backend}")
+        
+        sync_results: List[Dict[str, Any]] = []
+        with executor:
+            futures = [
+                (shard, executor.submit(run_shard, shard, self.profiled_tables(shard), self.config.force_sync))
+                for shard in shards
+            ]
+            for shard, future in futures:
+                try:
+                    sync_results.extend(future.result())
+                except Exception as e:
+                    # シャード単位の失敗は所属テーブル全てをエラーとして扱う
+                    self.logger.log_text(f"シャード実行エラー: {shard} - {e}", severity="ERROR")
+                    sync_results.extend(
+                        {
+                            "table": table_key, "source": self.config.split_table_key(table_key)[0],
+                            "status": "error", "error": str(e)
+                        }
+                        for table_key in shard
+                    )
+        return sync_results
+    
+    def profiled_tables(self, table_names: List[str]) -> List[str]:
+        """シャード内でプロファイリングが有効なテーブル（ワーカーへ引き継ぐ）"""
+        return [name for name in table_names if self.config.sync_tables[name].get('profile')]
+    
+    def invoke_remote(self, table_names: List[str], profile_tables: List[str], force: bool = False) -> List[Dict[str, Any]]:
+        """同じCloud Functionをテーブルサブセット指定で呼び出す"""
+        auth_request = google_auth_requests.Request()
+        token = google_id_token.fetch_id_token(auth_request, self.config.fanout_target_url)
+        response = requests.post(
+            self.config.fanout_target_url,
+            json={"tables": table_names, "profile": profile_tables, "force": force},
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=self.config.fanout_timeout
+        )
+        body = response.json()
+        if "details" not in body:
+            raise RuntimeError(body.get("message", f"HTTP {response.status_code}"))
+        return body["details"]
+
+
+class SyncService:
+    """DataSyncManagerとDB接続を保持したまま常駐し、テーブルごとに適応的な間隔でポーリングするサービスモード
+
+    ポーリングで取得した行はテーブルごとのマイクロバッチに蓄積し、行数・バイト数・経過時間の
+    いずれかがしきい値に達した時点で出力してウォーターマークを進める。
+    """
+    
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self.manager = DataSyncManager(config)
+        self.logger = get_sync_logger()
+        self.stop_event = threading.Event()
+        self.tables: List[Dict[str, Any]] = []
+        self.workers: List[DataSyncManager] = []
+    
+    def start(self):
+        """ソースごとにワーカーと接続を作成し、タイムスタンプ列を持つテーブルをポーリング対象に登録"""
+        if self.config.csv_encode_workers > 1:
+            self.manager.encode_pool = create_process_pool(self.config.csv_encode_workers)
+        
+        now = time.monotonic()
+        for source_name, source in self.config.sources.items():
+            worker = self.manager.source_worker(source_name, [])
+            # フラッシュごとにマニフェストを書き出すため、ワーカーごとに保持する
+            worker.manifest_entries = []
+            worker.db_conn = worker.create_db_connection()
+            self.workers.append(worker)
+            
+            for table_name, table_config in source["tables"].items():
+                if not table_config.get('timestamp_column'):
+                    # 全件抽出のテーブルは常駐ポーリングの対象外（通常のバッチ実行で同期する）
+                    self.logger.log_text(f"タイムスタンプ列がないためサービスモードの対象外です: {worker.table_key(table_name)}", severity="WARNING")
+                    continue
+                self.tables.append({
+                    "name": table_name,
+                    "config": table_config,
+                    "worker": worker,
+                    "poller": AdaptivePollInterval(
+                        self.config.service_min_poll_seconds,
+                        self.config.service_max_poll_seconds,
+                        self.config.service_target_rows_per_poll
+                    ),
+                    "watermark": None,
+                    "buffer": None,
+                    "buffer_bytes": 0,
+                    "buffered_since": None,
+                    "last_poll": now,
+                    "next_poll": now
+                })
+    
+    def stop(self, *_):
+        """ループを停止（SIGTERM/SIGINTハンドラーからも呼ばれる）"""
+        self.stop_event.set()
+    
+    def run(self):
+        """停止要求（または最大実行時間）までポーリングとフラッシュを繰り返す"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        
+        deadline = time.monotonic() + self.config.service_max_runtime if self.config.service_max_runtime else None
+        try:
+            self.start()
+            self.logger.log_text(f"サービスモードを開始しました: {len(self.tables)}テーブル", severity="INFO")
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                if deadline and now >= deadline:
+                    break
+                
+                for table in self.tables:
+                    if table["next_poll"] <= now:
+                        self.poll(table)
+                    if self.flush_reason(table):
+                        self.flush(table)
+                
+                # 次のポーリング予定かフラッシュ期限まで待機
+                wake_times = [table["next_poll"] for table in self.tables] + [
+                    table["buffered_since"] + self.config.service_flush_seconds
+                    for table in self.tables if table["buffered_since"] is not None
+                ]
+                if deadline:
+                    wake_times.append(deadline)
+                wait = min(wake_times, default=now + self.config.service_max_poll_seconds) - time.monotonic()
+                self.stop_event.wait(max(0.0, wait))
+        finally:
+            self.shutdown()
+    
+    def poll(self, table: Dict[str, Any]):
+        """前回取得した最大時刻以降の行を抽出してマイクロバッチに追加し、次のポーリング時刻を決定"""
+        worker = table["worker"]
+        now = time.monotonic()
+        try:
+            data = worker.extract_data(
+                table["name"],
+                table["config"]["timestamp_column"],
+                worker.get_extraction_options(table["config"]),
+                since=table["watermark"]
+            )
+            worker.batch_reports.pop(table["name"], None)
+            worker.lob_reports.pop(table["name"], None)
+        except Exception as e:
+            # 抽出の一時エラーはextract_data内で再試行済み。接続を作り直して次回に持ち越す
+            self.logger.log_text(f"ポーリングエラー: {worker.table_key(table['name'])} - {e}", severity="ERROR")
+            try:
+                worker.reconnect_db(e)
+            except Exception as reconnect_error:
+                self.logger.log_text(f"再接続エラー: {reconnect_error}", severity="ERROR")
+            data = None
+        
+        if data:
+            if table["buffer"] is None:
+                table["buffer"] = RowBatch(data.columns, [], data.column_types)
+                table["buffered_since"] = now
+            table["buffer"].rows.extend(data.rows)
+            table["buffer_bytes"] += int(estimate_row_bytes(data.rows) * len(data))
+            table["watermark"] = worker.get_max_timestamp(data, table["config"]["timestamp_column"]) or table["watermark"]
+        
+        table["poller"].observe(len(data) if data else 0, now - table["last_poll"])
+        table["last_poll"] = now
+        table["next_poll"] = now + table["poller"].interval
+    
+    def flush_reason(self, table: Dict[str, Any]) -> Optional[str]:
+        """マイクロバッチをフラッシュすべき理由（行数・バイト数・経過時間）"""
+        buffer = table["buffer"]
+        if buffer is None:
+            return None
+        if len(buffer) >= self.config.service_flush_rows:
+            return "rows"
+        if table["buffer_bytes"] >= self.config.service_flush_bytes:
+            return "bytes"
+        if time.monotonic() - table["buffered_since"] >= self.config.service_flush_seconds:
+            return "time"
+        return None
+    
+    def flush(self, table: Dict[str, Any]):
+        """マイクロバッチを出力してウォーターマークを進める（失敗時はバッファを保持して次回再試行）"""
+        worker = table["worker"]
+        reason = self.flush_reason(table) or "shutdown"
+        worker.run_id = DataSyncManager.new_run_id()
+        started = time.monotonic()
+        try:
+            holder = worker.claim_lease(table["name"])
+            if holder:
+                # バッチ実行などが同期中の場合はバッファを保持して次回に持ち越す
+                self.logger.log_text(
+                    f"他の実行が同期中のためフラッシュを延期します: {worker.table_key(table['name'])} (保持者: {holder['owner']})",
+                    severity="WARNING"
+                )
+                return
+        except Exception as e:
+            self.logger.log_text(f"リース取得エラー: {worker.table_key(table['name'])} - {e}", severity="ERROR")
+            return
+        try:
+            # 延期している間にバッチ実行が同じ行を出力している場合があるため、保存済みのウォーターマーク以下の行は除外
+            if not self.discard_exported_rows(table, worker.get_last_sync_time(table["name"])):
+                table["buffer"] = None
+                table["buffer_bytes"] = 0
+                table["buffered_since"] = None
+                return
+            result = worker.publish(
+                table["name"], table["config"], table["buffer"],
+                worker.new_result(table["name"], table["config"]), started
+            )
+            if worker.pending_merges:
+                worker.apply_staged_increments([result])
+                if result["status"] == "error":
+                    raise RuntimeError(result["error"])
+            if self.config.manifest_enabled and worker.manifest_entries:
+                worker.write_manifest([result])
+        except Exception as e:
+            self.logger.log_text(f"マイクロバッチのフラッシュエラー: {worker.table_key(table['name'])} - {e}", severity="ERROR")
+            return
+        finally:
+            worker.release_leases()
+        
+        self.logger.log_text(
+            f"マイクロバッチをフラッシュしました: {result['table']} ({result['rows']}行, 理由: {reason}, "
+            f"ポーリング間隔: {table['poller'].interval:.1f}秒)",
+            severity="INFO"
+        )
+        table["buffer"] = None
+        table["buffer_bytes"] = 0
+        table["buffered_since"] = None
+    
+    def discard_exported_rows(self, table: Dict[str, Any], stored_watermark: Optional[datetime]) -> int:
+        """保存済みのウォーターマーク以下の行をバッファから除外し、残った行数を返す"""
+        buffer = table["buffer"]
+        if stored_watermark is None:
+            return len(buffer)
+        index = buffer.column_index(table["config"]["timestamp_column"])
+        # タイムスタンプなしの日時はUTCとしてsync_metadataに保存されている
+        watermark = stored_watermark.astimezone(timezone.utc)
+        # NULLの行はウォーターマークがない状態で抽出されたもので、ウォーターマークを保存した実行が出力済み
+        rows = [
+            row for row in buffer.rows
+            if row[index] is not None and (
+                row[index] if row[index].tzinfo else row[index].replace(tzinfo=timezone.utc)
+            ) > watermark
+        ]
+        if len(rows) < len(buffer):
+            self.logger.log_text(
+                f"出力済みの行をマイクロバッチから除外しました: {table['worker'].table_key(table['name'])} "
+                f"({len(buffer) - len(rows)}行, ウォーターマーク: {stored_watermark.isoformat()})",
+                severity="INFO"
+            )
+            table["buffer"] = RowBatch(buffer.columns, rows, buffer.column_types)
+            table["buffer_bytes"] = int(estimate_row_bytes(rows) * len(rows))
+        return len(rows)
+    
+    def shutdown(self):
+        """残りのマイクロバッチを出力し、接続とプロセスプールを解放"""
+        for table in self.tables:
+            if table["buffer"] is not None:
+                self.flush(table)
+        for worker in self.workers:
+            if worker.db_conn:
+                worker.db_conn.close()
+        if self.manager.encode_pool:
+            self.manager.encode_pool.shutdown()
+            self.manager.encode_pool = None
+        self.logger.log_text("サービスモードを終了しました", severity="INFO")
+        self.logger.flush()
+
+
+def run_shard_locally(table_names: List[str], profile_tables: Optional[List[str]] = None,
+                      force: bool = False) -> List[Dict[str, Any]]:
+    """プロセスプール用: 指定テーブルのみを同期（リモートインスタンスの代替）"""
+    config = DatabaseConfig()
+    config.restrict_tables(table_names)
+    if profile_tables:
+        config.enable_profiling(profile_tables)
+    config.force_sync = force
+    try:
+        return DataSyncManager(config).run_sync()
+    finally:
+        get_sync_logger().flush()
+
+
+def get_request_options(request) -> Dict[str, Any]:
+    """リクエストボディ(JSON)から実行オプションを取得"""
+    if request is None:
+        return {}
+    try:
+        body = request.get_json(silent=True)
+    except TypeError:
+        body = request.get_json()
+    return body or {}
+
+
+def build_response(sync_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """テーブルごとの結果からレスポンスを作成"""
+    success_count = len([r for r in sync_results if r["status"] == "success"])
+    error_count = len([r for r in sync_results if r["status"] == "error"])
+    skipped = [r for r in sync_results if r["status"] == "skipped"]
+    
+    return {
+        "status": "success" if error_count == 0 else "partial_success",
+        "message": "データ同期が正常に完了しました" if error_count == 0 else "一部のテーブルで同期エラーが発生しました",
+        "summary": {
+            "total_tables": len(sync_results),
+            "success_count": success_count,
+            "error_count": error_count,
+            "skipped_count": len(skipped),
+            # 他の実行がリースを保持していたため同期しなかったテーブル
+            "lease_contention": [r["table"] for r in skipped if r.get("skip_reason") == "lease_held"]
+        },
+        "details": sync_results
+    }
+
+
+def build_plan_response(plans: List[Dict[str, Any]], timeout_seconds: int) -> Dict[str, Any]:
+    """ドライランの見積もりからレスポンスを作成"""
+    planned = [plan for plan in plans if plan["status"] == "success"]
+    estimated_seconds = sum(plan["estimated_seconds"] for plan in planned)
+    exceeds_timeout = estimated_seconds > timeout_seconds
+    
+    return {
+        "status": "success" if len(planned) == len(plans) else "partial_success",
+        "message": "実行計画を作成しました（データは抽出していません）",
+        "dry_run": True,
+        "summary": {
+            "total_tables": len(plans),
+            "estimated_rows": sum(plan["estimated_rows"] for plan in planned),
+            "estimated_bytes": sum(plan["estimated_bytes"] for plan in planned),
+            "estimated_seconds": round(estimated_seconds, 1),
+            "timeout_seconds": timeout_seconds,
+            "exceeds_timeout": exceeds_timeout
+        },
+        "details": plans
+    }
+
 
 def main(request):
     """Cloud Function エントリーポイント"""
     try:
         # 設定を読み込み
         config = DatabaseConfig()
+        options = get_request_options(request)
+        
+        if options.get('tables'):
+            # ワーカーとして呼ばれた場合は指定テーブルのみ同期
+            config.restrict_tables(options['tables'])
+        if options.get('profile'):
+            # true: 全テーブル / ["orders", ...]: 指定テーブルのみプロファイリング
+            config.enable_profiling(options['profile'])
+        if options.get('force'):
+            # min_interval・sync_windowにかかわらず同期
+            config.force_sync = True
+        
+        if options.get('dry_run'):
+            # 抽出は行わず、対象件数・サイズ・所要時間の見積もりのみ返す
+            plans = DataSyncManager(config).plan_sync()
+            return build_plan_response(plans, config.function_timeout)
+        
+        if options.get('mode') == 'backfill':
+            # 指定期間を時間窓ごとに並列抽出し、ウォーターマークを変更せずに別プレフィックスへ保存
+            if not options.get('table') or not options.get('from') or not options.get('to'):
+                raise ValueError("backfillにはtable・from・toの指定が必要です")
+            result = DataSyncManager(config).run_backfill(
+                options['table'],
+                datetime.fromisoformat(options['from']),
+                datetime.fromisoformat(options['to']),
+                window_hours=options.get('window_hours'),
+                max_concurrency=options.get('max_concurrency')
+            )
+            return build_response([result])
+        
+        if options.get('mode') == 'reconcile':
+            # 日単位の件数・チェックサムを比較し、不一致の日のみ再同期
+            end = date.fromisoformat(options['to']) if options.get('to') else datetime.now(SOURCE_TIMEZONE).date()
+            start = date.fromisoformat(options['from']) if options.get('from') else end - timedelta(days=config.reconcile_days)
+            return build_response(DataSyncManager(config).reconcile_sync(start, end))
+        
+        if options.get('mode') == 'fanout' and not options.get('tables'):
+            # コーディネーターとしてシャードを各実行単位に分配
+            return build_response(SyncDispatcher(config).dispatch())
         
         # 同期マネージャーを初期化して実行
         sync_manager = DataSyncManager(config)
-        sync_manager.run_sync()
+        sync_results = sync_manager.run_sync()
         
-        return {"status": "success", "message": "データ同期が正常に完了しました"}
+        return build_response(sync_results)
         
     except Exception as e:
-        logger = logging_client.logger('data_sync')
+        logger = get_sync_logger()
         logger.log_text(f"Cloud Function実行エラー: {e}", severity="ERROR")
         return {"status": "error", "message": str(e)}, 500
+    finally:
+        # レスポンス返却前にバッファ内のログを確実に送信
+        get_sync_logger().flush()
+
+def serve():
+    """サービスモードのエントリーポイント（Cloud Run ジョブ・GCEなどの常駐環境で `python main.py serve` として起動）"""
+    SyncService(DatabaseConfig()).run()
+
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["serve"]:
+        serve()
+        sys.exit(0)
+    
     # ローカルテスト用
     import json
     
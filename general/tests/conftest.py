@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+class RecordingLogger:
+    """log_textの呼び出しを記録するロガー（Cloud Loggingには接続しない）"""
+    
+    def __init__(self):
+        self.entries = []
+    
+    def log_text(self, text, severity="DEFAULT"):
+        self.entries.append((text, severity))
+    
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def sync_logger(monkeypatch):
+    logger = RecordingLogger()
+    monkeypatch.setattr(main, "get_sync_logger", lambda: logger)
+    return logger
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """実行環境の環境変数に依存しない設定（テストごとに属性を上書きして使う）"""
+    monkeypatch.delenv("SQL_SOURCES_CONFIG", raising=False)
+    monkeypatch.setenv("SYNC_TABLES_CONFIG", "{}")
+    monkeypatch.setenv("BIGQUERY_PROJECT", "test-project")
+    monkeypatch.setenv("GCS_BUCKET", "test-bucket")
+    return main.DatabaseConfig()
+
+
+@pytest.fixture
+def manager(sync_logger, config):
+    return main.DataSyncManager(config)
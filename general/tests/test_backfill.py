@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def backfill_manager(sync_logger, config):
+    config.sources[main.DEFAULT_SOURCE]["tables"] = {"orders": {"timestamp_column": "updated_at"}}
+    return main.DataSyncManager(config)
+
+
+@pytest.mark.parametrize("options", [
+    {"window_hours": 0},
+    {"window_hours": -6},
+    {"max_concurrency": 0},
+    {"max_concurrency": -1},
+])
+def test_invalid_window_or_concurrency_is_rejected_before_planning(backfill_manager, options):
+    backfill_manager.use_source = lambda source_name: pytest.fail("ウィンドウの計画前に検証されていない")
+
+    with pytest.raises(ValueError):
+        backfill_manager.run_backfill("orders", datetime(2024, 1, 1), datetime(2024, 1, 2), **options)
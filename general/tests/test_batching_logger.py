@@ -0,0 +1,108 @@
+import threading
+import time
+
+import main
+
+
+class FakeBatch:
+    def __init__(self, logger):
+        self.logger = logger
+        self.entries = []
+    
+    def log_text(self, text, severity="DEFAULT"):
+        self.entries.append((text, severity))
+    
+    def commit(self):
+        if self.logger.fail:
+            raise RuntimeError("logging API unavailable")
+        self.logger.commits.append(self.entries)
+
+
+class FakeCloudLogger:
+    """Cloud Loggingのloggerの代わりに、コミットされたバッチを記録する"""
+    
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.commits = []
+    
+    def batch(self):
+        return FakeBatch(self)
+
+
+def test_flush_waits_until_all_entries_are_committed():
+    cloud_logger = FakeCloudLogger()
+    batching = main.BatchingLogger(cloud_logger, batch_size=3, flush_interval=60)
+    for i in range(7):
+        batching.log_text(f"entry {i}", severity="INFO")
+    
+    started = time.monotonic()
+    batching.flush()
+    
+    # 時間上限（60秒）を待たずに、flush時点でキュー内の全件が送信されている
+    assert time.monotonic() - started < 5
+    assert [len(batch) for batch in cloud_logger.commits] == [3, 3, 1]
+    assert [text for batch in cloud_logger.commits for text, _ in batch] == [f"entry {i}" for i in range(7)]
+    batching.close()
+
+
+def test_entries_are_sent_after_flush_interval_without_flush():
+    cloud_logger = FakeCloudLogger()
+    batching = main.BatchingLogger(cloud_logger, batch_size=50, flush_interval=0.05)
+    batching.log_text("slow entry", severity="WARNING")
+    
+    deadline = time.monotonic() + 5
+    while not cloud_logger.commits and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cloud_logger.commits == [[("slow entry", "WARNING")]]
+    batching.close()
+
+
+def test_flush_with_empty_queue_returns_immediately():
+    cloud_logger = FakeCloudLogger()
+    batching = main.BatchingLogger(cloud_logger, batch_size=10, flush_interval=60)
+    batching.flush()
+    batching.flush()
+    assert cloud_logger.commits == []
+    batching.close()
+
+
+def test_commit_failure_falls_back_to_stderr_and_flush_still_returns(capsys):
+    batching = main.BatchingLogger(FakeCloudLogger(fail=True), batch_size=10, flush_interval=60)
+    batching.log_text("lost?", severity="ERROR")
+    batching.flush()
+    
+    stderr = capsys.readouterr().err
+    assert "logging API unavailable" in stderr
+    assert "[ERROR] lost?" in stderr
+    batching.close()
+
+
+def test_close_sends_remaining_entries_and_stops_thread():
+    cloud_logger = FakeCloudLogger()
+    batching = main.BatchingLogger(cloud_logger, batch_size=10, flush_interval=60)
+    batching.log_text("last entry")
+    batching.close()
+    
+    assert cloud_logger.commits == [[("last entry", "DEFAULT")]]
+    assert not any(thread.name == "log-batcher" and thread is batching._thread for thread in threading.enumerate())
+
+
+def test_concurrent_writers_and_flush_do_not_lose_entries():
+    cloud_logger = FakeCloudLogger()
+    batching = main.BatchingLogger(cloud_logger, batch_size=7, flush_interval=0.01)
+    
+    def write(worker):
+        for i in range(100):
+            batching.log_text(f"{worker}-{i}")
+        batching.flush()
+    
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batching.flush()
+    
+    sent = [text for batch in cloud_logger.commits for text, _ in batch]
+    assert sorted(sent) == sorted(f"{worker}-{i}" for worker in range(4) for i in range(100))
+    batching.close()
@@ -0,0 +1,120 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import main
+
+BASE = datetime(2024, 1, 1)
+
+
+def utc(value):
+    return value.replace(tzinfo=timezone.utc)
+
+
+def make_data(count):
+    rows = [(index, f"name-{index:04d}", BASE + timedelta(minutes=index)) for index in range(count)]
+    return main.RowBatch(["id", "name", "updated_at"], rows, column_types={"id": "int", "name": "nvarchar", "updated_at": "datetime2"})
+
+
+def parse(payload):
+    return list(csv.reader(io.StringIO(payload.decode("utf-8"))))
+
+
+@pytest.fixture
+def encode(manager):
+    manager.config.csv_encode_workers = 1
+    manager.config.csv_encode_batch_rows = 1000
+    manager.config.gcs_shard_max_rows = 0
+    manager.config.gcs_shard_max_bytes = 0
+
+    def run(data, max_rows=0, max_bytes=0):
+        manager.config.gcs_shard_max_rows = max_rows
+        manager.config.gcs_shard_max_bytes = max_bytes
+        return manager.encode_csv(data, ["updated_at"])
+    return run
+
+
+def test_without_limits_everything_is_one_shard(encode):
+    shards = encode(make_data(25))
+
+    assert len(shards) == 1
+    payload, rows, _ = shards[0]
+    assert rows == 25
+    assert parse(payload)[0] == ["id", "name", "updated_at"]
+    assert len(parse(payload)) == 26
+
+
+def test_rolls_over_at_max_rows(encode):
+    shards = encode(make_data(25), max_rows=10)
+
+    assert [rows for _, rows, _ in shards] == [10, 10, 5]
+    for payload, rows, _ in shards:
+        # 各シャードはヘッダーから始まり、単独で読み込める
+        lines = parse(payload)
+        assert lines[0] == ["id", "name", "updated_at"]
+        assert len(lines) == rows + 1
+
+
+def test_rolls_over_before_exceeding_max_bytes(encode):
+    data = make_data(200)
+    single = encode(data)[0][0]
+    max_bytes = len(single) // 4
+
+    shards = encode(data, max_bytes=max_bytes)
+
+    assert len(shards) >= 4
+    assert all(len(payload) <= max_bytes for payload, _, _ in shards)
+    assert sum(rows for _, rows, _ in shards) == 200
+
+
+def test_row_order_is_preserved_across_shards(encode):
+    shards = encode(make_data(47), max_rows=10, max_bytes=600)
+
+    ids = [int(line[0]) for payload, _, _ in shards for line in parse(payload)[1:]]
+    assert ids == list(range(47))
+
+
+def test_stats_are_per_shard(encode):
+    shards = encode(make_data(25), max_rows=10)
+
+    assert [stats["updated_at"] for _, _, stats in shards] == [
+        {"min": utc(BASE), "max": utc(BASE + timedelta(minutes=9))},
+        {"min": utc(BASE + timedelta(minutes=10)), "max": utc(BASE + timedelta(minutes=19))},
+        {"min": utc(BASE + timedelta(minutes=20)), "max": utc(BASE + timedelta(minutes=24))},
+    ]
+
+
+def test_datetime_stats_match_the_utc_values_in_the_csv(encode, monkeypatch):
+    monkeypatch.setattr(main, "SOURCE_TIMEZONE", main.JST)
+
+    payload, _, stats = encode(make_data(3))[0]
+
+    # ソースの日時はJST、CSVと統計はどちらもUTC
+    assert stats["updated_at"] == {"min": utc(BASE - timedelta(hours=9)), "max": utc(BASE - timedelta(hours=9, minutes=-2))}
+    assert [line[2] for line in parse(payload)[1:]] == [
+        utc(BASE - timedelta(hours=9, minutes=-minute)).isoformat() for minute in range(3)
+    ]
+
+
+def test_single_row_larger_than_max_bytes_gets_its_own_shard(encode):
+    data = main.RowBatch(["id", "body"], [(1, "x" * 500), (2, "y"), (3, "z" * 500)])
+
+    shards = encode(data, max_bytes=100)
+
+    assert [rows for _, rows, _ in shards] == [1, 1, 1]
+
+
+def test_process_pool_matches_in_process_encoding(manager, encode):
+    data = make_data(120)
+    expected = encode(data, max_rows=25)
+    manager.config.csv_encode_workers = 2
+    manager.config.csv_encode_parallel_min_rows = 1
+    try:
+        actual = encode(data, max_rows=25)
+    finally:
+        manager.encode_pool.shutdown()
+        manager.encode_pool = None
+
+    assert actual == expected
@@ -0,0 +1,214 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+BASE = datetime(2024, 1, 1)
+
+
+def at(minute):
+    return None if minute is None else BASE + timedelta(minutes=minute)
+
+
+class FakeSqlServer:
+    """TOP (n) WITH TIES・範囲条件・ORDER BYをSQL Serverと同じ規則で評価するフェイク接続
+
+    ORDER BYの昇順ではNULLが先頭になり、WITH TIESはNULL同士も同順位として扱う。
+    """
+
+    def __init__(self, rows, failures=None):
+        self.rows = rows
+        self.failures = dict(failures or {})
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.result = []
+        self.description = None
+
+    def execute(self, query, params=None):
+        server = self.server
+        index = len(server.queries)
+        server.queries.append((query, params))
+        if index in server.failures:
+            raise server.failures.pop(index)
+
+        top = re.search(r"SELECT TOP \((\d+)\) WITH TIES \* FROM (\w+)\s+(?:WHERE (.*?))?\s*ORDER BY (\w+)", query, re.S)
+        if not top:
+            # セッション設定・カラム型の取得など
+            self.result, self.description = [], [("COLUMN_NAME",), ("DATA_TYPE",)]
+            return
+        limit, _, where, order_column = int(top.group(1)), top.group(2), top.group(3), top.group(4)
+        params = list(params or ())
+        rows = [row for row in server.rows if self.matches(row, where, params)]
+        rows.sort(key=lambda row: (row[order_column] is not None, row[order_column] or BASE))
+        if len(rows) > limit:
+            boundary = rows[limit - 1][order_column]
+            rows = rows[:limit] + [row for row in rows[limit:] if row[order_column] == boundary]
+        self.result = [(row["id"], row["ts"]) for row in rows]
+        self.description = [("id",), ("ts",)]
+
+    @staticmethod
+    def matches(row, where, params):
+        if not where:
+            return True
+        param_index = 0
+        for condition in where.split(" AND "):
+            column, operator = condition.split()[:2]
+            value = row[column]
+            if condition.endswith("IS NOT NULL"):
+                if value is None:
+                    return False
+                continue
+            bound = params[param_index]
+            param_index += 1
+            # NULLとの比較はUNKNOWN（行は返らない）
+            if value is None:
+                return False
+            if not {">": value > bound, ">=": value >= bound, "<": value < bound}[operator]:
+                return False
+        return True
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+def make_rows(minutes):
+    return [{"id": index, "ts": at(minute)} for index, minute in enumerate(minutes)]
+
+
+@pytest.fixture
+def extractor(manager):
+    manager.config.extract_batch_rows = 3
+    manager.config.extract_min_batch_rows = 3
+    manager.config.extract_max_batch_rows = 3
+    manager.config.retry_base_delay = 0
+
+    def run(rows, last_sync=None, until=None, inclusive=False, failures=None):
+        server = FakeSqlServer(rows, failures)
+        manager.db_conn = server
+        manager.create_db_connection = lambda: server
+        data = manager.extract_batches(
+            "orders", "ts", last_sync, manager.get_extraction_options({}), until=until, inclusive=inclusive
+        )
+        return data, server
+    return run
+
+
+def selects(server):
+    return [(query, params) for query, params in server.queries if "SELECT TOP" in query]
+
+
+def test_ties_across_batch_boundary_are_fetched_exactly_once(extractor):
+    rows = make_rows([1, 2, 2, 2, 2, 3, 4, 4, 5])
+    data, server = extractor(rows)
+
+    assert sorted(row[0] for row in data.rows) == list(range(len(rows)))
+    assert len(data.rows) == len(rows)
+    # 1バッチ目はWITH TIESでタイムスタンプ2の行をまとめて取得し、次バッチは > 2 から再開する
+    batches = selects(server)
+    assert "WHERE" not in batches[0][0]
+    assert "ts > %s" in batches[1][0] and batches[1][1] == (at(2),)
+
+
+def test_batch_made_entirely_of_ties_does_not_loop(extractor):
+    rows = make_rows([7] * 10 + [8])
+    data, server = extractor(rows)
+
+    assert sorted(row[0] for row in data.rows) == list(range(11))
+    assert len(selects(server)) == 2
+
+
+def test_watermark_is_exclusive(extractor):
+    rows = make_rows([1, 2, 2, 3, 4, 5, 6])
+    data, _ = extractor(rows, last_sync=at(2))
+
+    assert sorted(row[1] for row in data.rows) == [at(3), at(4), at(5), at(6)]
+
+
+def test_window_includes_start_only_on_first_batch_and_excludes_end(extractor):
+    rows = make_rows([1, 2, 2, 2, 2, 3, 4, 5, 6, 6])
+    data, server = extractor(rows, last_sync=at(2), until=at(6), inclusive=True)
+
+    assert sorted(row[1] for row in data.rows) == [at(2)] * 4 + [at(3), at(4), at(5)]
+    assert len(data.rows) == len({row[0] for row in data.rows})
+    batches = selects(server)
+    assert "ts >= %s AND ts < %s" in batches[0][0]
+    assert all("ts > %s AND ts < %s" in query for query, _ in batches[1:])
+
+
+def test_null_timestamps_are_included_once_on_initial_sync(extractor):
+    rows = make_rows([None, 1, None, 2, 3, 4])
+    data, _ = extractor(rows)
+
+    assert sorted(row[0] for row in data.rows) == list(range(len(rows)))
+    assert len(data.rows) == len(rows)
+
+
+def test_more_nulls_than_batch_size_resume_from_non_null_rows(extractor):
+    rows = make_rows([None] * 5 + [1, 2, 3, 4])
+    data, server = extractor(rows)
+
+    assert sorted(row[0] for row in data.rows) == list(range(len(rows)))
+    assert len(data.rows) == len(rows)
+    # NULLのみのバッチの後はNULL以外の行から再開する
+    assert "ts IS NOT NULL" in selects(server)[1][0]
+
+
+def test_null_timestamps_are_not_refetched_after_watermark(extractor):
+    rows = make_rows([None, 1, 2, None, 3])
+    data, _ = extractor(rows, last_sync=at(1))
+
+    assert sorted(row[1] for row in data.rows) == [at(2), at(3)]
+
+
+def test_transient_error_refetches_only_the_failed_batch(extractor):
+    rows = make_rows([1, 2, 3, 4, 5, 6, 7, 8])
+    # 2回目のクエリ（2バッチ目）で接続断
+    data, server = extractor(rows, failures={1: ConnectionError("connection reset")})
+
+    assert sorted(row[0] for row in data.rows) == list(range(len(rows)))
+    assert len(data.rows) == len(rows)
+    batches = selects(server)
+    # 失敗したバッチと同じ範囲のみ再実行し、取得済みの1バッチ目は再取得しない
+    assert batches[1] == batches[2]
+    assert [query for query, _ in batches if "WHERE" not in query] == [batches[0][0]]
+
+
+def test_transient_error_reconnects_before_retry(manager, extractor, monkeypatch):
+    reconnects = []
+    original = manager.reconnect_db
+    monkeypatch.setattr(manager, "reconnect_db", lambda error: (reconnects.append(error), original(error)))
+
+    extractor(make_rows([1, 2, 3, 4]), failures={1: TimeoutError("query timeout")})
+
+    assert [type(error) for error in reconnects] == [TimeoutError]
+
+
+def test_permanent_error_is_not_retried(extractor):
+    with pytest.raises(ValueError):
+        extractor(make_rows([1, 2, 3, 4]), failures={1: ValueError("invalid column name")})
+
+
+def test_extract_data_window_uses_inclusive_start(manager):
+    rows = make_rows([1, 2, 3, 4, 5])
+    server = FakeSqlServer(rows)
+    manager.db_conn = server
+
+    data = manager.extract_data("orders", "ts", manager.get_extraction_options({}), window=(at(2), at(4)))
+
+    assert sorted(row[1] for row in data.rows) == [at(2), at(3)]
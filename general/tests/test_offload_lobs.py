@@ -0,0 +1,82 @@
+import main
+
+
+class FakeWriter:
+    def __init__(self, blobs, name, chunk_size):
+        self.blobs = blobs
+        self.name = name
+        self.chunk_size = chunk_size
+        blobs.open_writers[name] = chunk_size
+        blobs.peak_buffer = max(blobs.peak_buffer, sum(blobs.open_writers.values()))
+        blobs.data[name] = b""
+
+    def write(self, payload):
+        self.blobs.data[self.name] += payload
+
+    def close(self):
+        del self.blobs.open_writers[self.name]
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def open(self, mode, chunk_size=None):
+        return FakeWriter(self.bucket, self.name, chunk_size)
+
+
+class FakeBucket:
+    def __init__(self):
+        self.open_writers = {}
+        self.peak_buffer = 0
+        self.data = {}
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+
+class FakeLobCursor:
+    """SUBSTRING(値, 開始位置, 長さ) をキーごとに返すフェイクカーソル"""
+
+    def __init__(self, values):
+        self.values = values
+        self.result = []
+
+    def execute(self, query, params):
+        start, keys = params[0], params[1:]
+        length = int(query.split("SUBSTRING([body], %s, ")[1].split(")")[0])
+        self.result = [(key, self.values[key][start - 1:start - 1 + length]) for key in keys]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeLobConnection:
+    def __init__(self, values):
+        self.values = values
+
+    def cursor(self):
+        return FakeLobCursor(self.values)
+
+
+def test_open_writers_stay_within_the_write_buffer_budget(manager):
+    values = {key: f"body-{key}-" * 10 for key in range(1, 101)}
+    bucket = FakeBucket()
+    manager._storage_client = type("Client", (), {"bucket": lambda self, name: bucket})()
+    manager.db_conn = FakeLobConnection(values)
+    manager.get_column_layout = lambda table_name: [("id", "int", False), ("body", "varchar", True)]
+    lob = {"chunk_bytes": 16, "batch_keys": 100, "write_buffer_bytes": 8 * main.GCS_CHUNK_ALIGN, "key_columns": ["id"]}
+    data = main.RowBatch(["id", "body"], [(key, "inline") for key in values])
+
+    result = manager.offload_lobs("dbo.docs", data, ["body"], lob)
+
+    assert 0 < bucket.peak_buffer <= lob["write_buffer_bytes"]
+    assert not bucket.open_writers
+    assert len(bucket.data) == 100
+    for key, row in zip(values, result.rows):
+        name = row[1].split(f"gs://{manager.config.gcs_bucket}/", 1)[1]
+        assert bucket.data[name] == values[key].encode("utf-8")
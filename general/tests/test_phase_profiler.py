@@ -0,0 +1,46 @@
+import threading
+import time
+import tracemalloc
+
+import main
+
+
+def test_phase_started_first_can_finish_first():
+    """tracemallocを開始したスレッドが先に終わっても、並列に計測中の他のテーブルが失敗しない"""
+    first_started = threading.Event()
+    second_entering = threading.Event()
+    first_done = threading.Event()
+    errors = []
+    profilers = [main.PhaseProfiler(top=3), main.PhaseProfiler(top=3)]
+
+    def first():
+        try:
+            with profilers[0].profile("extract_data"):
+                first_started.set()
+                second_entering.wait(5)
+                # 2つ目のスレッドが計測を開始しようとしている間に終了する
+                time.sleep(0.1)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            first_done.set()
+
+    def second():
+        first_started.wait(5)
+        second_entering.set()
+        try:
+            with profilers[1].profile("extract_data"):
+                first_done.wait(5)
+                [bytearray(1024) for _ in range(100)]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert errors == []
+    assert all("extract_data" in profiler.reports for profiler in profilers)
+    assert not tracemalloc.is_tracing()
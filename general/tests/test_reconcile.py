@@ -0,0 +1,47 @@
+import main
+
+
+def test_key_expressions_normalize_each_type_on_both_sides(manager, monkeypatch):
+    monkeypatch.setattr(main, "SOURCE_TIMEZONE", main.JST)
+    manager.get_column_types = lambda table_name: {
+        "OrderId": "uniqueidentifier", "Region": "nvarchar", "Active": "bit", "OrderedAt": "datetime2"
+    }
+    table_config = {"primary_key": ["orderid", "region", "active", "orderedat"]}
+
+    expressions = manager.get_reconcile_key_expressions("orders", table_config)
+
+    assert expressions == [
+        ("LOWER(CAST(orderid AS NVARCHAR(36)))", "LOWER(CAST(orderid AS STRING))"),
+        ("CAST(region AS NVARCHAR(4000))", "CAST(region AS STRING)"),
+        ("CAST(active AS NVARCHAR(1))", "CAST(CAST(active AS INT64) AS STRING)"),
+        ("CAST(DATEDIFF_BIG(SECOND, '19700101', orderedat) AS NVARCHAR(20))",
+         "CAST(UNIX_SECONDS(TIMESTAMP(DATETIME(orderedat, 'Asia/Tokyo'))) AS STRING)"),
+    ]
+
+
+def test_unsupported_key_type_falls_back_to_counts(manager, sync_logger):
+    manager.get_column_types = lambda table_name: {"id": "int", "amount": "decimal"}
+
+    assert manager.get_reconcile_key_expressions("orders", {"primary_key": ["id", "amount"]}) is None
+    assert any("件数のみ" in text and severity == "WARNING" for text, severity in sync_logger.entries)
+
+
+def test_source_checksum_hashes_utf8_and_counts_only_without_expressions(manager):
+    queries = []
+
+    def fetch_batch(query, params):
+        queries.append(query)
+        return main.RowBatch(["bucket", "row_count", "checksum"], [])
+
+    manager.fetch_batch = fetch_batch
+    manager.reset_session = lambda: None
+    manager.db_conn = type("Connection", (), {"commit": lambda self: None})()
+    options = {"isolation_level": "READ COMMITTED", "lock_timeout_ms": None, "query_hints": [], "order_by": True}
+    table_config = {"timestamp_column": "updated_at", "primary_key": "id"}
+    start, end = main.date(2024, 1, 1), main.date(2024, 1, 2)
+
+    manager.get_source_buckets("orders", table_config, options, start, end, [("CAST(id AS NVARCHAR(20))", "")])
+    manager.get_source_buckets("orders", table_config, options, start, end, None)
+
+    assert "COLLATE Latin1_General_100_BIN2_UTF8 AS VARCHAR(8000)" in queries[0]
+    assert "HASHBYTES" not in queries[1]
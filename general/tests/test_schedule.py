@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+# 2024-01-01は月曜日
+MONDAY = datetime(2024, 1, 1, 9, 30, tzinfo=main.JST)
+
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("*", 17, True),
+    ("5", 5, True),
+    ("5", 6, False),
+    ("1-5", 5, True),
+    ("1-5", 6, False),
+    ("*/15", 45, True),
+    ("*/15", 44, False),
+    ("10-50/20", 30, True),
+    ("10-50/20", 40, False),
+    ("10-50/20", 70, False),
+    ("5/10", 55, True),
+    ("1,3,5", 3, True),
+    ("1,3,5", 4, False),
+    ("0-5,*/30", 30, True),
+])
+def test_cron_field_matches(field, value, expected):
+    assert main.cron_field_matches(field, value, 0, 59) is expected
+
+
+def test_cron_matches_all_fields():
+    assert main.cron_matches("30 9 1 1 1", MONDAY)
+    assert main.cron_matches("*/15 8-10 * * 1-5", MONDAY)
+    assert not main.cron_matches("*/15 10-12 * * *", MONDAY)
+    assert not main.cron_matches("30 9 2 * *", MONDAY)
+
+
+def test_cron_weekday_zero_is_sunday():
+    sunday = MONDAY - timedelta(days=1)
+    assert main.cron_matches("* * * * 0", sunday)
+    assert not main.cron_matches("* * * * 0", MONDAY)
+    assert main.cron_matches("* * * * 6", sunday - timedelta(days=1))
+
+
+def test_cron_requires_five_fields():
+    with pytest.raises(ValueError):
+        main.cron_matches("* * * *", MONDAY)
+
+
+def test_schedule_skip_outside_window_uses_jst(manager):
+    now = MONDAY.astimezone(timezone.utc)
+    assert manager.schedule_skip("orders", {"sync_window": "* 9 * * *"}, None, now) is None
+    assert manager.schedule_skip("orders", {"sync_window": "* 0 * * *"}, None, now) == {
+        "skip_reason": "outside_window", "sync_window": "* 0 * * *"
+    }
+
+
+def test_schedule_skip_min_interval(manager):
+    now = MONDAY.astimezone(timezone.utc)
+    config = {"min_interval": "1h"}
+
+    skip = manager.schedule_skip("orders", config, now - timedelta(minutes=20), now)
+    assert skip["skip_reason"] == "not_due"
+    assert skip["next_due"] == (now + timedelta(minutes=40)).isoformat()
+    assert manager.schedule_skip("orders", config, now - timedelta(hours=1), now) is None
+    # 同期したことがないテーブルは常に対象
+    assert manager.schedule_skip("orders", config, None, now) is None
+
+
+class FakeSyncMetadata:
+    """sync_metadataのMERGE（ウォーターマークは戻さない）と最終同期時刻の取得のみを扱うフェイク"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def query(self, query, job_config=None):
+        if "MERGE" in query:
+            params = {param.name: param.value for param in job_config.query_parameters}
+            previous = self.rows.get(params["table_name"], {}).get("last_sync_time")
+            candidates = [value for value in (previous, params["last_sync_time"]) if value is not None]
+            self.rows[params["table_name"]] = {
+                "last_sync_time": max(candidates) if candidates else None,
+                "updated_at": params["updated_at"],
+            }
+            return SimpleNamespace(result=lambda: [])
+        rows = [SimpleNamespace(table_name=name, updated_at=row["updated_at"]) for name, row in self.rows.items()]
+        return SimpleNamespace(result=lambda: rows)
+
+
+def test_empty_sync_counts_as_success_for_min_interval(manager, monkeypatch):
+    metadata = FakeSyncMetadata()
+    watermark = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    stale = datetime.now(timezone.utc) - timedelta(days=1)
+    metadata.rows["orders"] = {"last_sync_time": watermark, "updated_at": stale}
+    manager._bigquery_client = metadata
+    monkeypatch.setattr(manager, "ensure_sync_metadata_table", lambda: None)
+    monkeypatch.setattr(manager, "extract_data", lambda *args, **kwargs: main.RowBatch(["id", "ts"], []))
+    config = {"timestamp_column": "ts", "min_interval": "1h"}
+    assert manager.schedule_skip("orders", config, manager.get_last_success_times()["orders"], datetime.now(timezone.utc)) is None
+
+    result = manager.sync_table("orders", config)
+
+    assert result["status"] == "success"
+    # ウォーターマークは変わらず、同期成功時刻のみ更新される
+    assert metadata.rows["orders"]["last_sync_time"] == watermark
+    skip = manager.schedule_skip(
+        "orders", config, manager.get_last_success_times()["orders"], datetime.now(timezone.utc) + timedelta(minutes=5)
+    )
+    assert skip["skip_reason"] == "not_due"
+
+
+def test_empty_sync_without_schedule_does_not_touch_sync_metadata(manager, monkeypatch):
+    metadata = FakeSyncMetadata()
+    manager._bigquery_client = metadata
+    monkeypatch.setattr(manager, "ensure_sync_metadata_table", lambda: None)
+    monkeypatch.setattr(manager, "extract_data", lambda *args, **kwargs: main.RowBatch(["id", "ts"], []))
+
+    result = manager.sync_table("orders", {"timestamp_column": "ts"})
+
+    assert result["status"] == "success"
+    # min_interval・sync_windowのないテーブルは空の同期ごとにMERGEを発行しない
+    assert metadata.rows == {}
@@ -0,0 +1,143 @@
+import os
+import sys
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+import main
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "dev-env"))
+
+import main_hardcoded  # noqa: E402
+
+TABLE_PATH = "projects/test-project/datasets/data_sync/tables/events"
+COLUMNS = ["id", "name", "created_at"]
+TYPES = ["INT64", "STRING", "TIMESTAMP"]
+
+
+def created(second):
+    return datetime(2024, 1, 1, 0, 0, second, tzinfo=timezone.utc)
+
+
+def micros(second):
+    return str(main.encode_timestamp_micros(created(second)))
+
+
+@pytest.fixture
+def write_client(monkeypatch):
+    """本番のStorageWriteSinkをdev-envのStorage Write API Mockに対して実行する"""
+    monkeypatch.setattr(main, "bigquery_storage", main_hardcoded.mock_bigquery_storage)
+    monkeypatch.setattr(main, "bigquery_storage_writer", main_hardcoded.mock_bigquery_storage_writer)
+    faults = main_hardcoded.MockFaultInjector(None)
+    return main_hardcoded.MockBigQueryWriteClient(main_hardcoded.MockBigQueryClient("test-project", faults))
+
+
+def make_rows(count):
+    return [(index, f"name-{index}", created(index % 60)) for index in range(count)]
+
+
+def test_pending_rows_are_visible_only_after_commit(write_client, monkeypatch):
+    visible_before_commit = []
+    commit = write_client.batch_commit_write_streams
+    monkeypatch.setattr(
+        write_client, "batch_commit_write_streams",
+        lambda request: (visible_before_commit.append(len(write_client.table_rows(TABLE_PATH))), commit(request))[1]
+    )
+    sink = main.StorageWriteSink(write_client, TABLE_PATH, COLUMNS, TYPES, mode="pending")
+
+    stream_name = sink.write(make_rows(3))
+
+    assert visible_before_commit == [0]
+    assert write_client.streams[stream_name]["committed"]
+    assert write_client.table_rows(TABLE_PATH) == [
+        {"id": str(index), "name": f"name-{index}", "created_at": micros(index)} for index in range(3)
+    ]
+
+
+def test_chunked_appends_use_consecutive_offsets(write_client):
+    sink = main.StorageWriteSink(write_client, TABLE_PATH, COLUMNS, TYPES, max_request_bytes=200)
+
+    sink.write(make_rows(50))
+
+    offsets = [request.offset for request in write_client.requests]
+    sizes = [len(request.proto_rows.rows.serialized_rows) for request in write_client.requests]
+    assert len(offsets) > 1
+    assert offsets == [sum(sizes[:index]) for index in range(len(sizes))]
+    assert all(sum(map(len, request.proto_rows.rows.serialized_rows)) <= 200 for request in write_client.requests)
+    # writer_schemaはAppendRowsStreamのテンプレートから全リクエストに補われる
+    assert all(request.proto_rows.writer_schema.proto_descriptor.name == "SyncRow" for request in write_client.requests)
+    assert [row["id"] for row in write_client.table_rows(TABLE_PATH)] == [str(index) for index in range(50)]
+
+
+def test_committed_rows_are_visible_without_commit(write_client, monkeypatch):
+    monkeypatch.setattr(write_client, "batch_commit_write_streams", MagicMock())
+    sink = main.StorageWriteSink(write_client, TABLE_PATH, COLUMNS, TYPES, mode="committed")
+
+    sink.write(make_rows(2))
+
+    write_client.batch_commit_write_streams.assert_not_called()
+    assert [row["id"] for row in write_client.table_rows(TABLE_PATH)] == ["0", "1"]
+
+
+def test_null_values_are_omitted(write_client):
+    sink = main.StorageWriteSink(write_client, TABLE_PATH, COLUMNS, TYPES)
+
+    sink.write([(1, None, None)])
+
+    assert write_client.table_rows(TABLE_PATH) == [{"id": "1"}]
+
+
+def test_resent_offset_is_rejected(write_client):
+    types = main_hardcoded.MockWriteTypes
+    sink = main.StorageWriteSink(write_client, TABLE_PATH, COLUMNS, TYPES)
+    stream = write_client.create_write_stream(parent=TABLE_PATH, write_stream=types.WriteStream(type_=types.WriteStream.Type.PENDING))
+    append_stream = main_hardcoded.MockAppendRowsStream(write_client, types.AppendRowsRequest(
+        write_stream=stream.name,
+        proto_rows=types.AppendRowsRequest.ProtoData(writer_schema=types.ProtoSchema(proto_descriptor=sink.descriptor))
+    ))
+    chunk = next(sink.serialize_rows(make_rows(2)))
+
+    def send(offset):
+        return append_stream.send(types.AppendRowsRequest(
+            offset=offset, proto_rows=types.AppendRowsRequest.ProtoData(rows=types.ProtoRows(serialized_rows=chunk))
+        ))
+
+    assert send(0).result().append_result.offset == 0
+    with pytest.raises(RuntimeError, match="ALREADY_EXISTS"):
+        send(0).result()
+    with pytest.raises(RuntimeError, match="OUT_OF_RANGE"):
+        send(5).result()
+    assert write_client.finalize_write_stream(name=stream.name).row_count == 2
+
+
+def test_commit_errors_fail_the_write_and_leave_no_rows(write_client, monkeypatch):
+    finalize = write_client.finalize_write_stream
+    # ファイナライズ後に別の書き込みでコミット済みになった状態を再現
+    monkeypatch.setattr(
+        write_client, "finalize_write_stream",
+        lambda name: (finalize(name), write_client.streams[name].update(committed=True))[0]
+    )
+    sink = main.StorageWriteSink(write_client, TABLE_PATH, COLUMNS, TYPES)
+
+    with pytest.raises(RuntimeError, match="STREAM_ALREADY_COMMITTED"):
+        sink.write(make_rows(3))
+    assert write_client.table_rows(TABLE_PATH) == []
+
+
+def test_save_to_bigquery_retries_transient_append_errors_on_a_new_stream(manager, write_client):
+    write_client.bigquery_client.faults = main_hardcoded.MockFaultInjector(
+        {"bigquery.append_rows": {"fail_calls": [2], "error": "connection"}}
+    )
+    manager.config.retry_base_delay = 0
+    manager.config.bigquery_dataset = "data_sync"
+    manager.config.bigquery_write_max_request_bytes = 200
+    manager._bigquery_client = MagicMock()
+    manager._bigquery_write_client = write_client
+    data = main.RowBatch(COLUMNS, make_rows(20), column_types={"id": "int", "name": "nvarchar", "created_at": "datetime2"})
+
+    table_id, bytes_written = manager.save_to_bigquery(data, "events", {"sink": "bigquery_write"})
+
+    assert table_id.endswith(".events")
+    assert len(write_client.streams) == 2
+    assert [row["id"] for row in write_client.table_rows(TABLE_PATH)] == [str(index) for index in range(20)]
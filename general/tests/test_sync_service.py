@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import main
+
+BASE = datetime(2024, 1, 1)
+
+
+def at(minute):
+    return None if minute is None else BASE + timedelta(minutes=minute)
+
+
+@pytest.fixture
+def service(config, sync_logger, monkeypatch):
+    service = main.SyncService(config)
+    worker = service.manager
+    calls = {"published": [], "released": 0}
+    monkeypatch.setattr(worker, "claim_lease", lambda table_name: None)
+    monkeypatch.setattr(worker, "release_leases", lambda: calls.__setitem__("released", calls["released"] + 1))
+
+    def publish(table_name, table_config, data, result, started):
+        calls["published"].append([row[0] for row in data.rows])
+        return {**result, "rows": len(data)}
+    monkeypatch.setattr(worker, "publish", publish)
+    service.calls = calls
+    return service
+
+
+def buffered_table(service, minutes):
+    rows = [(index, at(minute)) for index, minute in enumerate(minutes)]
+    return {
+        "name": "orders",
+        "config": {"timestamp_column": "ts"},
+        "worker": service.manager,
+        "poller": main.AdaptivePollInterval(1, 60, 100),
+        "watermark": at(max(minute for minute in minutes if minute is not None)),
+        "buffer": main.RowBatch(["id", "ts"], rows),
+        "buffer_bytes": 100,
+        "buffered_since": 0.0,
+    }
+
+
+def test_flush_drops_rows_already_exported_by_a_batch_run(service, monkeypatch):
+    # バッチ実行がタイムスタンプ3までを出力済み（BigQueryからはUTCのタイムゾーン付きで返る）
+    monkeypatch.setattr(service.manager, "get_last_sync_time", lambda table_name: at(3).replace(tzinfo=timezone.utc))
+    table = buffered_table(service, [None, 1, 3, 3, 4, 6])
+
+    service.flush(table)
+
+    assert service.calls["published"] == [[4, 5]]
+    assert table["buffer"] is None
+
+
+def test_flush_skips_publish_when_every_row_was_exported(service, monkeypatch):
+    monkeypatch.setattr(service.manager, "get_last_sync_time", lambda table_name: at(10).replace(tzinfo=timezone.utc))
+    table = buffered_table(service, [1, 2, 10])
+
+    service.flush(table)
+
+    assert service.calls["published"] == []
+    assert service.calls["released"] == 1
+    assert table["buffer"] is None and table["buffer_bytes"] == 0 and table["buffered_since"] is None
+
+
+def test_flush_keeps_all_rows_without_stored_watermark(service, monkeypatch):
+    monkeypatch.setattr(service.manager, "get_last_sync_time", lambda table_name: None)
+    table = buffered_table(service, [None, 1, 2])
+
+    service.flush(table)
+
+    assert service.calls["published"] == [[0, 1, 2]]